@@ -0,0 +1,55 @@
+"""Бенчмарк накладных расходов аутентификации на запрос.
+
+Сравнивает `get_current_user_id` с полной проверкой JWT на каждом вызове
+и с кешем проверенных токенов.
+
+Запуск: `python -m benchmarks.auth_decode [--iterations N] [--tokens N]`.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from src.routers.deps.auth import get_current_user_id
+from src.services.auth_service import auth_service
+
+
+async def _measure(tokens: list[str], iterations: int, cached: bool) -> dict:
+    auth_service.token_cache.clear()
+    timings = []
+    for i in range(iterations):
+        token = tokens[i % len(tokens)]
+        if not cached:
+            auth_service.token_cache.clear()
+        started = time.perf_counter()
+        await get_current_user_id(token)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'mode': 'cached' if cached else 'uncached',
+        'iterations': iterations,
+        'mean_us': round(sum(timings) / len(timings) * 1e6, 2),
+        'p50_us': round(timings[len(timings) // 2] * 1e6, 2),
+        'p99_us': round(timings[int(len(timings) * 0.99)] * 1e6, 2),
+        'cache': auth_service.token_cache.stats(),
+    }
+
+
+async def main(iterations: int, tokens_count: int) -> list[dict]:
+    tokens = [
+        (await auth_service._create_tokens(user_id)).access
+        for user_id in range(1, tokens_count + 1)
+    ]
+    return [
+        await _measure(tokens, iterations, cached=False),
+        await _measure(tokens, iterations, cached=True),
+    ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--tokens', type=int, default=100, help='Количество разных пользователей/токенов')
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.iterations, args.tokens)), indent=2))  # noqa: T201
@@ -0,0 +1,101 @@
+"""Бенчмарк чтения страницы уведомлений из БД: модели против проекции.
+
+Сравнивает прежний путь (модель `Notification` на каждую строку и
+`NotificationRead.from_orm`) с проекцией `.values()` в репозитории: с
+валидацией `NotificationRead`, словарями для `FAST_JSON_RESPONSES` и чтением
+пачками по `LIST_CHUNK_SIZE`. Для каждого пути измеряются время (p50/p99)
+и пик выделенной памяти (`tracemalloc`) на один запрос страницы.
+
+Запуск: `python -m benchmarks.list_projection [--per-page N] [--iterations N]`.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+
+from benchmarks.serialization import percentile_ms, seeded_database
+from src.config.settings import settings
+from src.db_services.notifications_repository import notification_repository
+from src.models.notification import Notification
+from src.rest_models.notification_schema import NotificationRead
+from src.rest_models.pagination import Pagination
+from src.utils.fast_json import dumps
+
+
+async def _models(user_id: int, pagination: Pagination) -> int:
+    notifications = await (
+        Notification.filter(user_id=user_id)
+        .limit(pagination.per_page + 1)
+        .order_by('id')
+    )
+    return len([NotificationRead.from_orm(n) for n in notifications[:pagination.per_page]])
+
+
+async def _values(user_id: int, pagination: Pagination) -> int:
+    page = await notification_repository.get_user_notifications(user_id=user_id, pagination=pagination)
+    return page.count
+
+
+async def _values_data(user_id: int, pagination: Pagination) -> int:
+    page = await notification_repository.get_user_notifications_data(user_id=user_id, pagination=pagination)
+    return len(dumps(page))
+
+
+async def _chunks(user_id: int, pagination: Pagination) -> int:
+    page = await notification_repository.stream_user_notifications_data(
+        user_id=user_id,
+        pagination=pagination,
+        chunk_size=settings.notifications.LIST_CHUNK_SIZE,
+    )
+    # Пачка кодируется и отбрасывается, как при отдаче StreamingResponse.
+    size = 0
+    async for rows in page.chunks():
+        size += len(dumps(rows))
+    return size
+
+
+async def _measure(name: str, read, user_id: int, pagination: Pagination, iterations: int) -> dict:
+    await read(user_id, pagination)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await read(user_id, pagination)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    tracemalloc.start()
+    await read(user_id, pagination)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'path': name,
+        'per_page': pagination.per_page,
+        'iterations': iterations,
+        'p50_ms': percentile_ms(timings, 0.5),
+        'p99_ms': percentile_ms(timings, 0.99),
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+async def main(per_page: int, iterations: int) -> list[dict]:
+    async with seeded_database(per_page + 1) as user_id:
+        pagination = Pagination(page=1, per_page=per_page)
+        return [
+            await _measure(name, read, user_id, pagination, iterations)
+            for name, read in (
+                ('models', _models),
+                ('values', _values),
+                ('values_data', _values_data),
+                ('chunks', _chunks),
+            )
+        ]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-page', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.per_page, args.iterations)), indent=2))  # noqa: T201
@@ -0,0 +1,450 @@
+"""Нагрузочный тест API уведомлений.
+
+Поднимает `src.app.main:app` в процессе (lifespan, пул БД, middleware) и
+вызывает его как ASGI-приложение, без сети и uvicorn: измеряется только
+приложение и БД. База задается теми же переменными, что и у приложения
+(`DB_ENGINE`, `DB_NAME`, `DB_HOST`, ...).
+
+Перед прогоном в БД создаются пользователи `bench_<i>` и `--rows` уведомлений,
+распределенных между ними поровну. Если `bench_0` уже есть, данные
+используются повторно: создание 10M строк занимает минуты. Нагрузки
+(register, login, create, list_desc, list_asc, list_deep, list_cached, delete) идут по
+очереди, каждая - `--requests` запросов при `--concurrency` одновременных
+клиентах. list_cached повторяет первую страницу с `If-None-Match` из прошлого
+ответа, как мобильный клиент без новых уведомлений. delete удаляет уведомления,
+созданные нагрузкой create, поэтому засеянные данные между прогонами не меняются.
+
+Отчет в JSON: RPS, p50/p95/p99 и число запросов к БД на один HTTP-запрос
+(отдельный замер одним запросом после прогона, чтобы логирование запросов
+Tortoise не влияло на время). С `--baseline` в отчет добавляется изменение
+относительно прошлого отчета.
+
+Запуск:
+    DB_ENGINE=sqlite DB_NAME=/tmp/bench.db DB_GENERATE_SCHEMAS=true \\
+        python -m benchmarks.load_test --rows 100000 --output report.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import platform
+import subprocess
+import time
+import uuid
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from typing import Optional
+from urllib.parse import urlencode
+
+import structlog
+from tortoise import connections
+
+from benchmarks.serialization import percentile_ms
+from src.app.main import app
+from src.config.settings import settings
+from src.models.notification import Notification
+from src.models.notification_counter import NotificationCounter
+from src.models.user import User
+from src.services.password_hasher import password_hasher
+
+SEED_PREFIX = 'bench_'
+SEED_PASSWORD = 'bench-password'
+WORKLOADS = ('register', 'login', 'create', 'list_desc', 'list_asc', 'list_deep', 'list_cached', 'delete')
+# Нагрузки с bcrypt на каждый запрос, для них отдельное (меньшее) число запросов.
+AUTH_WORKLOADS = ('register', 'login')
+
+
+class ASGIClient:
+    """Вызов ASGI-приложения без сети: один запрос - один вызов `app`."""
+
+    def __init__(self, application: Callable):
+        """Initialize ASGIClient.
+
+        Args:
+            application (Callable): ASGI-приложение с уже выполненным startup.
+        """
+        self.app = application
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        query: Optional[dict] = None,
+        headers: Optional[dict] = None,
+        json_body: Optional[dict] = None,
+        form: Optional[dict] = None,
+        response_headers: Optional[dict] = None,
+    ) -> tuple[int, bytes]:
+        """Выполнить запрос.
+
+        Args:
+            response_headers (Optional[dict]): Словарь, в который записываются заголовки ответа.
+
+        Returns:
+            tuple[int, bytes]: Статус и тело ответа.
+        """
+        body = b''
+        raw_headers = [(b'host', b'benchmark')]
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            raw_headers.append((b'content-type', b'application/json'))
+        elif form is not None:
+            body = urlencode(form).encode()
+            raw_headers.append((b'content-type', b'application/x-www-form-urlencoded'))
+        if body:
+            raw_headers.append((b'content-length', str(len(body)).encode()))
+        for name, value in (headers or {}).items():
+            raw_headers.append((name.lower().encode(), value.encode()))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': urlencode(query or {}).encode(),
+            'root_path': '',
+            'headers': raw_headers,
+            'client': ('127.0.0.1', 50000),
+            'server': ('benchmark', 80),
+        }
+        request_sent = False
+        status = 500
+        chunks = []
+
+        async def receive() -> dict:
+            nonlocal request_sent
+            if request_sent:
+                # Ответ уже отдан, соединение больше ничего не пришлет.
+                await asyncio.Event().wait()
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message: dict) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                if response_headers is not None:
+                    response_headers.update((name.decode(), value.decode()) for name, value in message['headers'])
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return status, b''.join(chunks)
+
+
+class QueryCounter(logging.Handler):
+    """Считает запросы к БД по debug-логу `tortoise.db_client`."""
+
+    def __init__(self):
+        """Initialize QueryCounter."""
+        super().__init__(level=logging.DEBUG)
+        self.count = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.count += 1
+
+
+async def seed(users: int, rows: int) -> dict:
+    """Создать пользователей `bench_<i>` и `rows` уведомлений (если их еще нет).
+
+    Уведомления вставляются одним INSERT ... SELECT на пачку (generate_series в
+    PostgreSQL, рекурсивный CTE в SQLite), id разных пользователей чередуются.
+
+    Returns:
+        dict: Сколько строк есть и сколько секунд заняло создание.
+    """
+    started = time.perf_counter()
+    reused = await User.filter(username='{prefix}0'.format(prefix=SEED_PREFIX)).exists()
+    if not reused:
+        hashed_password = await password_hasher.hash(SEED_PASSWORD)
+        await User.bulk_create(
+            [User(username='{prefix}{i}'.format(prefix=SEED_PREFIX, i=i), password=hashed_password) for i in range(users)],
+            batch_size=1000,
+        )
+        conn = connections.get('default')
+        user_ids = 'SELECT id FROM "{table}" WHERE username LIKE \'{prefix}%\''.format(
+            table=User._meta.db_table, prefix=SEED_PREFIX,
+        )
+        per_user = rows // users
+        # Около 200k строк на запрос: одна транзакция не разрастается, а запросов немного.
+        step = max(1, 200_000 // users)
+        for start in range(0, per_user, step):
+            stop = min(start + step, per_user)
+            if conn.capabilities.dialect == 'postgres':
+                sequence = 'SELECT n FROM generate_series({start}, {last}) AS n'.format(start=start, last=stop - 1)
+            else:
+                sequence = (
+                    'WITH RECURSIVE s(n) AS (SELECT {start} UNION ALL SELECT n + 1 FROM s WHERE n < {last}) '
+                    'SELECT n FROM s'
+                ).format(start=start, last=stop - 1)
+            await conn.execute_script(
+                'INSERT INTO "{table}" (user_id, type, text, created_at) '
+                "SELECT u.id, CASE seq.n % 3 WHEN 0 THEN 'like' WHEN 1 THEN 'comment' ELSE 'repost' END, "
+                "'Notification ' || seq.n, CURRENT_TIMESTAMP "
+                'FROM ({sequence}) AS seq CROSS JOIN ({user_ids}) AS u ORDER BY seq.n, u.id'.format(
+                    table=Notification._meta.db_table, sequence=sequence, user_ids=user_ids,
+                )
+            )
+        await conn.execute_script(
+            'INSERT INTO "{counters}" (user_id, total, unread, updated_at) '
+            'SELECT u.id, COUNT(n.id), COUNT(n.id), CURRENT_TIMESTAMP FROM ({user_ids}) AS u '
+            'LEFT JOIN "{table}" AS n ON n.user_id = u.id GROUP BY u.id'.format(
+                counters=NotificationCounter._meta.db_table,
+                table=Notification._meta.db_table,
+                user_ids=user_ids,
+            )
+        )
+    seeded_users = await User.filter(username__startswith=SEED_PREFIX).values_list('id', flat=True)
+    return {
+        'reused': reused,
+        'users': len(seeded_users),
+        'rows': await Notification.filter(user_id__in=seeded_users).count(),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+
+
+class LoadTest:
+    """Нагрузки на API от имени засеянных пользователей."""
+
+    def __init__(self, client: ASGIClient, concurrency: int, per_page: int):
+        """Initialize LoadTest.
+
+        Args:
+            client (ASGIClient): Клиент приложения.
+            concurrency (int): Число одновременных клиентов.
+            per_page (int): Размер страницы для нагрузок list_*.
+        """
+        self.client = client
+        self.concurrency = concurrency
+        self.per_page = per_page
+        self.run_id = uuid.uuid4().hex[:8]
+        self.headers: list[dict] = []
+        self.deep_page = 1
+        self.created_ids: list[tuple[int, int]] = []
+        self.etags: dict[int, str] = {}
+
+    async def prepare(self) -> None:
+        """Войти под первыми `concurrency` пользователями и найти последнюю страницу списка."""
+        users = await User.filter(username__startswith=SEED_PREFIX).order_by('id').limit(self.concurrency)
+        for user in users:
+            status, body = await self.client.request(
+                'POST', '/api/auth/login', form={'username': user.username, 'password': SEED_PASSWORD},
+            )
+            if status != 200:
+                raise RuntimeError('Login failed for {name}: {status}'.format(name=user.username, status=status))
+            self.headers.append({'Authorization': 'Bearer ' + json.loads(body)['access_token']})
+        status, body = await self.client.request(
+            'GET', '/notifications/', query={'page': 1, 'per_page': self.per_page}, headers=self.headers[0],
+        )
+        self.deep_page = max(1, json.loads(body)['pages'])
+
+    def _headers(self, worker: int) -> dict:
+        return self.headers[worker % len(self.headers)]
+
+    async def register(self, worker: int, i: int) -> int:
+        status, _ = await self.client.request('POST', '/api/auth/register', json_body={
+            'username': 'load_{run}_{i}'.format(run=self.run_id, i=i),
+            'password': SEED_PASSWORD,
+        })
+        return status
+
+    async def login(self, worker: int, i: int) -> int:
+        status, _ = await self.client.request('POST', '/api/auth/login', form={
+            'username': '{prefix}{i}'.format(prefix=SEED_PREFIX, i=worker % len(self.headers)),
+            'password': SEED_PASSWORD,
+        })
+        return status
+
+    async def create(self, worker: int, i: int) -> int:
+        status, body = await self.client.request(
+            'POST', '/notifications/', json_body={'type': 'like', 'text': 'Load {i}'.format(i=i)}, headers=self._headers(worker),
+        )
+        if status == 201:
+            self.created_ids.append((worker, json.loads(body)['id']))
+        return status
+
+    async def list_desc(self, worker: int, i: int) -> int:
+        return await self._list(worker, {'page': 1, 'per_page': self.per_page, 'order': 'desc'})
+
+    async def list_asc(self, worker: int, i: int) -> int:
+        return await self._list(worker, {'page': 1, 'per_page': self.per_page, 'order': 'asc'})
+
+    async def list_deep(self, worker: int, i: int) -> int:
+        return await self._list(worker, {'page': self.deep_page, 'per_page': self.per_page})
+
+    async def list_cached(self, worker: int, i: int) -> int:
+        user = worker % len(self.headers)
+        headers = dict(self._headers(worker))
+        if user in self.etags:
+            headers['If-None-Match'] = self.etags[user]
+        response_headers: dict = {}
+        status, _ = await self.client.request(
+            'GET', '/notifications/', query={'page': 1, 'per_page': self.per_page, 'order': 'desc'},
+            headers=headers, response_headers=response_headers,
+        )
+        if 'etag' in response_headers:
+            self.etags[user] = response_headers['etag']
+        return status
+
+    async def delete(self, worker: int, i: int) -> int:
+        owner, notification_id = self.created_ids[i]
+        status, _ = await self.client.request(
+            'DELETE', '/notifications/{id}'.format(id=notification_id), headers=self._headers(owner),
+        )
+        return status
+
+    async def _list(self, worker: int, query: dict) -> int:
+        status, _ = await self.client.request('GET', '/notifications/', query=query, headers=self._headers(worker))
+        return status
+
+
+async def run_workload(call: Callable[[int, int], Awaitable[int]], requests: int, concurrency: int) -> dict:
+    """Выполнить `requests` вызовов `call(worker, i)` из `concurrency` задач.
+
+    Returns:
+        dict: RPS, перцентили и коды ответов.
+    """
+    counter = itertools.count()
+    timings = []
+    statuses: Counter = Counter()
+
+    async def worker(number: int) -> None:
+        for i in iter(counter.__next__, None):
+            if i >= requests:
+                return
+            started = time.perf_counter()
+            status = await call(number, i)
+            timings.append(time.perf_counter() - started)
+            statuses[status] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        'requests': len(timings),
+        'concurrency': concurrency,
+        'errors': errors,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': percentile_ms(timings, 0.5),
+        'p95_ms': percentile_ms(timings, 0.95),
+        'p99_ms': percentile_ms(timings, 0.99),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+    }
+
+
+async def count_queries(call: Callable[[int, int], Awaitable[int]], i: int) -> int:
+    """Число запросов к БД за один вызов (по логу Tortoise)."""
+    db_logger = logging.getLogger('tortoise.db_client')
+    handler = QueryCounter()
+    level, propagate = db_logger.level, db_logger.propagate
+    db_logger.addHandler(handler)
+    db_logger.setLevel(logging.DEBUG)
+    db_logger.propagate = False
+    try:
+        await call(0, i)
+    finally:
+        db_logger.removeHandler(handler)
+        db_logger.setLevel(level)
+        db_logger.propagate = propagate
+    return handler.count
+
+
+def _git_revision() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True, check=True,
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+    return {'commit': commit, 'dirty': dirty}
+
+
+def compare(report: dict, baseline: dict) -> None:
+    """Добавить в отчет изменение RPS и p99 в процентах относительно `baseline`."""
+    previous = {item['workload']: item for item in baseline['workloads']}
+    for item in report['workloads']:
+        before = previous.get(item['workload'])
+        if before is None:
+            continue
+        item['vs_baseline'] = {
+            key: round((item[key] - before[key]) / before[key] * 100, 1) if before[key] else None
+            for key in ('rps', 'p50_ms', 'p99_ms')
+        }
+    report['baseline'] = baseline['meta'].get('git')
+
+
+async def main(args: argparse.Namespace) -> dict:
+    # Лог каждого запроса исказил бы время и засорил вывод.
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+    async with app.router.lifespan_context(app):
+        seeded = await seed(users=args.users, rows=args.rows)
+        load_test = LoadTest(ASGIClient(app), concurrency=args.concurrency, per_page=args.per_page)
+        await load_test.prepare()
+        results = []
+        for name in args.workloads:
+            call = getattr(load_test, name)
+            requests = args.auth_requests if name in AUTH_WORKLOADS else args.requests
+            if name == 'delete':
+                if len(load_test.created_ids) < 2:
+                    # С INGEST_MODE=accepted create отдает квитанцию без id - удалять нечего.
+                    continue
+                # Один созданный id остается для подсчета запросов к БД.
+                requests = min(requests, len(load_test.created_ids) - 1)
+            result = await run_workload(call, requests=requests, concurrency=args.concurrency)
+            # Последний вызов не попал в прогон: create/register делают новую запись, delete - удаляет ее.
+            result['db_queries_per_request'] = await count_queries(call, requests)
+            results.append({'workload': name, **result})
+    return {
+        'meta': {
+            'git': _git_revision(),
+            'python': platform.python_version(),
+            'db_engine': settings.db.DB_ENGINE,
+            'seed': seeded,
+            'per_page': args.per_page,
+            'settings': {
+                'FAST_JSON_RESPONSES': settings.notifications.FAST_JSON_RESPONSES,
+                'INGEST_MODE': settings.notifications.INGEST_MODE.value,
+                'DB_POOL_MAX_SIZE': settings.db.DB_POOL_MAX_SIZE,
+                'BCRYPT_ROUNDS': settings.hashing.BCRYPT_ROUNDS,
+                'HASHING_WORKERS': settings.hashing.HASHING_WORKERS,
+            },
+        },
+        'workloads': results,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help='Уведомлений в засеянных данных')
+    parser.add_argument('--users', type=int, default=100, help='Засеянных пользователей')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000, help='Запросов на нагрузку')
+    parser.add_argument('--auth-requests', type=int, default=100, help='Запросов для register и login')
+    parser.add_argument('--per-page', type=int, default=20)
+    parser.add_argument('--workloads', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--output', help='Файл для JSON-отчета')
+    parser.add_argument('--baseline', help='Отчет прошлого прогона для сравнения')
+    args = parser.parse_args()
+    if args.concurrency > args.users:
+        parser.error('--concurrency must not exceed --users')
+    if 'delete' in args.workloads and 'create' not in args.workloads:
+        parser.error('delete removes notifications made by create, select both')
+    report = asyncio.run(main(args))
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)  # noqa: T201
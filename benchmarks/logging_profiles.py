@@ -0,0 +1,83 @@
+"""Бенчмарк пропускной способности логирования для профилей `default` и `production`.
+
+Для каждого профиля логгер настраивается как в `run_uvicorn` (очередь,
+файл и консоль; консоль направляется в /dev/null) и измеряется:
+сколько вызовов в секунду выдерживает вызывающий код и сколько записей
+в секунду доходит до обработчиков с учетом фонового потока.
+
+Запуск: `python -m benchmarks.logging_profiles [--iterations N]`.
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+
+import structlog
+
+from src.choices.service_choices import LogOverflowPolicyChoices, LogProfileChoices
+from src.config.log_queue import QueueingHandler, default_log_queue
+from src.config.logger_setup import configure_logger
+from src.config.settings import settings
+
+
+def _reset_logging() -> None:
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+        if isinstance(handler, QueueingHandler):
+            for target in handler.handlers:
+                target.close()
+    structlog.reset_defaults()
+
+
+def _measure(profile: LogProfileChoices, iterations: int, devnull) -> dict:
+    _reset_logging()
+    configure_logger(level=logging.INFO, profile=profile)
+    for handler in logging.getLogger().handlers:
+        for target in getattr(handler, 'handlers', ()):
+            if isinstance(target, logging.StreamHandler) and not isinstance(target, logging.FileHandler):
+                target.setStream(devnull)
+
+    struct_logger = structlog.stdlib.get_logger('benchmark')
+    stdlib_logger = logging.getLogger('benchmark.stdlib')
+    result = {'profile': profile.value, 'iterations': iterations}
+    cases = (
+        ('structlog_info', lambda i: struct_logger.info('Notification created', user_id=i, notification_id=i)),
+        ('structlog_debug_disabled', lambda i: struct_logger.debug('Notification created', user_id=i)),
+        ('stdlib_info', lambda i: stdlib_logger.info('%s - "%s %s HTTP/1.1" %d', '127.0.0.1', 'GET', '/', 200)),
+    )
+    for name, call in cases:
+        queued_before = default_log_queue.stats()['queued']
+        started = time.perf_counter()
+        for i in range(iterations):
+            call(i)
+        caller_elapsed = time.perf_counter() - started
+        # stop() дожидается обработки всей очереди, следующая запись запустит поток заново.
+        default_log_queue.stop()
+        total_elapsed = time.perf_counter() - started
+        result[name] = {
+            'caller_calls_per_sec': round(iterations / caller_elapsed),
+            'handled_per_sec': round(iterations / total_elapsed),
+            'queued': default_log_queue.stats()['queued'] - queued_before,
+        }
+    return result
+
+
+def main(iterations: int) -> list[dict]:
+    # В бенчмарке записи не должны отбрасываться, иначе сравнение теряет смысл.
+    default_log_queue.overflow_policy = LogOverflowPolicyChoices.block
+    with tempfile.TemporaryDirectory() as tmp_dir, open(os.devnull, 'w') as devnull:
+        settings.logging.LOG_FILE = os.path.join(tmp_dir, 'benchmark.log')
+        results = [_measure(profile, iterations, devnull) for profile in LogProfileChoices]
+        _reset_logging()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(main(args.iterations), indent=2))  # noqa: T201
@@ -0,0 +1,118 @@
+"""Бенчмарк ответа `GET /notifications/` для большой страницы.
+
+Сравнивает обычный путь (`NotificationRead` на каждую строку,
+повторная валидация `response_model` в FastAPI и `JSONResponse`) с путем
+`FAST_JSON_RESPONSES` (dict из строк БД и `FastJSONResponse`). Данные
+лежат в SQLite в памяти, поэтому время запроса к БД почти одинаково для обоих
+путей, а разница - это валидация и сериализация.
+
+Запуск: `python -m benchmarks.serialization [--per-page N] [--iterations N]`.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi.routing import APIRoute, serialize_response
+from starlette.responses import JSONResponse
+from tortoise import Tortoise
+
+from src.app.main import app
+from src.db.database import TORTOISE_ORM
+from src.models.user import User
+from src.rest_models.notification_schema import NotificationCreate
+from src.rest_models.pagination import Pagination
+from src.routers.responses import FastJSONResponse
+from src.services.notification_service import notification_service
+from src.utils import fast_json
+
+
+def _list_route() -> APIRoute:
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.path == '/notifications/' and 'GET' in route.methods:
+            return route
+    raise LookupError('GET /notifications/ route not found')
+
+
+async def _default_body(user_id: int, pagination: Pagination, route: APIRoute) -> bytes:
+    result = await notification_service.list(user_id=user_id, pagination=pagination)
+    content = await serialize_response(field=route.response_field, response_content=result)
+    return JSONResponse(content).body
+
+
+async def _fast_body(user_id: int, pagination: Pagination, route: APIRoute) -> bytes:
+    result = await notification_service.list_data(user_id=user_id, pagination=pagination)
+    return FastJSONResponse(result).body
+
+
+def percentile_ms(timings: list[float], share: float) -> float:
+    """Перцентиль отсортированных времен в миллисекундах."""
+    return round(timings[min(int(len(timings) * share), len(timings) - 1)] * 1000, 3)
+
+
+@asynccontextmanager
+async def seeded_database(notifications: int) -> AsyncIterator[int]:
+    """SQLite в памяти с одним пользователем и `notifications` его уведомлений.
+
+    Yields:
+        int: id пользователя.
+    """
+    await Tortoise.init(
+        db_url='sqlite://:memory:',
+        modules={'models': TORTOISE_ORM['apps']['models']['models']},
+    )
+    try:
+        await Tortoise.generate_schemas()
+        user = await User.create(username='benchmark', password='-')
+        await notification_service.db.bulk_create_notifications(
+            items=[
+                (user.id, NotificationCreate(type='like', text='Notification {i}'.format(i=i)))
+                for i in range(notifications)
+            ],
+            chunk_size=500,
+        )
+        yield user.id
+    finally:
+        await Tortoise.close_connections()
+
+
+async def _measure(name: str, build, user_id: int, pagination: Pagination, iterations: int) -> dict:
+    route = _list_route()
+    body = await build(user_id, pagination, route)
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await build(user_id, pagination, route)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'path': name,
+        'per_page': pagination.per_page,
+        'iterations': iterations,
+        'body_bytes': len(body),
+        'p50_ms': percentile_ms(timings, 0.5),
+        'p99_ms': percentile_ms(timings, 0.99),
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+    }
+
+
+async def main(per_page: int, iterations: int) -> list[dict]:
+    async with seeded_database(per_page) as user_id:
+        pagination = Pagination(page=1, per_page=per_page)
+        results = [
+            await _measure('default', _default_body, user_id, pagination, iterations),
+            await _measure('fast_json', _fast_body, user_id, pagination, iterations),
+        ]
+    results[-1]['encoder'] = 'orjson' if fast_json.orjson is not None else 'json'
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-page', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.per_page, args.iterations)), indent=2))  # noqa: T201
@@ -0,0 +1,37 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "user" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "username" VARCHAR(50) NOT NULL UNIQUE,
+    "avatar_url" VARCHAR(255) NOT NULL DEFAULT 'https://example.com/avatar.png',
+    "password" VARCHAR(128) NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS "notification" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "type" VARCHAR(7) NOT NULL,
+    "text" VARCHAR(255) NOT NULL,
+    "created_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "user_id" INT NOT NULL REFERENCES "user" ("id") ON DELETE CASCADE
+);
+COMMENT ON COLUMN "notification"."type" IS 'like: like\ncomment: comment\nrepost: repost';
+CREATE TABLE IF NOT EXISTS "notificationcounter" (
+    "total" INT NOT NULL DEFAULT 0,
+    "updated_at" TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "user_id" INT NOT NULL PRIMARY KEY REFERENCES "user" ("id") ON DELETE CASCADE
+);
+COMMENT ON TABLE "notificationcounter" IS 'Денормализованные счетчики уведомлений пользователя.';
+CREATE TABLE IF NOT EXISTS "aerich" (
+    "id" SERIAL NOT NULL PRIMARY KEY,
+    "version" VARCHAR(255) NOT NULL,
+    "app" VARCHAR(100) NOT NULL,
+    "content" JSONB NOT NULL
+);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        """
@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE INDEX IF NOT EXISTS "idx_notification_user_created" ON "notification" ("user_id", "created_at");
+        CREATE INDEX IF NOT EXISTS "idx_notification_user_id_id" ON "notification" ("user_id", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_notification_user_id_id";
+        DROP INDEX IF EXISTS "idx_notification_user_created";"""
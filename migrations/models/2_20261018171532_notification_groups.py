@@ -0,0 +1,17 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "notification" ADD "bucket" BIGINT;
+        ALTER TABLE "notification" ADD "actor_count" INT NOT NULL DEFAULT 1;
+        ALTER TABLE "notification" ADD "group_key" VARCHAR(255);
+        CREATE UNIQUE INDEX IF NOT EXISTS "uid_notificatio_group_k_88aa63" ON "notification" ("group_key", "user_id", "type", "bucket");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "uid_notificatio_group_k_88aa63";
+        ALTER TABLE "notification" DROP COLUMN "bucket";
+        ALTER TABLE "notification" DROP COLUMN "actor_count";
+        ALTER TABLE "notification" DROP COLUMN "group_key";"""
@@ -0,0 +1,16 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "notification" ADD "is_read" BOOL NOT NULL DEFAULT False;
+        ALTER TABLE "notificationcounter" ADD "unread" INT NOT NULL DEFAULT 0;
+        UPDATE "notificationcounter" SET "unread" = "total";
+        CREATE INDEX IF NOT EXISTS "idx_notification_user_unread" ON "notification" ("user_id", "id") WHERE is_read = false;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_notification_user_unread";
+        ALTER TABLE "notification" DROP COLUMN "is_read";
+        ALTER TABLE "notificationcounter" DROP COLUMN "unread";"""
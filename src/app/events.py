@@ -1,30 +1,21 @@
-# """Module with fastapi events."""
-#
-# from apscheduler.schedulers.asyncio import AsyncIOScheduler
-#
-# from src.redis_client import get_redis_client
-# from src.telegram_sdk.client import client_pool
-#
-# scheduler = AsyncIOScheduler()
-#
-#
-# async def startup_event() -> None:
-#     """Handle FastAPI startup event.
-#
-#     Initializes Redis connection.
-#     Initializes key manager, add rotation job.
-#     """
-#
-#     await get_redis_client()
-#
-#
-# async def shutdown_event() -> None:
-#     """Handle FastAPI shutdown event.
-#
-#     Closes the Redis connection.
-#     """
-#     for k, (ts, tg_client) in list(client_pool.items()):
-#         await tg_client.disconnect()
-#
-#     redis_client = await get_redis_client()
-#     await redis_client.close()
+"""Module with fastapi events."""
+
+from src.brokers import notification_broker
+from src.redis_client import close_redis_client
+
+
+async def startup_event() -> None:
+    """Handle FastAPI startup event.
+
+    Starts the notification broker (for Redis - connection and pub/sub listener).
+    """
+    await notification_broker.start()
+
+
+async def shutdown_event() -> None:
+    """Handle FastAPI shutdown event.
+
+    Stops the notification broker and closes the Redis connection.
+    """
+    await notification_broker.stop()
+    await close_redis_client()
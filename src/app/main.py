@@ -3,12 +3,16 @@
 from fastapi import FastAPI
 from tortoise.contrib.fastapi import tortoise_exception_handlers
 
+from src.app.middlewares import CompressionMiddleware, MetricsMiddleware, RequestLoggingMiddleware
+from src.config.settings import settings
 from src.db.database import lifespan
 
 from src.routers.exception_handlers import exception_handlers
 from src.routers.healthcheck import healthcheck_router
+from src.routers.metrics_router import metrics_router
 from src.routers.notifications_router import notifications_router
 from src.routers.users_router import user_router
+from src.utils.compression import available_encodings
 
 exception_handlers.update(tortoise_exception_handlers())
 
@@ -17,6 +21,31 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+compression_encodings = available_encodings(
+    encoding.strip() for encoding in settings.compression.COMPRESSION_ENCODINGS.split(',') if encoding.strip()
+)
+if compression_encodings:
+    # Самый внутренний middleware: время сжатия входит в метрики и лог запроса.
+    app.add_middleware(
+        CompressionMiddleware,
+        encodings=compression_encodings,
+        levels={
+            'gzip': settings.compression.COMPRESSION_GZIP_LEVEL,
+            'br': settings.compression.COMPRESSION_BROTLI_LEVEL,
+            'zstd': settings.compression.COMPRESSION_ZSTD_LEVEL,
+        },
+        minimum_size=settings.compression.COMPRESSION_MIN_SIZE,
+        offload_size=settings.compression.COMPRESSION_OFFLOAD_SIZE,
+    )
+app.add_middleware(
+    RequestLoggingMiddleware,
+    sample_rate=settings.logging.REQUEST_LOG_SAMPLE_RATE,
+    max_body_size=settings.logging.REQUEST_LOG_MAX_BODY,
+    redact_fields=settings.logging.REQUEST_LOG_REDACT_FIELDS.split(','),
+)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(notifications_router, prefix="/notifications", tags=["notifications"])
 app.include_router(user_router, prefix='/api')
 app.include_router(healthcheck_router, prefix='/api')
+app.include_router(metrics_router, prefix='/api')
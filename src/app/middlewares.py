@@ -1,74 +1,286 @@
 """Module with app middlewares."""
-import json
+import asyncio
+import random
+import re
 import time
 import uuid
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any, Optional
 
 import structlog
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import ClientDisconnect
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics import HTTP_COMPRESSION_BYTES, HTTP_COMPRESSION_DURATION, HTTP_REQUEST_DURATION, HTTP_REQUESTS, \
+    HTTP_REQUESTS_IN_PROGRESS
+from src.utils.compression import StreamCompressor, compress, negotiate, stream_compressor
 
 logger = structlog.stdlib.get_logger('middleware')
 
+# Остальные методы попадают в метрики как OTHER, чтобы клиент не мог раздуть число меток.
+_METRIC_METHODS = frozenset(('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'HEAD', 'OPTIONS'))
 
-def base_http_middleware(app):
-    return BaseHTTPMiddleware(app)
 
+class RequestLoggingMiddleware:
+    """ASGI middleware для логирования запросов и времени ответа.
 
-async def logging_middleware(request: Request, call_next) -> Response:
+    Пишет одну строку лога на запрос: путь, метод, статус, время обработки
+    и (для выборки запросов) начало тела. Тело не буферизуется и не парсится:
+    копируются только первые `max_body_size` байт из тех чанков, которые
+    приложение и так читает, чувствительные поля маскируются регулярным выражением.
     """
-    Промежуточное программное обеспечение для добавления контекста запроса.
 
-    Args:
-        request (Request): Входящий HTTP -запрос.
-        call_next (Callable): The next middleware or route handler to call.
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 1.0,
+        max_body_size: int = 1024,
+        redact_fields: Iterable[str] = (),
+    ):
+        """Initialize RequestLoggingMiddleware.
 
-    Returns:
-        Response: FastAPI response object.
-    """
+        Args:
+            app (ASGIApp): Следующее ASGI-приложение.
+            sample_rate (float): Доля запросов (0..1), которые логируются. Ответы 5xx логируются всегда.
+            max_body_size (int): Сколько байт тела писать в лог, 0 - не писать тело.
+            redact_fields (Iterable[str]): Поля, значения которых маскируются в теле.
+        """
+        self.app = app
+        self.sample_rate = sample_rate
+        self.max_body_size = max_body_size
+        fields = '|'.join(re.escape(field) for field in redact_fields)
+        self._redact_re = re.compile(
+            r'("(?:{fields})"\s*:\s*)"(?:[^"\\]|\\.)*"?|\b((?:{fields})=)[^&\s]*'.format(fields=fields),
+        ) if fields else None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle ASGI call."""
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope['headers']:
+            if name == b'request-id':
+                request_id = value.decode('latin-1')
+                break
+        structlog.contextvars.clear_contextvars()
+        structlog.contextvars.bind_contextvars(request_id=request_id or uuid.uuid4().hex[:8])
 
-    request_id = request.headers.get('request-id', uuid.uuid4().hex[:8])
-    structlog.contextvars.clear_contextvars()
-    structlog.contextvars.bind_contextvars(request_id=request_id)
+        start_time = time.perf_counter()
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate  # noqa: S311
+        body = bytearray() if sampled and self.max_body_size > 0 else None
+        body_truncated = False
+        status_code = 500
+
+        async def receive_wrapper() -> Message:
+            nonlocal body_truncated
+            message = await receive()
+            if body is not None and message['type'] == 'http.request':
+                chunk = message.get('body', b'')
+                free = self.max_body_size - len(body)
+                if len(chunk) > free:
+                    body_truncated = True
+                body.extend(chunk[:free])
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
 
-    try:
-        body = await request.body()
         try:
-            parsed_body = json.loads(body)
-        except json.JSONDecodeError:
-            parsed_body = body.decode("utf-8") if body else None
-    except ClientDisconnect:
-        logger.warning("Клиент отключен в связи с долгим ожиданием")
-        parsed_body = None
+            await self.app(scope, receive_wrapper if body is not None else receive, send_wrapper)
+        finally:
+            if sampled or status_code >= 500:
+                logger.info('[Request] {method} {path}. Status: {status}. Process-Time: {pt}. Body: {body}'.format(
+                    method=scope['method'],
+                    path=scope['path'],
+                    status=status_code,
+                    pt='{:.6f}'.format(time.perf_counter() - start_time),
+                    body=self._format_body(body, body_truncated),
+                ))
+
+    def _format_body(self, body: bytearray | None, truncated: bool) -> str | None:
+        """Декодировать и замаскировать захваченное начало тела."""
+        if not body:
+            return None
+        text = body.decode('utf-8', errors='replace')
+        if self._redact_re is not None:
+            text = self._redact_re.sub(_redact_match, text)
+        return text + '...' if truncated else text
+
+
+class MetricsMiddleware:
+    """ASGI middleware для метрик HTTP: счетчики, гистограммы времени и запросы в работе.
+
+    Маршрут берется из шаблона пути (`/notifications/{notification_id}`), который
+    FastAPI кладет в scope после маршрутизации; запросы без маршрута - `unmatched`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """Initialize MetricsMiddleware.
+
+        Args:
+            app (ASGIApp): Следующее ASGI-приложение.
+        """
+        self.app = app
 
-    logger.info('[Request] Path: {path}. Body: {body}'.format(
-        path=request.url.path,
-        body=parsed_body,
-        )
-    )
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle ASGI call."""
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
 
-    response: Response = await call_next(request)
-    return response
+        method = scope['method'] if scope['method'] in _METRIC_METHODS else 'OTHER'
+        in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start_time = time.perf_counter()
+        status_code = 500
 
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_progress.dec()
+            route = scope.get('route')
+            path = route.path if route is not None else 'unmatched'
+            HTTP_REQUEST_DURATION.labels(method, path).observe(time.perf_counter() - start_time)
+            HTTP_REQUESTS.labels(method, path, status_code).inc()
 
-async def process_time_header_middleware(request: Request, call_next) -> Response:
-    """Добавляет лог с расчетом времени ответа.
 
-    Args:
-        request (Request): Входящий HTTP -запрос.
-        call_next (Callable): Следующий промежуточный обработчик или
-        обработчик маршрута, для вызова.
+class CompressionMiddleware:
+    """ASGI middleware для сжатия JSON-ответов (gzip, brotli, zstd) по Accept-Encoding.
 
-    Returns:
-        Response: HTTP - ответ.
+    Сжимаются только ответы с JSON Content-Type без своего Content-Encoding. Тело целиком
+    меньше `minimum_size` отдается как есть. Потоковый ответ (несколько сообщений body)
+    сжимается по частям: каждая часть сбрасывается сразу, Content-Length убирается.
+    Тела и части от `offload_size` байт сжимаются в потоке из пула по умолчанию,
+    чтобы большая страница не останавливала event loop.
     """
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
 
-    logger.info('[Request] Path: {path}. Process-Time: {pt}'.format(
-        path=request.url.path,
-        pt=str(process_time)
-    ))
-    return response
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: Iterable[str],
+        levels: Mapping[str, int],
+        minimum_size: int = 1024,
+        offload_size: int = 65536,
+    ):
+        """Initialize CompressionMiddleware.
+
+        Args:
+            app (ASGIApp): Следующее ASGI-приложение.
+            encodings (Iterable[str]): Доступные кодировки в порядке предпочтения сервера.
+            levels (Mapping[str, int]): Уровень сжатия для каждой кодировки.
+            minimum_size (int): Минимальный размер тела для сжатия.
+            offload_size (int): С какого размера тела или части сжимать не в event loop.
+        """
+        self.app = app
+        self.encodings = tuple(encodings)
+        self.levels = dict(levels)
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self._raw_bytes = {encoding: HTTP_COMPRESSION_BYTES.labels(encoding, 'raw') for encoding in self.encodings}
+        self._compressed_bytes = {
+            encoding: HTTP_COMPRESSION_BYTES.labels(encoding, 'compressed') for encoding in self.encodings
+        }
+        self._durations = {
+            (encoding, offloaded): HTTP_COMPRESSION_DURATION.labels(encoding, 'true' if offloaded else 'false')
+            for encoding in self.encodings
+            for offloaded in (False, True)
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle ASGI call."""
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get('accept-encoding')
+        encoding = negotiate(accept_encoding, self.encodings) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        level = self.levels[encoding]
+        start: Optional[Message] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message['type'] == 'http.response.start':
+                headers = Headers(raw=message['headers'])
+                if (
+                    message['status'] in (204, 304)
+                    or 'content-encoding' in headers
+                    or not _is_json(headers.get('content-type', ''))
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                # Заголовки зависят от тела, поэтому start ждет первую часть.
+                start = message
+                return
+            if passthrough or message['type'] != 'http.response.body':
+                await send(message)
+                return
+
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if compressor is None:
+                headers = MutableHeaders(scope=start)
+                headers.add_vary_header('Accept-Encoding')
+                if not more_body:
+                    if len(body) >= self.minimum_size:
+                        body = await self._compress(encoding, len(body), compress, encoding, body, level)
+                        headers['Content-Encoding'] = encoding
+                        headers['Content-Length'] = str(len(body))
+                    passthrough = True
+                    await send(start)
+                    await send({'type': 'http.response.body', 'body': body})
+                    return
+                compressor = stream_compressor(encoding, level)
+                headers['Content-Encoding'] = encoding
+                del headers['Content-Length']
+                await send(start)
+
+            chunk = await self._compress(encoding, len(body), compressor.compress, body) if body else b''
+            if not more_body:
+                tail = compressor.finish()
+                self._compressed_bytes[encoding].inc(len(tail))
+                chunk += tail
+            if chunk or not more_body:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _compress(self, encoding: str, size: int, func: Callable[..., bytes], *args: Any) -> bytes:
+        offloaded = size >= self.offload_size
+        started = time.perf_counter()
+        if offloaded:
+            # zlib, brotli и zstandard отпускают GIL, event loop продолжает обслуживать запросы.
+            result = await asyncio.to_thread(func, *args)
+        else:
+            result = func(*args)
+        self._durations[encoding, offloaded].observe(time.perf_counter() - started)
+        self._raw_bytes[encoding].inc(size)
+        self._compressed_bytes[encoding].inc(len(result))
+        return result
+
+
+def _is_json(content_type: str) -> bool:
+    media_type = content_type.partition(';')[0].strip().lower()
+    return media_type == 'application/json' or media_type.endswith('+json')
+
 
+def _redact_match(match: re.Match) -> str:
+    if match.group(1) is not None:
+        return match.group(1) + '"***"'
+    return match.group(2) + '***'
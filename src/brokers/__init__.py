@@ -0,0 +1,27 @@
+"""Брокеры доставки новых уведомлений подписчикам."""
+
+from src.brokers.base import NotificationBroker
+from src.brokers.memory_broker import InMemoryBroker
+from src.brokers.redis_broker import RedisBroker
+from src.choices.service_choices import BrokerBackendChoices
+from src.config.settings import settings
+from src.services.notification_pubsub import notification_pubsub
+
+__all__ = ['InMemoryBroker', 'NotificationBroker', 'RedisBroker', 'create_broker', 'notification_broker']
+
+
+def create_broker(backend: BrokerBackendChoices) -> NotificationBroker:
+    """Создать брокер выбранного типа поверх общей рассылки процесса.
+
+    Args:
+        backend (BrokerBackendChoices): Тип брокера.
+
+    Returns:
+        NotificationBroker: Брокер, который нужно запустить через `start()`.
+    """
+    if backend == BrokerBackendChoices.redis:
+        return RedisBroker(local=notification_pubsub, channel_prefix=settings.broker.BROKER_CHANNEL_PREFIX)
+    return InMemoryBroker(local=notification_pubsub)
+
+
+notification_broker = create_broker(settings.broker.BROKER_BACKEND)
@@ -0,0 +1,48 @@
+"""Базовый класс брокера уведомлений."""
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Sequence
+from contextlib import AbstractAsyncContextManager
+
+from src.choices.service_choices import BrokerBackendChoices
+from src.rest_models.notification_schema import NotificationRead
+from src.services.notification_pubsub import NotificationPubSub, Subscription
+
+
+class NotificationBroker(ABC):
+    """Доставка новых уведомлений подписчикам (SSE, WebSocket) всех процессов сервера.
+
+    Подписчики всегда читают из локального `NotificationPubSub` процесса,
+    брокер отвечает за то, чтобы событие дошло до него из любого процесса.
+    """
+
+    backend: BrokerBackendChoices
+
+    def __init__(self, local: NotificationPubSub):
+        """Initialize NotificationBroker.
+
+        Args:
+            local (NotificationPubSub): Рассылка подписчикам внутри процесса.
+        """
+        self.local = local
+
+    async def start(self) -> None:
+        """Подготовить брокер к работе (вызывается при старте приложения)."""
+
+    async def stop(self) -> None:
+        """Освободить ресурсы брокера (вызывается при остановке приложения)."""
+
+    @abstractmethod
+    async def publish(self, events: Sequence[NotificationRead]) -> None:
+        """Разослать уведомления подписчикам их пользователей."""
+
+    @abstractmethod
+    async def subscribed_users(self, user_ids: Iterable[int]) -> set[int]:
+        """Пользователи из `user_ids`, у которых есть подписчики хотя бы в одном процессе."""
+
+    def subscribe(self, user_id: int) -> AbstractAsyncContextManager[Subscription]:
+        """Подписаться на уведомления пользователя на время контекста."""
+        return self.local.subscribe(user_id)
+
+    def stats(self) -> dict:
+        return {'backend': self.backend.value, **self.local.stats()}
@@ -0,0 +1,23 @@
+"""Брокер уведомлений внутри одного процесса."""
+
+from collections.abc import Iterable, Sequence
+
+from src.brokers.base import NotificationBroker
+from src.choices.service_choices import BrokerBackendChoices
+from src.rest_models.notification_schema import NotificationRead
+
+
+class InMemoryBroker(NotificationBroker):
+    """Брокер без внешних зависимостей: события доходят только до подписчиков этого процесса.
+
+    Подходит для одного воркера и локальной разработки.
+    """
+
+    backend = BrokerBackendChoices.memory
+
+    async def publish(self, events: Sequence[NotificationRead]) -> None:
+        for event in events:
+            self.local.publish(event)
+
+    async def subscribed_users(self, user_ids: Iterable[int]) -> set[int]:
+        return {user_id for user_id in user_ids if self.local.has_subscribers(user_id)}
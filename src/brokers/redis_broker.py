@@ -0,0 +1,144 @@
+"""Брокер уведомлений через Redis pub/sub."""
+
+import asyncio
+from collections import Counter
+from collections.abc import AsyncIterator, Iterable, Sequence
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import structlog
+
+from src.brokers.base import NotificationBroker
+from src.choices.service_choices import BrokerBackendChoices
+from src.redis_client import get_redis_client
+from src.rest_models.notification_schema import NotificationRead
+from src.services.notification_pubsub import NotificationPubSub, Subscription
+
+logger = structlog.stdlib.get_logger('broker')
+
+
+class RedisBroker(NotificationBroker):
+    """Брокер для нескольких воркеров: канал Redis на пользователя.
+
+    Процесс подписан на канал `{prefix}:{user_id}`, пока у него есть локальные
+    подписчики этого пользователя. Публикующий процесс не рассылает событие сам,
+    оно приходит ему из Redis, как и остальным процессам.
+    """
+
+    backend = BrokerBackendChoices.redis
+
+    # Сколько ждать сообщения в фоновом цикле чтения и пауза после ошибки Redis.
+    poll_timeout = 1.0
+    retry_delay = 1.0
+
+    def __init__(self, local: NotificationPubSub, channel_prefix: str):
+        """Initialize RedisBroker.
+
+        Args:
+            local (NotificationPubSub): Рассылка подписчикам внутри процесса.
+            channel_prefix (str): Префикс каналов Redis.
+        """
+        super().__init__(local)
+        self.channel_prefix = channel_prefix
+        self._client = None
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+        self._channel_refs: Counter[int] = Counter()
+        self.received = 0
+        self.errors = 0
+
+    async def start(self) -> None:
+        self._client = await get_redis_client()
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.connect()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+
+    async def publish(self, events: Sequence[NotificationRead]) -> None:
+        """Опубликовать события одним pipeline.
+
+        Уведомления к этому моменту уже сохранены, поэтому ошибка Redis
+        только логируется: подписчики догонят пропущенное по Last-Event-ID.
+        """
+        if not events:
+            return
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                for event in events:
+                    pipe.publish(self._channel(event.user_id), event.model_dump_json())
+                await pipe.execute()
+        except Exception:
+            self.errors += 1
+            logger.exception('Ошибка публикации уведомлений в Redis')
+
+    async def subscribed_users(self, user_ids: Iterable[int]) -> set[int]:
+        channels = {self._channel(user_id): user_id for user_id in user_ids}
+        if not channels:
+            return set()
+        try:
+            counts = await self._client.pubsub_numsub(*channels)
+        except Exception:
+            self.errors += 1
+            logger.exception('Ошибка запроса подписчиков в Redis')
+            return set(channels.values())
+        return {channels[channel.decode()] for channel, count in counts if count}
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[Subscription]:
+        channel = self._channel(user_id)
+        async with self.local.subscribe(user_id) as subscription:
+            self._channel_refs[user_id] += 1
+            try:
+                if self._channel_refs[user_id] == 1:
+                    await self._pubsub.subscribe(channel)
+                yield subscription
+            finally:
+                self._channel_refs[user_id] -= 1
+                if not self._channel_refs[user_id]:
+                    del self._channel_refs[user_id]
+                    try:
+                        await self._pubsub.unsubscribe(channel)
+                    except Exception:
+                        self.errors += 1
+                        logger.exception('Ошибка отписки от канала Redis')
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            'channels': len(self._channel_refs),
+            'received': self.received,
+            'errors': self.errors,
+        }
+
+    def _channel(self, user_id: int) -> str:
+        return '{prefix}:{user_id}'.format(prefix=self.channel_prefix, user_id=user_id)
+
+    async def _listen(self) -> None:
+        """Передает сообщения из каналов Redis локальным подписчикам."""
+        while True:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=self.poll_timeout,
+                )
+            except Exception:
+                # Соединение переподключается и заново подписывается на каналы при следующем чтении.
+                self.errors += 1
+                logger.exception('Ошибка чтения из Redis pub/sub')
+                await asyncio.sleep(self.retry_delay)
+                continue
+            if message is None or message['type'] != 'message':
+                continue
+            self.received += 1
+            self.local.publish(NotificationRead.model_validate_json(message['data']))
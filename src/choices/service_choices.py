@@ -9,3 +9,40 @@ class OperatingModeChoices(str, Enum):
     iif_mode = 'iif_mode'
     local_mode = 'local_mode'
     domain_mode = 'domain_mode'
+
+
+class LogOverflowPolicyChoices(str, Enum):
+    """Log queue overflow policy choices."""
+
+    drop_debug = 'drop_debug'
+    drop_new = 'drop_new'
+    block = 'block'
+
+
+class LogProfileChoices(str, Enum):
+    """Logging processor profile choices."""
+
+    default = 'default'
+    production = 'production'
+
+
+class IngestModeChoices(str, Enum):
+    """Notification create mode choices."""
+
+    direct = 'direct'
+    buffered = 'buffered'
+    accepted = 'accepted'
+
+
+class BrokerBackendChoices(str, Enum):
+    """Notification broker backend choices."""
+
+    memory = 'memory'
+    redis = 'redis'
+
+
+class ReplicaPinStoreChoices(str, Enum):
+    """Read-your-writes pin store choices."""
+
+    memory = 'memory'
+    redis = 'redis'
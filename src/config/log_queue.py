@@ -0,0 +1,198 @@
+"""Модуль с неблокирующей доставкой логов.
+
+Обработчики, которые пишут в файл и консоль, вызываются не в потоке,
+который логирует (event loop), а в фоновом потоке. Записи передаются
+через ограниченную очередь; при переполнении часть записей отбрасывается
+по настроенной политике, вместо того чтобы останавливать event loop.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from collections.abc import Iterable
+from typing import Optional
+
+import structlog
+
+from src.choices.service_choices import LogOverflowPolicyChoices
+from src.config.settings import settings
+
+_STOP = object()
+_exception_formatter = logging.Formatter()
+
+
+class LogQueue:
+    """Ограниченная очередь записей лога с фоновым потоком-обработчиком."""
+
+    # Доля заполнения очереди, после которой политика drop_debug отбрасывает DEBUG-записи.
+    debug_watermark = 0.8
+    # Сколько ждать места в очереди при политике block.
+    block_timeout = 1.0
+
+    def __init__(self, maxsize: int, overflow_policy: LogOverflowPolicyChoices):
+        """Initialize LogQueue.
+
+        Args:
+            maxsize (int): Максимальное количество записей в очереди.
+            overflow_policy (LogOverflowPolicyChoices): Что делать при заполнении очереди.
+        """
+        self.maxsize = maxsize
+        self.overflow_policy = overflow_policy
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.queued = 0
+        self.dropped: dict[str, int] = {}
+        atexit.register(self.stop)
+
+    def enqueue(self, record: logging.LogRecord, handlers: tuple[logging.Handler, ...]) -> None:
+        """Поставить запись в очередь на обработку указанными обработчиками.
+
+        Args:
+            record (logging.LogRecord): Запись лога.
+            handlers (tuple[logging.Handler, ...]): Обработчики, которые выводят запись.
+        """
+        if self._pid != os.getpid():
+            self._start()
+        log_queue = self._queue
+        item = (record, handlers)
+        try:
+            if (
+                self.overflow_policy == LogOverflowPolicyChoices.drop_debug
+                and record.levelno <= logging.DEBUG
+                and log_queue.qsize() >= self.maxsize * self.debug_watermark
+            ):
+                raise queue.Full
+            if self.overflow_policy == LogOverflowPolicyChoices.block:
+                log_queue.put(item, timeout=self.block_timeout)
+            else:
+                log_queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+            return
+        with self._stats_lock:
+            self.queued += 1
+
+    def stop(self) -> None:
+        """Дописать записи из очереди и остановить фоновый поток."""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout=5)
+        self._thread = None
+        self._pid = None
+
+    def stats(self) -> dict:
+        """Статистика очереди.
+
+        Returns:
+            dict: Текущий размер очереди, всего поставлено и отброшено по уровням.
+        """
+        with self._stats_lock:
+            return {
+                'size': self._queue.qsize() if self._queue is not None else 0,
+                'maxsize': self.maxsize,
+                'overflow_policy': self.overflow_policy.value,
+                'queued': self.queued,
+                'dropped': dict(self.dropped),
+            }
+
+    def _start(self) -> None:
+        # Поток и очередь создаются лениво и заново после fork (воркеры gunicorn).
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._thread = threading.Thread(target=self._listen, args=(self._queue,), name='log-listener', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _listen(self, log_queue: queue.Queue) -> None:
+        while True:
+            item = log_queue.get()
+            if item is _STOP:
+                return
+            record, handlers = item
+            for handler in handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+
+class QueueingHandler(logging.Handler):
+    """Обработчик, который передает записи в `LogQueue` для фонового вывода.
+
+    Подходит и для `logging.config.dictConfig`: обработчики можно передать по имени,
+    если они объявлены раньше (dictConfig создает обработчики в порядке имен).
+
+    Записи structlog уже прошли процессоры в вызывающем потоке. У остальных записей
+    (uvicorn, `logging.getLogger`) здесь же, до очереди, сохраняются contextvars
+    (`record.log_context`), подставляются аргументы в сообщение и рендерится
+    исключение, как в `logging.handlers.QueueHandler.prepare`. Время берется
+    процессорами из `record.created`.
+    """
+
+    def __init__(
+        self,
+        handlers: Iterable,
+        log_queue: Optional[LogQueue] = None,
+        level: int = logging.NOTSET,
+        keep_args: bool = False,
+    ):
+        """Initialize QueueingHandler.
+
+        Args:
+            handlers (Iterable): Обработчики или их имена, которые выводят запись.
+            log_queue (LogQueue): Очередь, по умолчанию общая очередь процесса.
+            level (int): Уровень обработчика.
+            keep_args (bool): Не подставлять `record.args` в сообщение: их читает форматтер
+                с `pass_foreign_args` (access-лог uvicorn).
+        """
+        super().__init__(level=level)
+        # Имена разрешаются сразу: logging хранит обработчики по слабым ссылкам,
+        # и без ссылки отсюда обработчики из dictConfig удалит сборщик мусора.
+        self.handlers = tuple(_resolve_handler(handler) for handler in handlers)
+        self.log_queue = log_queue or default_log_queue
+        self.keep_args = keep_args
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Поставить запись в очередь."""
+        # Записи structlog не трогаем: msg - уже готовый словарь события (wrap_for_formatter).
+        try:
+            if not hasattr(record, '_logger'):
+                self._prepare_foreign(record)
+            self.log_queue.enqueue(record, self.handlers)
+        except Exception:
+            self.handleError(record)
+
+    def _prepare_foreign(self, record: logging.LogRecord) -> None:
+        record.log_context = structlog.contextvars.get_contextvars()
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        if self.keep_args:
+            # Аргументы access-лога uvicorn - неизменяемые значения, достаточно зафиксировать кортеж.
+            record.args = tuple(record.args or ())
+        else:
+            record.msg = record.getMessage()
+            record.args = ()
+
+
+def _resolve_handler(handler: logging.Handler | str) -> logging.Handler:
+    if not isinstance(handler, str):
+        return handler
+    resolved = logging.getHandlerByName(handler)
+    if resolved is None:
+        raise ValueError('Unable to find handler {name!r}'.format(name=handler))
+    return resolved
+
+
+default_log_queue = LogQueue(
+    maxsize=settings.logging.LOG_QUEUE_SIZE,
+    overflow_policy=settings.logging.LOG_QUEUE_OVERFLOW,
+)
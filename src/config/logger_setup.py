@@ -5,14 +5,19 @@
 и различные процессоры для форматирования и обогащения сообщений журнала.
 """
 
+import datetime
 import logging
 import logging.handlers as logging_handlers
 import sys
 import os
+from pathlib import Path
+from typing import Optional
 
 import structlog
 from structlog.types import EventDict, Processor
 
+from src.choices.service_choices import LogProfileChoices
+from src.config.log_queue import QueueingHandler
 from src.config.settings import settings
 
 
@@ -20,29 +25,98 @@ def configure_logger(
     level=logging.DEBUG,
     json_console_format: bool = False,
     json_file_format: bool = True,
+    profile: LogProfileChoices = LogProfileChoices.default,
+    per_process_file: bool = False,
 ):
     """Настройте регистратор с указанными настройками.
 
+    Файловый и консольный обработчики вызываются в фоновом потоке:
+    корневой логгер только ставит записи в ограниченную очередь (см. `log_queue`).
+
+    В профиле `production` место вызова не собирается, а файл и консоль
+    используют один форматтер: запись рендерится один раз в формате файла.
+
     Args:
         level (int): Logging level.
         json_console_format (bool): Flag to enable JSON formatting for console logs.
         json_file_format (bool): Flag to enable JSON formatting for file logs.
+        profile (LogProfileChoices): Processor profile.
+        per_process_file (bool): Write a separate log file per process (several workers).
     """
-    _configure_structlog(level=level, json_format=json_console_format)
-    _configure_default_file_logging(level=level, json_format=json_file_format)
-    _configure_default_console_logging(level=level, json_format=json_console_format)
+    if profile == LogProfileChoices.production:
+        json_console_format = json_file_format
+        shared_formatter = build_production_formatter(level=level, json_format=json_file_format)
+    else:
+        shared_formatter = None
+
+    _configure_structlog(level=level, json_format=json_console_format, profile=profile)
+    file_handler = _configure_default_file_logging(
+        level=level,
+        json_format=json_file_format,
+        formatter=shared_formatter,
+        per_process=per_process_file,
+    )
+    stream_handler = _configure_default_console_logging(
+        level=level,
+        json_format=json_console_format,
+        formatter=shared_formatter,
+    )
+
+    root_logger = logging.getLogger()
+    root_logger.addHandler(QueueingHandler(handlers=[file_handler, stream_handler]))
+
+
+class ProcessRotatingFileHandler(logging_handlers.RotatingFileHandler):
+    """RotatingFileHandler, который при `per_process=True` пишет в свой файл на процесс.
 
+    Ротация RotatingFileHandler не согласована между процессами, поэтому
+    каждый воркер пишет в `<имя>.<pid><расширение>` рядом с `filename`.
+    """
 
-def build_default_processors(level: int, json_format: bool):
+    def __init__(self, filename: str | os.PathLike, per_process: bool = False, **kwargs):
+        """Initialize ProcessRotatingFileHandler.
+
+        Args:
+            filename (str | os.PathLike): Путь файла лога.
+            per_process (bool): Добавить pid процесса к имени файла.
+            **kwargs: Аргументы RotatingFileHandler.
+        """
+        path = Path(filename)
+        if per_process:
+            path = path.with_name('{stem}.{pid}{suffix}'.format(stem=path.stem, pid=os.getpid(), suffix=path.suffix))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(filename=path, **kwargs)
+
+
+def build_default_processors(
+    level: int,
+    json_format: bool,
+    profile: LogProfileChoices = LogProfileChoices.default,
+):
     """Build the default processors for structlog.
 
     Args:
         level (int): Logging level.
         json_format (bool): Flag to enable JSON formatting.
+        profile (LogProfileChoices): Processor profile, `production` skips callsite parameters.
 
     Returns:
         List[Processor]: List of structlog processors.
     """
+    if profile == LogProfileChoices.production:
+        # Без CallsiteParameterAdder: он обходит стек на каждый вызов логгера.
+        # Исключения рендерятся здесь, т.к. ConsoleRenderer в этом профиле не используется.
+        return [
+            merge_record_contextvars,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            _drop_color_message_key,
+            add_record_timestamp,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            _add_record_exception,
+        ]
+
     callsite_parameters = {
         structlog.processors.CallsiteParameter.MODULE,
         structlog.processors.CallsiteParameter.FILENAME,
@@ -58,20 +132,110 @@ def build_default_processors(level: int, json_format: bool):
     if level == logging.DEBUG:
         callsite_parameters.update(callsite_debug_parameters)
     shared_processors: list[Processor] = [
-        structlog.contextvars.merge_contextvars,
+        merge_record_contextvars,
         structlog.stdlib.add_logger_name,
         structlog.stdlib.add_log_level,
         structlog.processors.CallsiteParameterAdder(callsite_parameters),
         _drop_color_message_key,
-        structlog.processors.TimeStamper(fmt='iso'),
+        add_record_timestamp,
         structlog.processors.StackInfoRenderer(),
     ]
     if json_format:
         shared_processors.append(structlog.processors.format_exc_info)
+    shared_processors.append(_add_record_exception)
 
     return shared_processors
 
 
+def merge_record_contextvars(logger, method_name: str, event_dict: EventDict) -> EventDict:
+    """Merge contextvars captured by `QueueingHandler` in the logging thread.
+
+    Записи не из structlog форматируются в потоке `log_queue`, где contextvars
+    запроса уже нет. Без сохраненного контекста (вызов structlog) работает как
+    `structlog.contextvars.merge_contextvars`.
+
+    Args:
+        logger: Wrapped logger.
+        method_name (str): Method name.
+        event_dict (EventDict): Event dictionary.
+
+    Returns:
+        EventDict: Event dictionary with context values (explicit keys win).
+    """
+    context = getattr(event_dict.get('_record'), 'log_context', None)
+    if context is None:
+        return structlog.contextvars.merge_contextvars(logger, method_name, event_dict)
+    return {**context, **event_dict}
+
+
+def add_record_timestamp(_, __, event_dict: EventDict) -> EventDict:
+    """Add an ISO timestamp (UTC) of the moment the record was created, not formatted.
+
+    Args:
+        event_dict (EventDict): Event dictionary.
+
+    Returns:
+        EventDict: Event dictionary with `timestamp`, same format as `TimeStamper(fmt='iso')`.
+    """
+    record = event_dict.get('_record')
+    if record is not None:
+        moment = datetime.datetime.fromtimestamp(record.created, tz=datetime.timezone.utc)
+    else:
+        moment = datetime.datetime.now(tz=datetime.timezone.utc)
+    event_dict['timestamp'] = moment.isoformat().replace('+00:00', 'Z')
+    return event_dict
+
+
+def _add_record_exception(_, __, event_dict: EventDict) -> EventDict:
+    """Add the traceback rendered by `QueueingHandler` in the logging thread."""
+    record = event_dict.get('_record')
+    if record is not None and record.exc_text and 'exception' not in event_dict:
+        event_dict['exception'] = record.exc_text
+    return event_dict
+
+
+class CachingProcessorFormatter(structlog.stdlib.ProcessorFormatter):
+    """ProcessorFormatter, который рендерит запись один раз для всех своих обработчиков.
+
+    Результат сохраняется в самой записи, поэтому обработчики с общим
+    экземпляром форматтера (файл и консоль) не запускают цепочку процессоров повторно.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format the record or return the result rendered for another handler."""
+        rendered = record.__dict__.get('_rendered_by_formatter')
+        if rendered is not None and rendered[0] is self:
+            return rendered[1]
+        result = super().format(record)
+        record._rendered_by_formatter = (self, result)
+        return result
+
+
+def build_production_formatter(level: int, json_format: bool) -> CachingProcessorFormatter:
+    """Build the shared formatter of the `production` profile.
+
+    Args:
+        level (int): Logging level.
+        json_format (bool): Flag to enable JSON formatting, otherwise logfmt.
+
+    Returns:
+        CachingProcessorFormatter: Formatter for file and console handlers.
+    """
+    return CachingProcessorFormatter(
+        foreign_pre_chain=build_default_processors(level, json_format, LogProfileChoices.production),
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            _build_renderer(json_format),
+        ],
+    )
+
+
+def _build_renderer(json_format: bool) -> Processor:
+    if json_format:
+        return structlog.processors.JSONRenderer()
+    return structlog.processors.LogfmtRenderer()
+
+
 def _drop_color_message_key(_, __, event_dict: EventDict) -> EventDict:
     """Drop the 'color_message' key from the event dictionary if it exists.
 
@@ -85,49 +249,60 @@ def _drop_color_message_key(_, __, event_dict: EventDict) -> EventDict:
     return event_dict
 
 
-def _configure_structlog(*, level, json_format):
+def _configure_structlog(*, level, json_format, profile=LogProfileChoices.default):
     """Configure structlog with the specified settings.
 
     Args:
         level (int): Logging level.
         json_format (bool): Flag to enable JSON formatting.
+        profile (LogProfileChoices): Processor profile.
     """
+    processors = build_default_processors(level, json_format, profile)
+    if profile == LogProfileChoices.production:
+        # Отключенные уровни отбрасываются до запуска процессоров.
+        processors.insert(0, structlog.stdlib.filter_by_level)
     structlog.configure_once(
-        processors=build_default_processors(level, json_format)
+        processors=processors
                    + [
                        # used for integration with default logging
                        structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
                    ],
         logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=profile == LogProfileChoices.production,
     )
 
 
-def _configure_default_file_logging(*, level, json_format) -> None:
+def _configure_default_file_logging(
+    *,
+    level,
+    json_format,
+    formatter: Optional[logging.Formatter] = None,
+    per_process: bool = False,
+) -> logging.Handler:
     """Configure default file logging with the specified settings.
 
     Args:
         level (int): Logging level.
         json_format (bool): Flag to enable JSON formatting.
-    """
-    if json_format:
-        log_renderer = structlog.processors.JSONRenderer()
-    else:
-        log_renderer = structlog.processors.LogfmtRenderer()  # type: ignore
-
-    shared_processors = build_default_processors(level, json_format)
-    formatter = structlog.stdlib.ProcessorFormatter(
-        foreign_pre_chain=shared_processors,
-        processors=[
-            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-            log_renderer,
-        ],
-    )
-
-    log_path = settings.logging.LOG_FILE
-    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+        formatter (logging.Formatter): Ready formatter, by default built from `json_format`.
+        per_process (bool): Write a separate log file for the current process.
 
-    file_handler = logging_handlers.RotatingFileHandler(
-        filename=log_path,
+    Returns:
+        logging.Handler: File handler, not attached to any logger.
+    """
+    if formatter is None:
+        shared_processors = build_default_processors(level, json_format)
+        formatter = structlog.stdlib.ProcessorFormatter(
+            foreign_pre_chain=shared_processors,
+            processors=[
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                _build_renderer(json_format),
+            ],
+        )
+
+    file_handler = ProcessRotatingFileHandler(
+        filename=settings.logging.LOG_FILE,
+        per_process=per_process,
         maxBytes=settings.logging.LOG_SIZE,
         backupCount=settings.logging.LOG_BACKUP_COUNT,
         mode='a',
@@ -137,34 +312,46 @@ def _configure_default_file_logging(*, level, json_format) -> None:
     file_handler.setFormatter(formatter)
 
     root_logger = logging.getLogger()
-    root_logger.addHandler(file_handler)
     root_logger.setLevel(settings.logging.LOGGING_LEVEL)
+    return file_handler
 
 
-def _configure_default_console_logging(*, level, json_format: bool):
+def _configure_default_console_logging(
+    *,
+    level,
+    json_format: bool,
+    formatter: Optional[logging.Formatter] = None,
+) -> logging.Handler:
     """Configure default console logging with the specified settings.
 
     Args:
         level (int): Logging level.
         json_format (bool): Flag to enable JSON formatting.
-    """
-    renderer_processor = (
-        structlog.processors.JSONRenderer()
-        if json_format
-        else structlog.dev.ConsoleRenderer()
-    )
+        formatter (logging.Formatter): Ready formatter, by default built from `json_format`.
 
-    formatter = structlog.stdlib.ProcessorFormatter(
-        processors=build_default_processors(level, json_format)
-                   + [
-                       structlog.stdlib.ProcessorFormatter.remove_processors_meta,
-                       renderer_processor,
-                   ],
-    )
+    Returns:
+        logging.Handler: Console handler, not attached to any logger.
+    """
+    if formatter is None:
+        renderer_processor = (
+            structlog.processors.JSONRenderer()
+            if json_format
+            else structlog.dev.ConsoleRenderer()
+        )
+
+        # Записи structlog уже прошли общие процессоры в вызывающем потоке,
+        # в потоке log_queue они повторно не выполняются (иначе callsite и время были бы чужими).
+        formatter = structlog.stdlib.ProcessorFormatter(
+            foreign_pre_chain=build_default_processors(level, json_format),
+            processors=[
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                renderer_processor,
+            ],
+        )
 
     stream_handler = logging.StreamHandler(stream=sys.stdout)
     stream_handler.setFormatter(formatter)
 
     root_logger = logging.getLogger()
-    root_logger.addHandler(stream_handler)
     root_logger.setLevel(level)
+    return stream_handler
@@ -4,6 +4,9 @@ from pathlib import Path
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
 
+from src.choices.service_choices import BrokerBackendChoices, IngestModeChoices, LogOverflowPolicyChoices, \
+    LogProfileChoices, ReplicaPinStoreChoices
+
 
 class Settings(BaseSettings):
 
@@ -21,12 +24,20 @@ class ServerSettings(Settings):
     SERVER_HOST: str = Field(default='0.0.0.0', env='SERVER_HOST')
     SERVER_PORT: int = Field(default='8000', env='SERVER_PORT')
     DEBUG: bool = Field(default=False, env="DEBUG")
+    # 0 - по одному воркеру на каждый доступный процессу CPU.
+    SERVER_WORKERS: int = Field(default=1, env='SERVER_WORKERS')
+    SERVER_LOOP: str = Field(default='uvloop', env='SERVER_LOOP')
+    SERVER_HTTP: str = Field(default='httptools', env='SERVER_HTTP')
+    KEEP_ALIVE_TIMEOUT: int = Field(default=5, env='KEEP_ALIVE_TIMEOUT')
+    BACKLOG: int = Field(default=2048, env='BACKLOG')
+    # Максимум одновременных соединений и задач на воркер, сверх него - 503 (0 - без лимита).
+    LIMIT_CONCURRENCY: int = Field(default=0, env='LIMIT_CONCURRENCY')
     # ALLOW_CREDENTIALS: bool = Field(default=False, env="ALLOW_CREDENTIALS")
     # ALLOW_HEADERS: str = Field(default=False, env="ALLOW_HEADERS")
     # ALLOW_METHODS: str = Field(default=False, env="ALLOW_METHODS")
     # ALLOW_ORIGINS: List[str] = Field(default=False, env="ALLOW_ORIGINS")
-    # GUNICORN_WORKERS: int = Field(default=1, env='GUNICORN_WORKERS')
-    # GUNICORN_TIMEOUT: int = Field(default=60, env='GUNICORN_TIMEOUT')
+    # Сколько секунд ждать открытые соединения (потоки SSE) при остановке сервера.
+    GRACEFUL_SHUTDOWN_TIMEOUT: int = Field(default=10, env='GRACEFUL_SHUTDOWN_TIMEOUT')
     STATIC_FOLDER: Path = Field(default='src/static', env='STATIC_FOLDER')
 
 
@@ -42,6 +53,18 @@ class LoggingSettings(Settings):
     LOG_SIZE: str | int = Field(default='10m', env='LOG_SIZE')
     LOG_FILE: Path = Field(default='logs/logg.log', env='LOG_FILE')
     LOG_FOLDER: Path = Field(default='/', env='LOG_FOLDER')
+    LOG_PROFILE: LogProfileChoices = Field(default=LogProfileChoices.default, env='LOG_PROFILE')
+    LOG_QUEUE_SIZE: int = Field(default=10000, env='LOG_QUEUE_SIZE')
+    LOG_QUEUE_OVERFLOW: LogOverflowPolicyChoices = Field(
+        default=LogOverflowPolicyChoices.drop_debug,
+        env='LOG_QUEUE_OVERFLOW',
+    )
+    REQUEST_LOG_SAMPLE_RATE: float = Field(default=1.0, env='REQUEST_LOG_SAMPLE_RATE')
+    REQUEST_LOG_MAX_BODY: int = Field(default=1024, env='REQUEST_LOG_MAX_BODY')
+    REQUEST_LOG_REDACT_FIELDS: str = Field(
+        default='password,access_token,refresh_token,token',
+        env='REQUEST_LOG_REDACT_FIELDS',
+    )
 
     def __init__(self, **configuration):
         """Initialize LoggingSettings with logging folder creation."""
@@ -76,6 +99,28 @@ class DatabaseSettings(Settings):
     DB_HOST: str = Field(default='db', env='DB_HOST')
     DB_PORT: int = Field(default=5432, env='DB_PORT')
     DB_ENGINE: str = Field(default='postgres', env='DB_ENGINE')
+    # Схема поддерживается миграциями aerich, автогенерация только для локальных экспериментов.
+    DB_GENERATE_SCHEMAS: bool = Field(default=False, env='DB_GENERATE_SCHEMAS')
+    # Пул соединений asyncpg, размеры - на один процесс-воркер.
+    DB_POOL_MIN_SIZE: int = Field(default=1, env='DB_POOL_MIN_SIZE')
+    DB_POOL_MAX_SIZE: int = Field(default=5, env='DB_POOL_MAX_SIZE')
+    DB_POOL_MAX_INACTIVE_LIFETIME: float = Field(default=300, env='DB_POOL_MAX_INACTIVE_LIFETIME')
+    # 0 отключает кеш подготовленных выражений (нужно за pgbouncer в режиме transaction).
+    DB_STATEMENT_CACHE_SIZE: int = Field(default=100, env='DB_STATEMENT_CACHE_SIZE')
+    # Сколько секунд ждать свободное соединение, затем 503 (0 - ждать без ограничения).
+    DB_POOL_ACQUIRE_TIMEOUT: float = Field(default=10, env='DB_POOL_ACQUIRE_TIMEOUT')
+    # Реплика для чтения списков уведомлений: задается хостом или именем БД (для SQLite - файлом),
+    # незаданные параметры берутся у основной БД. Пусто - реплики нет.
+    DB_REPLICA_HOST: str = Field(default='', env='DB_REPLICA_HOST')
+    DB_REPLICA_PORT: int = Field(default=0, env='DB_REPLICA_PORT')
+    DB_REPLICA_NAME: str = Field(default='', env='DB_REPLICA_NAME')
+    # Сколько секунд после записи пользователь читает с основной БД (read-your-writes).
+    DB_READ_YOUR_WRITES_WINDOW: float = Field(default=5, env='DB_READ_YOUR_WRITES_WINDOW')
+    # Где хранить отметки о записи: memory - в памяти процесса (только один воркер), redis - общие для воркеров.
+    DB_READ_YOUR_WRITES_STORE: ReplicaPinStoreChoices = Field(
+        default=ReplicaPinStoreChoices.memory,
+        env='DB_READ_YOUR_WRITES_STORE',
+    )
 
     @property
     def DATABASE_URL(self) -> str:
@@ -83,6 +128,11 @@ class DatabaseSettings(Settings):
         return (f'{self.DB_ENGINE}://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DB_HOST}:'
                 f'{self.DB_PORT}/{self.DB_NAME}')
 
+    @property
+    def HAS_REPLICA(self) -> bool:
+
+        return bool(self.DB_REPLICA_HOST or self.DB_REPLICA_NAME)
+
 
 class TokenSettings(Settings):
     """Model with auth token settings."""
@@ -96,6 +146,95 @@ class TokenSettings(Settings):
     # DATETIME_FORMAT: str
 
 
+class HashingSettings(Settings):
+    """Model with password hashing settings."""
+
+    __conf_name__ = 'hashing'
+
+    BCRYPT_ROUNDS: int = Field(default=12, env='BCRYPT_ROUNDS')
+    HASHING_WORKERS: int = Field(default=2, env='HASHING_WORKERS')
+    HASHING_QUEUE_LIMIT: int = Field(default=32, env='HASHING_QUEUE_LIMIT')
+
+
+class NotificationSettings(Settings):
+    """Model with notifications settings."""
+
+    __conf_name__ = 'notifications'
+
+    COUNTER_RECONCILE_INTERVAL: int = Field(default=3600, env='COUNTER_RECONCILE_INTERVAL')
+    COUNTER_RECONCILE_BATCH_SIZE: int = Field(default=500, env='COUNTER_RECONCILE_BATCH_SIZE')
+    BATCH_MAX_ITEMS: int = Field(default=10000, env='BATCH_MAX_ITEMS')
+    BATCH_CHUNK_SIZE: int = Field(default=1000, env='BATCH_CHUNK_SIZE')
+    # Токен продюсера, которому можно создавать уведомления другим пользователям (пусто - никому).
+    BATCH_PRODUCER_TOKEN: str = Field(default='', env='BATCH_PRODUCER_TOKEN')
+    DELETE_CHUNK_SIZE: int = Field(default=1000, env='DELETE_CHUNK_SIZE')
+    STREAM_QUEUE_SIZE: int = Field(default=100, env='STREAM_QUEUE_SIZE')
+    STREAM_HEARTBEAT_INTERVAL: float = Field(default=15, env='STREAM_HEARTBEAT_INTERVAL')
+    STREAM_BACKFILL_BATCH: int = Field(default=100, env='STREAM_BACKFILL_BATCH')
+    WS_SEND_TIMEOUT: float = Field(default=5, env='WS_SEND_TIMEOUT')
+    # Отдавать список и созданное уведомление без повторной валидации response_model (orjson, если установлен).
+    FAST_JSON_RESPONSES: bool = Field(default=False, env='FAST_JSON_RESPONSES')
+    # С FAST_JSON_RESPONSES страницы больше LIST_CHUNK_SIZE читаются из БД и отдаются пачками.
+    LIST_CHUNK_SIZE: int = Field(default=250, env='LIST_CHUNK_SIZE')
+    # direct - INSERT на каждый POST, buffered/accepted - через буфер записи (см. src.services.ingest_buffer).
+    INGEST_MODE: IngestModeChoices = Field(default=IngestModeChoices.direct, env='INGEST_MODE')
+    INGEST_FLUSH_INTERVAL_MS: int = Field(default=20, env='INGEST_FLUSH_INTERVAL_MS')
+    INGEST_MAX_BATCH: int = Field(default=500, env='INGEST_MAX_BATCH')
+    INGEST_MAX_PENDING: int = Field(default=10000, env='INGEST_MAX_PENDING')
+    # Окно группировки уведомлений с group_key в секундах, 0 - без группировки.
+    AGGREGATION_WINDOW: int = Field(default=0, env='AGGREGATION_WINDOW')
+    AGGREGATION_TYPES: str = Field(default='like,repost', env='AGGREGATION_TYPES')
+
+
+class BrokerSettings(Settings):
+    """Model with notification broker settings."""
+
+    __conf_name__ = 'broker'
+
+    BROKER_BACKEND: BrokerBackendChoices = Field(default=BrokerBackendChoices.memory, env='BROKER_BACKEND')
+    REDIS_URL: str = Field(default='redis://localhost:6379/0', env='REDIS_URL')
+    BROKER_CHANNEL_PREFIX: str = Field(default='notifications', env='BROKER_CHANNEL_PREFIX')
+
+
+class CacheSettings(Settings):
+    """Model with in-process cache settings."""
+
+    __conf_name__ = 'cache'
+
+    USER_EXISTS_CACHE_SIZE: int = Field(default=10000, env='USER_EXISTS_CACHE_SIZE')
+    USER_EXISTS_CACHE_TTL: int = Field(default=300, env='USER_EXISTS_CACHE_TTL')
+    TOKEN_CACHE_SIZE: int = Field(default=50000, env='TOKEN_CACHE_SIZE')
+    TOKEN_CACHE_TTL: int = Field(default=300, env='TOKEN_CACHE_TTL')
+
+
+class MetricsSettings(Settings):
+    """Model with metrics settings."""
+
+    __conf_name__ = 'metrics'
+
+    # Каталог снимков метрик воркеров; run_uvicorn создает временный, если воркеров несколько.
+    METRICS_DIR: str = Field(default='', env='METRICS_DIR')
+    METRICS_SNAPSHOT_INTERVAL: float = Field(default=5, env='METRICS_SNAPSHOT_INTERVAL')
+    # Токен для /api/metrics и /api/health/stats (Authorization: Bearer); пусто - эндпоинты закрыты.
+    OPS_TOKEN: str = Field(default='', env='OPS_TOKEN')
+
+
+class CompressionSettings(Settings):
+    """Model with response compression settings."""
+
+    __conf_name__ = 'compression'
+
+    # Кодировки в порядке предпочтения сервера; br и zstd - только с `uv sync --extra compression`. Пусто - без сжатия.
+    COMPRESSION_ENCODINGS: str = Field(default='zstd,br,gzip', env='COMPRESSION_ENCODINGS')
+    # JSON-ответы меньше порога отдаются как есть: на маленьком теле сжатие почти ничего не дает.
+    COMPRESSION_MIN_SIZE: int = Field(default=1024, env='COMPRESSION_MIN_SIZE')
+    # Тела и части потока от этого размера сжимаются в потоке, а не в event loop.
+    COMPRESSION_OFFLOAD_SIZE: int = Field(default=65536, env='COMPRESSION_OFFLOAD_SIZE')
+    COMPRESSION_GZIP_LEVEL: int = Field(default=6, env='COMPRESSION_GZIP_LEVEL')
+    COMPRESSION_BROTLI_LEVEL: int = Field(default=4, env='COMPRESSION_BROTLI_LEVEL')
+    COMPRESSION_ZSTD_LEVEL: int = Field(default=3, env='COMPRESSION_ZSTD_LEVEL')
+
+
 class ProjectSettings(Settings):
     """Model with project settings."""
 
@@ -103,6 +242,12 @@ class ProjectSettings(Settings):
     logging: LoggingSettings = LoggingSettings()
     server: ServerSettings = ServerSettings()
     token: TokenSettings = TokenSettings()
+    hashing: HashingSettings = HashingSettings()
+    notifications: NotificationSettings = NotificationSettings()
+    cache: CacheSettings = CacheSettings()
+    broker: BrokerSettings = BrokerSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    compression: CompressionSettings = CompressionSettings()
 
 
 settings = ProjectSettings()
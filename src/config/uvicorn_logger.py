@@ -11,7 +11,9 @@ import logging
 import structlog
 from structlog.types import EventDict
 
-from src.config.logger_setup import build_default_processors
+from src.choices.service_choices import LogProfileChoices
+from src.config.log_queue import QueueingHandler
+from src.config.logger_setup import CachingProcessorFormatter, ProcessRotatingFileHandler, build_default_processors
 from src.config.settings import settings
 
 
@@ -100,14 +102,46 @@ class UvicornFileJSONFormatter(structlog.stdlib.ProcessorFormatter):
         )
 
 
+class UvicornProductionFormatter(CachingProcessorFormatter):
+    """Shared formatter of the `production` profile for console and file Uvicorn logs."""
+
+    def __init__(self, level, json_format, *args, **kwargs):
+        """Initialize UvicornProductionFormatter."""
+        processors = [
+            _extract_uvicorn_request_meta,
+            _drop_positional_args,
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.JSONRenderer() if json_format else structlog.processors.LogfmtRenderer(),
+        ]
+
+        super().__init__(
+            processors=processors,
+            foreign_pre_chain=build_default_processors(
+                level=level,
+                json_format=json_format,
+                profile=LogProfileChoices.production,
+            ),
+            pass_foreign_args=True,
+        )
+
+
 def build_uvicorn_log_config(level=logging.INFO, json_console_format: bool = False,
-                             json_file_format: bool = True):
+                             json_file_format: bool = True,
+                             profile: LogProfileChoices = LogProfileChoices.default,
+                             per_process_file: bool = False):
     """Build the logging configuration for Uvicorn.
 
+    Логгеры uvicorn пишут в `QueueingHandler`, а обработчики `default`, `access`
+    и `file` вызываются фоновым потоком `log_queue`. В профиле `production`
+    все три обработчика используют один форматтер в формате файла.
+
     Args:
         level (int): Logging level.
         json_console_format (bool): Flag to enable JSON formatting for console logs.
         json_file_format (bool): Flag to enable JSON formatting for file logs.
+        profile (LogProfileChoices): Processor profile.
+        per_process_file (bool): Write a separate log file per worker process. The handler
+            is created by dictConfig inside each worker, so the file name gets the worker pid.
 
     Returns:
         dict: Uvicorn logging configuration.
@@ -124,58 +158,85 @@ def build_uvicorn_log_config(level=logging.INFO, json_console_format: bool = Fal
     else:
         file_formatter = UvicornFileFormatter  # type: ignore
 
+    handler_formatters = {
+        'default': 'default',
+        'access': 'access',
+        'file': 'file_formatter',
+    }
+    formatters = {
+        'default': {
+            '()': default,
+            'level': level,
+        },
+        'access': {
+            '()': access,
+            'level': level,
+        },
+        'file_formatter': {
+            '()': file_formatter,
+            'level': level,
+            'json_format': json_file_format,
+        },
+    }
+    if profile == LogProfileChoices.production:
+        # dictConfig создает по экземпляру форматтера на имя, поэтому все обработчики
+        # ссылаются на `default`. Ключ `access` нужен uvicorn (use_colors), но не используется.
+        handler_formatters = dict.fromkeys(handler_formatters, 'default')
+        production = {
+            '()': UvicornProductionFormatter,
+            'level': level,
+            'json_format': json_file_format,
+        }
+        formatters = {'default': production, 'access': dict(production)}
+
     level_name = logging.getLevelName(level)
     return {
         'version': 1,
         'disable_existing_loggers': False,
-        'formatters': {
-            'default': {
-                '()': default,
-                'level': level,
-            },
-            'access': {
-                '()': access,
-                'level': level,
-            },
-            'file_formatter': {
-                '()': file_formatter,
-                'level': level,
-                'json_format': json_file_format,
-            },
-        },
+        'formatters': formatters,
         'handlers': {
             'default': {
-                'formatter': 'default',
+                'formatter': handler_formatters['default'],
                 'class': 'logging.StreamHandler',
                 'stream': 'ext://sys.stdout',
             },
             'access': {
-                'formatter': 'access',
+                'formatter': handler_formatters['access'],
                 'class': 'logging.StreamHandler',
                 'stream': 'ext://sys.stdout',
             },
             'file': {
-                'formatter': 'file_formatter',
-                'class': 'logging.handlers.RotatingFileHandler',
+                'formatter': handler_formatters['file'],
+                '()': ProcessRotatingFileHandler,
                 'filename': settings.logging.LOG_FILE,
+                'per_process': per_process_file,
                 'backupCount': settings.logging.LOG_BACKUP_COUNT,
                 'mode': 'a',
                 'encoding': 'utf-8',
             },
+            'queue_default': {
+                '()': QueueingHandler,
+                'handlers': ['default', 'file'],
+            },
+            'queue_access': {
+                '()': QueueingHandler,
+                'handlers': ['access', 'file'],
+                'keep_args': True,
+            },
         },
         'loggers': {
             'uvicorn': {
-                'handlers': ['default', 'file'],
+                'handlers': ['queue_default'],
                 'level': level_name,
                 'propagate': False,
             },
             'uvicorn.error': {
                 'level': level_name,
-                'handlers': ['default', 'file'],
+                'handlers': ['queue_default'],
                 'propagate': False,
             },
             'uvicorn.access': {
-                'handlers': ['access', 'file'],
+                'handlers': ['queue_access'],
                 'level': level_name,
                 'propagate': False,
             },
@@ -214,3 +275,13 @@ def _extract_uvicorn_request_meta(
         event_dict.pop('positional_args')
 
     return event_dict
+
+
+def _drop_positional_args(
+    wrapped_logger: logging.Logger | None,
+    method_name: str,
+    event_dict: EventDict,
+):
+    """Drop record args which are already merged into the message of non-access logs."""
+    event_dict.pop('positional_args', None)
+    return event_dict
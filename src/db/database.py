@@ -1,30 +1,81 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import AsyncGenerator
 from fastapi import FastAPI
 from tortoise.contrib.fastapi import RegisterTortoise
 
+from src.app.events import shutdown_event, startup_event
+from src.choices.service_choices import IngestModeChoices
 from src.config.settings import settings
+from src.db.replica import REPLICA_CONNECTION
+from src.metrics import remove_snapshot, run_snapshot_writer
+from src.services.notification_service import notification_service
+from src.services.password_hasher import password_hasher
 
 
 logger = logging.getLogger(__name__)
 
 
+def build_connection_config(host: str, port: int, database: str) -> dict | str:
+    """Конфигурация подключения Tortoise.
+
+    Для PostgreSQL - словарь credentials с параметрами пула и клиентом с метриками
+    (`src.db.pool`), для SQLite - файл `database`, для остальных движков - строка подключения.
+
+    Args:
+        host (str): Хост БД.
+        port (int): Порт БД.
+        database (str): Имя БД или путь к файлу SQLite.
+    """
+    db = settings.db
+    if db.DB_ENGINE == "sqlite":
+        return {"engine": "tortoise.backends.sqlite", "credentials": {"file_path": database}}
+    if db.DB_ENGINE not in ("postgres", "asyncpg"):
+        return f"{db.DB_ENGINE}://{db.POSTGRES_USER}:{db.POSTGRES_PASSWORD}@{host}:{port}/{database}"
+    return {
+        "engine": "src.db.pool",
+        "credentials": {
+            "host": host,
+            "port": port,
+            "user": db.POSTGRES_USER,
+            "password": db.POSTGRES_PASSWORD,
+            "database": database,
+            "minsize": db.DB_POOL_MIN_SIZE,
+            "maxsize": db.DB_POOL_MAX_SIZE,
+            "max_inactive_connection_lifetime": db.DB_POOL_MAX_INACTIVE_LIFETIME,
+            "statement_cache_size": db.DB_STATEMENT_CACHE_SIZE,
+            "acquire_timeout": db.DB_POOL_ACQUIRE_TIMEOUT,
+        },
+    }
+
+
 TORTOISE_ORM = {
     "connections": {
-        "default": settings.db.DATABASE_URL,
+        "default": build_connection_config(settings.db.DB_HOST, settings.db.DB_PORT, settings.db.DB_NAME),
     },
     "apps": {
         "models": {
             "models": [
                 "src.models.user",
                 "src.models.notification",
+                "src.models.notification_counter",
+                "aerich.models",
             ],
             "default_connection": "default",
         },
     },
 }
 
+if settings.db.HAS_REPLICA:
+    # Реплика получает только чтения, явно помеченные `replica_reads` (см. src.db.replica).
+    TORTOISE_ORM["connections"][REPLICA_CONNECTION] = build_connection_config(
+        settings.db.DB_REPLICA_HOST or settings.db.DB_HOST,
+        settings.db.DB_REPLICA_PORT or settings.db.DB_PORT,
+        settings.db.DB_REPLICA_NAME or settings.db.DB_NAME,
+    )
+    TORTOISE_ORM["routers"] = ["src.db.replica.ReplicaRouter"]
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
@@ -32,7 +83,33 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     async with RegisterTortoise(
         app,
         config=TORTOISE_ORM,
-        generate_schemas=True,
+        generate_schemas=settings.db.DB_GENERATE_SCHEMAS,
         add_exception_handlers=True,
     ):
-        yield
+        await startup_event()
+        reconciler = None
+        if settings.notifications.COUNTER_RECONCILE_INTERVAL > 0:
+            reconciler = asyncio.create_task(notification_service.run_counter_reconciler(
+                interval=settings.notifications.COUNTER_RECONCILE_INTERVAL,
+                batch_size=settings.notifications.COUNTER_RECONCILE_BATCH_SIZE,
+            ))
+        if settings.notifications.INGEST_MODE != IngestModeChoices.direct:
+            notification_service.ingest.start()
+        metrics_writer = None
+        if settings.metrics.METRICS_DIR:
+            metrics_writer = asyncio.create_task(run_snapshot_writer(
+                interval=settings.metrics.METRICS_SNAPSHOT_INTERVAL,
+            ))
+        try:
+            yield
+        finally:
+            for task in (reconciler, metrics_writer):
+                if task is not None:
+                    task.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await task
+            remove_snapshot()
+            # Принятые в буфер уведомления записываются до закрытия соединений с БД.
+            await notification_service.ingest.close()
+            password_hasher.shutdown()
+            await shutdown_event()
@@ -0,0 +1,159 @@
+"""Проверка планов горячих запросов уведомлений.
+
+Запуск: `python -m src.db.index_check` (или `make check_indexes`).
+Для каждого запроса выполняется EXPLAIN и проверяется, что в плане есть
+один из ожидаемых индексов и нет полного просмотра таблицы. При нарушении
+процесс завершается с кодом 1, поэтому проверку можно ставить в CI после
+`aerich upgrade`. На SQLite те же проверки выполняет `tests/test_index_check.py`.
+"""
+
+import asyncio
+import json
+import re
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+from tortoise import Tortoise, connections
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.timezone import now
+from tortoise.transactions import in_transaction
+
+from src.choices.api_choices import PaginationOrderChoices
+from src.config.settings import settings
+from src.db.database import TORTOISE_ORM
+from src.db.sql import build_delete_query
+from src.db_services.notifications_repository import notification_repository
+from src.models.notification import Notification
+from src.rest_models.pagination import Pagination
+
+USER_INDEXES = ('idx_notification_user_id_id', 'idx_notification_user_created')
+UNREAD_INDEXES = ('idx_notification_user_unread',)
+PK_INDEXES = ('notification_pkey', 'INTEGER PRIMARY KEY')
+# Полный просмотр таблицы: Seq Scan в плане PostgreSQL, SCAN без индекса в плане SQLite.
+FULL_SCAN_RE = re.compile(r'"Seq Scan"|\bSCAN notification(?! USING)')
+
+
+@dataclass
+class PlanCheck:
+    """Результат проверки одного запроса."""
+
+    name: str
+    sql: str
+    plan: str
+    expected: tuple[str, ...]
+
+    @property
+    def full_scan(self) -> bool:
+        return FULL_SCAN_RE.search(self.plan) is not None
+
+    @property
+    def ok(self) -> bool:
+        return any(index in self.plan for index in self.expected) and not self.full_scan
+
+
+def _build_queries(
+    conn: BaseDBAsyncClient,
+    user_id: int,
+) -> list[tuple[str, str, list[Any], tuple[str, ...]]]:
+    """Собирает SQL тех же запросов, которые выполняет репозиторий."""
+    queries: list[tuple[str, str, list[Any], tuple[str, ...]]] = []
+    for order in PaginationOrderChoices:
+        for cursor_id in (None, 1_000_000):
+            pagination = Pagination(page=3, per_page=50, order=order, cursor_id=cursor_id)
+            name = 'list_{order}_{mode}'.format(
+                order=order.value,
+                mode='keyset' if cursor_id else 'offset',
+            )
+            qs = notification_repository.page_queryset(user_id=user_id, pagination=pagination)
+            queries.append((name, qs.sql(params_inline=True), [], USER_INDEXES))
+        pagination = Pagination(page=1, per_page=50, order=order, unread_only=True)
+        qs = notification_repository.page_queryset(user_id=user_id, pagination=pagination)
+        queries.append(('list_{order}_unread'.format(order=order.value), qs.sql(params_inline=True), [], UNREAD_INDEXES))
+
+    queries.append((
+        'count',
+        Notification.filter(user_id=user_id).count().sql(params_inline=True),
+        [],
+        USER_INDEXES,
+    ))
+    queries.append((
+        'mark_read',
+        Notification.filter(user_id=user_id, is_read=False, id__lte=1_000_000)
+        .update(is_read=True)
+        .sql(params_inline=True),
+        [],
+        UNREAD_INDEXES,
+    ))
+    sql, params = build_delete_query(
+        conn,
+        table=Notification._meta.db_table,
+        conditions=[('user_id', '=', user_id), ('id', '=', 1)],
+        limit=1,
+        returning=('id', 'is_read'),
+    )
+    queries.append(('delete_by_id', sql, params, PK_INDEXES + USER_INDEXES))
+    for name, conditions in (
+        ('bulk_delete_all', [('user_id', '=', user_id)]),
+        ('bulk_delete_before_id', [('user_id', '=', user_id), ('id', '<', 1_000_000)]),
+        ('bulk_delete_before_date', [('user_id', '=', user_id), ('created_at', '<', now())]),
+    ):
+        sql, params = build_delete_query(
+            conn,
+            table=Notification._meta.db_table,
+            conditions=conditions,
+            limit=settings.notifications.DELETE_CHUNK_SIZE,
+        )
+        queries.append((name, sql, params, USER_INDEXES))
+    return queries
+
+
+async def _explain(conn: BaseDBAsyncClient, sql: str, params: list[Any]) -> str:
+    dialect = conn.capabilities.dialect
+    if dialect == 'postgres':
+        _, rows = await conn.execute_query('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = rows[0]['QUERY PLAN']
+        return plan if isinstance(plan, str) else json.dumps(plan)
+    if dialect == 'sqlite':
+        _, rows = await conn.execute_query('EXPLAIN QUERY PLAN ' + sql, params)
+        return '\n'.join(row['detail'] for row in rows)
+    raise RuntimeError('EXPLAIN check is not supported for {dialect}'.format(dialect=dialect))
+
+
+async def check_notification_indexes(user_id: int = 1) -> list[PlanCheck]:
+    """Выполняет EXPLAIN для запросов списка/удаления уведомлений.
+
+    Args:
+        user_id (int): Пользователь, для которого строятся запросы.
+
+    Returns:
+        list[PlanCheck]: Результаты по каждому запросу.
+    """
+    conn = connections.get('default')
+    results = []
+    async with in_transaction('default') as tx:
+        if conn.capabilities.dialect == 'postgres':
+            # На маленьких таблицах планировщик выбирает seq scan, проверяем доступность индекса.
+            await tx.execute_script('SET LOCAL enable_seqscan = off')
+        for name, sql, params, expected in _build_queries(tx, user_id):
+            plan = await _explain(tx, sql, params)
+            results.append(PlanCheck(name=name, sql=sql, plan=plan, expected=expected))
+    return results
+
+
+async def main() -> int:
+    await Tortoise.init(config=TORTOISE_ORM)
+    try:
+        results = await check_notification_indexes()
+    finally:
+        await Tortoise.close_connections()
+
+    for result in results:
+        print('{status} {name}'.format(status='OK  ' if result.ok else 'FAIL', name=result.name))  # noqa: T201
+        if not result.ok:
+            print('    sql:  {sql}\n    plan: {plan}'.format(sql=result.sql, plan=result.plan))  # noqa: T201
+    return 0 if all(result.ok for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
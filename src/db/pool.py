@@ -0,0 +1,189 @@
+"""Пул соединений asyncpg с метриками ожидания соединения.
+
+Tortoise берет соединения из пула через `pool.acquire()`, и при исчерпании
+пула запрос молча ждет. `InstrumentedPool` считает ожидающих, время ожидания
+и ограничивает его `acquire_timeout`; `InstrumentedAsyncpgClient` подключается
+в `TORTOISE_ORM` как `engine` (модуль экспортирует `client_class`).
+"""
+
+import asyncio
+import bisect
+import time
+from typing import Any, Optional
+
+import asyncpg
+from tortoise import connections
+from tortoise.backends.asyncpg.client import AsyncpgDBClient
+
+from src.exceptions import DatabasePoolTimeoutError
+
+# InstrumentedPool переопределяет приватный Pool._acquire: версия asyncpg закреплена
+# в pyproject.toml, а при несовместимом обновлении приложение не запустится.
+if not callable(getattr(asyncpg.Pool, '_acquire', None)):
+    raise RuntimeError(
+        'asyncpg {version} has no Pool._acquire, InstrumentedPool is not compatible with it'.format(
+            version=asyncpg.__version__,
+        ),
+    )
+
+
+class PoolMetrics:
+    """Счетчики пула одного подключения, переживают пересоздание пула."""
+
+    # Верхние границы корзин гистограммы времени ожидания, секунды.
+    wait_buckets = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self):
+        """Initialize PoolMetrics."""
+        self.waiting = 0
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_counts = [0] * (len(self.wait_buckets) + 1)
+
+    def observe_wait(self, elapsed: float) -> None:
+        """Учесть время ожидания соединения."""
+        self.acquired += 1
+        self.wait_total += elapsed
+        self.wait_max = max(self.wait_max, elapsed)
+        self.wait_counts[bisect.bisect_left(self.wait_buckets, elapsed)] += 1
+
+    def stats(self) -> dict:
+        """Статистика ожидания соединений.
+
+        Returns:
+            dict: Ожидающие сейчас, выданные соединения, таймауты и распределение времени ожидания.
+        """
+        buckets = {'le_{bound}'.format(bound=bound): count for bound, count in zip(self.wait_buckets, self.wait_counts)}
+        buckets['inf'] = self.wait_counts[-1]
+        return {
+            'waiting': self.waiting,
+            'acquired': self.acquired,
+            'timeouts': self.timeouts,
+            'wait_avg_ms': round(self.wait_total / self.acquired * 1000, 3) if self.acquired else 0.0,
+            'wait_max_ms': round(self.wait_max * 1000, 3),
+            'wait_buckets': buckets,
+        }
+
+
+class InstrumentedPool(asyncpg.Pool):
+    """Пул asyncpg, который измеряет ожидание соединения и ограничивает его."""
+
+    def __init__(
+        self,
+        *connect_args: Any,
+        metrics: PoolMetrics,
+        acquire_timeout: Optional[float] = None,
+        max_queries: int = 50000,
+        max_inactive_connection_lifetime: float = 300.0,
+        record_class: type = asyncpg.Record,
+        **kwargs: Any,
+    ):
+        """Initialize InstrumentedPool.
+
+        Args:
+            metrics (PoolMetrics): Куда записывать метрики.
+            acquire_timeout (float): Сколько ждать свободное соединение, если вызывающий
+                код не передал свой таймаут (None - без ограничения).
+            max_queries (int): Запросов на соединение до его замены.
+            max_inactive_connection_lifetime (float): Через сколько секунд простоя соединение закрывается.
+            record_class (type): Класс строк результата.
+        """
+        # Значения по умолчанию как у asyncpg.create_pool, который не принимает класс пула.
+        super().__init__(
+            *connect_args,
+            max_queries=max_queries,
+            max_inactive_connection_lifetime=max_inactive_connection_lifetime,
+            record_class=record_class,
+            **kwargs,
+        )
+        self.metrics = metrics
+        self.acquire_timeout = acquire_timeout
+
+    async def _acquire(self, timeout: Optional[float]) -> Any:
+        # Через _acquire проходят и `await pool.acquire()`, и `async with pool.acquire()`.
+        metrics = self.metrics
+        metrics.waiting += 1
+        started = time.perf_counter()
+        try:
+            connection = await super()._acquire(self.acquire_timeout if timeout is None else timeout)
+        except asyncio.TimeoutError as exc:
+            metrics.timeouts += 1
+            raise DatabasePoolTimeoutError(
+                'No free database connection within {timeout}s'.format(timeout=timeout or self.acquire_timeout),
+            ) from exc
+        finally:
+            metrics.waiting -= 1
+        metrics.observe_wait(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedAsyncpgClient(AsyncpgDBClient):
+    """Клиент Tortoise для asyncpg с `InstrumentedPool`.
+
+    Дополнительно к параметрам `AsyncpgDBClient` принимает в credentials
+    `acquire_timeout`; остальные неизвестные ключи (`statement_cache_size`,
+    `max_inactive_connection_lifetime`) Tortoise передает в пул как есть.
+    """
+
+    def __init__(self, acquire_timeout: Optional[float] = None, **kwargs: Any):
+        """Initialize InstrumentedAsyncpgClient.
+
+        Args:
+            acquire_timeout (float): Сколько ждать свободное соединение (None или 0 - без ограничения).
+        """
+        super().__init__(**kwargs)
+        self.acquire_timeout = acquire_timeout or None
+        self.metrics = PoolMetrics()
+
+    async def create_pool(self, **kwargs: Any) -> asyncpg.Pool:
+        """Создать пул с метриками вместо `asyncpg.create_pool`."""
+        return await InstrumentedPool(None, metrics=self.metrics, acquire_timeout=self.acquire_timeout, **kwargs)
+
+    def pool_stats(self) -> dict:
+        """Статистика пула.
+
+        Returns:
+            dict: Размеры пула, занятые и свободные соединения и метрики ожидания.
+        """
+        pool = self._pool
+        size = pool.get_size() if pool is not None else 0
+        idle = pool.get_idle_size() if pool is not None else 0
+        return {
+            'min_size': self.pool_minsize,
+            'max_size': self.pool_maxsize,
+            'size': size,
+            'in_use': size - idle,
+            'idle': idle,
+            **self.metrics.stats(),
+        }
+
+
+client_class = InstrumentedAsyncpgClient
+
+
+def pool_stats() -> dict:
+    """Статистика пулов всех подключений Tortoise, у которых она есть.
+
+    Returns:
+        dict: Статистика по имени подключения.
+    """
+    return {
+        connection.connection_name: connection.pool_stats()
+        for connection in connections.all()
+        if isinstance(connection, InstrumentedAsyncpgClient)
+    }
+
+
+def pool_metrics() -> dict:
+    """Счетчики ожидания соединений всех подключений Tortoise с инструментированным пулом.
+
+    Returns:
+        dict: `PoolMetrics` по имени подключения.
+    """
+    return {
+        connection.connection_name: connection.metrics
+        for connection in connections.all()
+        if isinstance(connection, InstrumentedAsyncpgClient)
+    }
@@ -0,0 +1,207 @@
+"""Маршрутизация чтений на реплику БД.
+
+Реплика получает только чтения, обернутые в `replica_routing.reads(user_id)`:
+остальные запросы (записи, транзакции, проверки при аутентификации) идут в
+основную БД. После записи пользователь `window` секунд читает с основной БД,
+чтобы видеть свои изменения, несмотря на отставание реплики.
+
+Отметка о записи хранится в `PinStore`: в памяти процесса (один воркер) или в Redis,
+чтобы ее видели все воркеры, а не только тот, что обработал запись.
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Iterable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+import structlog
+
+from src.choices.service_choices import ReplicaPinStoreChoices
+from src.config.settings import settings
+from src.redis_client import get_redis_client
+from src.utils.ttl_cache import TTLCache
+
+REPLICA_CONNECTION = 'replica'
+
+logger = structlog.stdlib.get_logger('replica')
+
+_replica_reads: ContextVar[bool] = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+    """Роутер Tortoise: чтения внутри `replica_routing.reads` идут на реплику."""
+
+    def db_for_read(self, model: type) -> Optional[str]:
+        return REPLICA_CONNECTION if _replica_reads.get() else None
+
+    def db_for_write(self, model: type) -> Optional[str]:
+        return None
+
+
+class PinStore(ABC):
+    """Хранилище отметок о записи: пока отметка жива, пользователь читает с основной БД."""
+
+    backend: ReplicaPinStoreChoices
+
+    def __init__(self, window: float):
+        """Initialize PinStore.
+
+        Args:
+            window (float): Сколько секунд живет отметка.
+        """
+        self.window = window
+
+    @abstractmethod
+    async def pin(self, user_ids: Iterable[int]) -> None:
+        """Отметить запись пользователей."""
+
+    @abstractmethod
+    async def is_pinned(self, user_id: int) -> bool:
+        """Писал ли пользователь за последние `window` секунд."""
+
+    def stats(self) -> dict:
+        return {'store': self.backend.value}
+
+
+class MemoryPinStore(PinStore):
+    """Отметки в памяти процесса: другие воркеры их не видят, подходит только для одного воркера."""
+
+    backend = ReplicaPinStoreChoices.memory
+
+    def __init__(self, window: float, maxsize: int = 100000):
+        """Initialize MemoryPinStore.
+
+        Args:
+            window (float): Сколько секунд живет отметка.
+            maxsize (int): Сколько недавно писавших пользователей помнить.
+        """
+        super().__init__(window)
+        self._pins = TTLCache(maxsize=maxsize, ttl=window)
+
+    async def pin(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            self._pins.set(user_id, True)
+
+    async def is_pinned(self, user_id: int) -> bool:
+        return bool(self._pins.get(user_id))
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'pinned_users': self._pins.stats()['size']}
+
+
+class RedisPinStore(PinStore):
+    """Отметки в Redis (ключ `{prefix}:{user_id}` со сроком `window`), общие для всех воркеров."""
+
+    backend = ReplicaPinStoreChoices.redis
+
+    def __init__(self, window: float, key_prefix: str):
+        """Initialize RedisPinStore.
+
+        Args:
+            window (float): Сколько секунд живет отметка.
+            key_prefix (str): Префикс ключей Redis.
+        """
+        super().__init__(window)
+        self.key_prefix = key_prefix
+        self.errors = 0
+
+    async def pin(self, user_ids: Iterable[int]) -> None:
+        """Отметить запись. Ошибка Redis только логируется: запись уже сохранена."""
+        ttl_ms = max(int(self.window * 1000), 1)
+        try:
+            client = await get_redis_client()
+            async with client.pipeline(transaction=False) as pipe:
+                for user_id in user_ids:
+                    pipe.set(self._key(user_id), 1, px=ttl_ms)
+                await pipe.execute()
+        except Exception:
+            self.errors += 1
+            logger.exception('Ошибка записи отметки read-your-writes в Redis')
+
+    async def is_pinned(self, user_id: int) -> bool:
+        """Проверить отметку. Без ответа Redis чтение идет в основную БД, чтобы не отдать устаревшие данные."""
+        try:
+            client = await get_redis_client()
+            return bool(await client.exists(self._key(user_id)))
+        except Exception:
+            self.errors += 1
+            logger.exception('Ошибка чтения отметки read-your-writes из Redis')
+            return True
+
+    def stats(self) -> dict:
+        return {**super().stats(), 'errors': self.errors}
+
+    def _key(self, user_id: int) -> str:
+        return '{prefix}:{user_id}'.format(prefix=self.key_prefix, user_id=user_id)
+
+
+class ReplicaRouting:
+    """Решает, можно ли читать данные пользователя с реплики (read-your-writes)."""
+
+    def __init__(self, enabled: bool, store: PinStore):
+        """Initialize ReplicaRouting.
+
+        Args:
+            enabled (bool): Настроена ли реплика.
+            store (PinStore): Где хранить отметки о записи.
+        """
+        self.enabled = enabled
+        self.store = store
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    async def mark_write(self, *user_ids: int) -> None:
+        """Отметить запись: ближайшие `window` секунд пользователи читают с основной БД."""
+        if not self.enabled or not user_ids:
+            return
+        await self.store.pin(user_ids)
+
+    @asynccontextmanager
+    async def reads(self, user_id: int) -> AsyncIterator[None]:
+        """Направить чтения внутри контекста на реплику, если пользователь недавно не писал."""
+        if not self.enabled:
+            yield
+            return
+        if await self.store.is_pinned(user_id):
+            self.primary_reads += 1
+            yield
+            return
+        self.replica_reads += 1
+        token = _replica_reads.set(True)
+        try:
+            yield
+        finally:
+            _replica_reads.reset(token)
+
+    def stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'replica_reads': self.replica_reads,
+            'primary_reads': self.primary_reads,
+            **self.store.stats(),
+        }
+
+
+def create_pin_store(backend: ReplicaPinStoreChoices, window: float) -> PinStore:
+    """Создать хранилище отметок о записи выбранного типа.
+
+    Args:
+        backend (ReplicaPinStoreChoices): Тип хранилища.
+        window (float): Сколько секунд живет отметка.
+
+    Returns:
+        PinStore: Хранилище отметок.
+    """
+    if backend == ReplicaPinStoreChoices.redis:
+        return RedisPinStore(
+            window=window,
+            key_prefix='{prefix}:read_your_writes'.format(prefix=settings.broker.BROKER_CHANNEL_PREFIX),
+        )
+    return MemoryPinStore(window=window)
+
+
+replica_routing = ReplicaRouting(
+    enabled=settings.db.HAS_REPLICA,
+    store=create_pin_store(settings.db.DB_READ_YOUR_WRITES_STORE, settings.db.DB_READ_YOUR_WRITES_WINDOW),
+)
@@ -0,0 +1,168 @@
+"""Помощники для raw SQL, которые Tortoise ORM не умеет строить сам.
+
+Поддерживаются диалекты, на которых работает проект: PostgreSQL (asyncpg) и SQLite.
+"""
+
+from collections.abc import Sequence
+from typing import Any
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+
+def placeholders(conn: BaseDBAsyncClient, count: int, start: int = 1) -> list[str]:
+    """Возвращает плейсхолдеры параметров в формате драйвера.
+
+    Args:
+        conn (BaseDBAsyncClient): Соединение, для которого строится запрос.
+        count (int): Количество параметров.
+        start (int): Номер первого параметра (для PostgreSQL).
+
+    Returns:
+        list[str]: `$1, $2, ...` для PostgreSQL или `?` для SQLite.
+    """
+    if conn.capabilities.dialect == 'postgres':
+        return ['${n}'.format(n=n) for n in range(start, start + count)]
+    return ['?'] * count
+
+
+async def insert_returning_ids(
+    conn: BaseDBAsyncClient,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]],
+) -> list[int]:
+    """Вставляет строки одним multi-row INSERT и возвращает их id в порядке вставки.
+
+    Args:
+        conn (BaseDBAsyncClient): Соединение (обычно транзакция).
+        table (str): Имя таблицы.
+        columns (Sequence[str]): Колонки вставки.
+        rows (Sequence[Sequence[Any]]): Значения, по одной последовательности на строку.
+
+    Returns:
+        list[int]: id вставленных строк.
+    """
+    values_sql = []
+    params: list[Any] = []
+    for row in rows:
+        values_sql.append('({marks})'.format(
+            marks=', '.join(placeholders(conn, len(columns), start=len(params) + 1)),
+        ))
+        params.extend(row)
+    query = 'INSERT INTO "{table}" ({columns}) VALUES {values} RETURNING "id"'.format(
+        table=table,
+        columns=', '.join('"{column}"'.format(column=column) for column in columns),
+        values=', '.join(values_sql),
+    )
+    _, result = await conn.execute_query(query, params)
+    return [row['id'] for row in result]
+
+
+async def upsert_increment(
+    conn: BaseDBAsyncClient,
+    table: str,
+    columns: Sequence[str],
+    row: Sequence[Any],
+    conflict: Sequence[str],
+    increment: str,
+    replace: Sequence[str],
+    returning: Sequence[str],
+) -> dict:
+    """Вставляет строку, а при конфликте уникального ключа увеличивает счетчик существующей.
+
+    `INSERT ... ON CONFLICT DO UPDATE` атомарен в обоих диалектах: одновременные
+    вставки с одним ключом не создают дубликатов и не теряют инкрементов.
+
+    Args:
+        conn (BaseDBAsyncClient): Соединение (обычно транзакция).
+        table (str): Имя таблицы.
+        columns (Sequence[str]): Колонки вставки.
+        row (Sequence[Any]): Значения колонок.
+        conflict (Sequence[str]): Колонки уникального индекса.
+        increment (str): Колонка, которая при конфликте увеличивается на 1.
+        replace (Sequence[str]): Колонки, которые при конфликте берутся из новой строки.
+        returning (Sequence[str]): Колонки результата.
+
+    Returns:
+        dict: Итоговая строка (вставленная или обновленная).
+    """
+    assignments = ['"{column}" = "{table}"."{column}" + 1'.format(table=table, column=increment)]
+    assignments.extend('"{column}" = excluded."{column}"'.format(column=column) for column in replace)
+    query = (
+        'INSERT INTO "{table}" ({columns}) VALUES ({marks}) '
+        'ON CONFLICT ({conflict}) DO UPDATE SET {assignments} RETURNING {returning}'
+    ).format(
+        table=table,
+        columns=', '.join('"{column}"'.format(column=column) for column in columns),
+        marks=', '.join(placeholders(conn, len(columns))),
+        conflict=', '.join('"{column}"'.format(column=column) for column in conflict),
+        assignments=', '.join(assignments),
+        returning=', '.join('"{column}"'.format(column=column) for column in returning),
+    )
+    _, result = await conn.execute_query(query, list(row))
+    return dict(result[0])
+
+
+async def delete_returning(
+    conn: BaseDBAsyncClient,
+    table: str,
+    conditions: Sequence[tuple[str, str, Any]],
+    limit: int,
+    returning: Sequence[str] = ('id',),
+) -> list[dict]:
+    """Удаляет не более `limit` строк по условиям одним запросом и возвращает их колонки.
+
+    Строки выбираются по возрастанию id; в PostgreSQL они блокируются (`FOR UPDATE`)
+    только в пределах одной пачки, поэтому большие удаления не держат долгих блокировок.
+
+    Args:
+        conn (BaseDBAsyncClient): Соединение (обычно транзакция).
+        table (str): Имя таблицы.
+        conditions (Sequence[tuple[str, str, Any]]): Тройки (колонка, оператор, значение),
+            объединяются через AND. Для оператора `IN` значение - последовательность.
+        limit (int): Максимальное количество удаляемых строк.
+        returning (Sequence[str]): Колонки удаленных строк в результате.
+
+    Returns:
+        list[dict]: Удаленные строки.
+    """
+    query, params = build_delete_query(conn, table=table, conditions=conditions, limit=limit, returning=returning)
+    _, result = await conn.execute_query(query, params)
+    return [dict(row) for row in result]
+
+
+def build_delete_query(
+    conn: BaseDBAsyncClient,
+    table: str,
+    conditions: Sequence[tuple[str, str, Any]],
+    limit: int,
+    returning: Sequence[str] = ('id',),
+) -> tuple[str, list[Any]]:
+    """Строит запрос для `delete_returning`.
+
+    Returns:
+        tuple[str, list[Any]]: SQL и параметры.
+    """
+    where = []
+    params: list[Any] = []
+    for column, operator, value in conditions:
+        values = list(value) if operator == 'IN' else [value]
+        marks = placeholders(conn, len(values), start=len(params) + 1)
+        where.append('"{column}" {operator} {operand}'.format(
+            column=column,
+            operator=operator,
+            operand='({marks})'.format(marks=', '.join(marks)) if operator == 'IN' else marks[0],
+        ))
+        params.extend(values)
+    # Запрос начинается с WITH: asyncpg-клиент Tortoise не возвращает строки для `DELETE ...`.
+    query = (
+        'WITH doomed AS (SELECT "id" FROM "{table}" WHERE {where} ORDER BY "id" LIMIT {limit}{lock}) '
+        'DELETE FROM "{table}" WHERE "id" IN (SELECT "id" FROM doomed) RETURNING {returning}'
+    ).format(
+        table=table,
+        returning=', '.join('"{column}"'.format(column=column) for column in returning),
+        where=' AND '.join(where),
+        limit=int(limit),
+        lock=' FOR UPDATE' if conn.capabilities.dialect == 'postgres' else '',
+    )
+    return query, params
@@ -1,61 +1,552 @@
+from collections import Counter
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
 from math import ceil
+from typing import Optional
 
 from fastapi import HTTPException, status
-from tortoise.queryset import QuerySet
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import F, Q
+from tortoise.functions import Count
+from tortoise.queryset import QuerySet, ValuesQuery
+from tortoise.timezone import now
+from tortoise.transactions import in_transaction
+
+from src.db.replica import replica_routing
+from src.db.sql import delete_returning, insert_returning_ids, upsert_increment
+from src.db_services.users_repository import auth_repository
+from src.metrics import track_db_methods
 
 from src.models.notification import Notification
+from src.models.notification_counter import NotificationCounter
 from src.models.user import User
-from tortoise.exceptions import DoesNotExist
 
 from src.rest_models.notification_schema import NotificationCreate, NotificationReadPagination, \
     NotificationRead
-from src.rest_models.pagination import Pagination
+from src.rest_models.pagination import Pagination, encode_cursor
+
 
+# Колонки `NotificationRead`: список уведомлений читает только их.
+NOTIFICATION_READ_FIELDS = ("id", "type", "text", "created_at", "user_id", "group_key", "actor_count", "is_read")
 
+
+@track_db_methods
 class NotificationRepository:
     async def create_notification_for_user(
         self,
         user_id: int,
         data: NotificationCreate,
     ) -> Notification:
-        user = await User.get(id=user_id)
-        return await Notification.create(user=user, **data.dict())
+        """
+        Создает уведомление без предварительного запроса пользователя.
 
-    async def get_user_notifications(
+        user_id берется из проверенного JWT, существование пользователя гарантирует FK:
+        нарушение ограничения превращается в 404.
+        """
+        try:
+            async with in_transaction("default") as conn:
+                notification = await Notification.create(user_id=user_id, using_db=conn, **data.dict())
+                await self._change_counters(conn, user_id=user_id, total=1, unread=1)
+        except IntegrityError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        await replica_routing.mark_write(user_id)
+        return notification
+
+    async def upsert_grouped_notification(
         self,
         user_id: int,
-        pagination: Pagination
-    ) -> NotificationReadPagination:
-        """
-        Возвращает пагинированный список уведомлений.
+        data: NotificationCreate,
+        window: int,
+    ) -> tuple[NotificationRead, bool]:
         """
-        base_qs: QuerySet = Notification.filter(user_id=user_id)
+        Создает сгруппированное уведомление или добавляет событие к существующей группе.
 
-        total = await base_qs.count()
-        page_qs = (
-            base_qs
-            .offset(pagination.offset or 0)
-            .limit(pagination.per_page)
-            .order_by("-id" if pagination.order == "desc" else "id")
+        Группа - уведомления пользователя одного типа с одним `group_key` в одном окне
+        `window` секунд. Повторное событие увеличивает `actor_count`, заменяет `text`
+        и `created_at` на последние и снова делает группу непрочитанной; id строки
+        не меняется. `total` растет только при создании новой строки, `unread` - и при
+        возврате прочитанной группы в непрочитанные.
+
+        Returns:
+            tuple[NotificationRead, bool]: Уведомление группы и признак новой строки.
+        """
+        created_at = now()
+        bucket = int(created_at.timestamp()) // window * window
+        try:
+            async with in_transaction("default") as conn:
+                # Блокировка существующей группы: пометка прочтения не проскочит между чтением is_read и upsert.
+                # Запрос моделью: values_list() теряет select_for_update.
+                group = await (
+                    Notification.filter(group_key=data.group_key, user_id=user_id, type=data.type, bucket=bucket)
+                    .using_db(conn)
+                    .select_for_update()
+                    .first()
+                )
+                was_read = group is not None and group.is_read
+                row = await upsert_increment(
+                    conn,
+                    table=Notification._meta.db_table,
+                    columns=("user_id", "type", "text", "created_at", "group_key", "bucket", "actor_count", "is_read"),
+                    row=(user_id, data.type.value, data.text, created_at, data.group_key, bucket, 1, False),
+                    conflict=("group_key", "user_id", "type", "bucket"),
+                    increment="actor_count",
+                    replace=("text", "created_at", "is_read"),
+                    returning=("id", "actor_count"),
+                )
+                created = row["actor_count"] == 1
+                # Даже без новой строки группа изменилась, поэтому версия списка растет всегда.
+                await self._change_counters(
+                    conn,
+                    user_id=user_id,
+                    total=int(created),
+                    unread=int(created or was_read),
+                )
+        except IntegrityError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        await replica_routing.mark_write(user_id)
+        notification = NotificationRead(
+            id=row["id"],
+            type=data.type.value,
+            text=data.text,
+            created_at=created_at,
+            user_id=user_id,
+            group_key=data.group_key,
+            actor_count=row["actor_count"],
         )
+        return notification, created
+
+    async def bulk_create_notifications(
+        self,
+        items: list[tuple[int, NotificationCreate]],
+        chunk_size: int,
+        created_at: Optional[datetime] = None,
+    ) -> list[int]:
+        """
+        Создает уведомления пачкой: multi-row INSERT по `chunk_size` строк в одной транзакции.
 
-        notifications = await page_qs
+        Args:
+            items: пары (user_id, данные уведомления).
+            chunk_size: количество строк в одном INSERT.
+            created_at: время создания всех уведомлений пачки, по умолчанию текущее.
+
+        Returns:
+            list[int]: id созданных уведомлений в порядке `items`.
+        """
+        user_ids = {user_id for user_id, _ in items}
+        existing = await auth_repository.filter_existing(user_ids)
+        missing = sorted(user_ids - existing)
+        if missing:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail="Users not found: {ids}".format(ids=missing))
+
+        created_at = created_at or now()
+        rows = [
+            (user_id, data.type.value, data.text, created_at, data.group_key)
+            for user_id, data in items
+        ]
+        ids = []
+        async with in_transaction("default") as conn:
+            for start in range(0, len(rows), chunk_size):
+                ids.extend(await insert_returning_ids(
+                    conn,
+                    table=Notification._meta.db_table,
+                    columns=("user_id", "type", "text", "created_at", "group_key"),
+                    rows=rows[start:start + chunk_size],
+                ))
+            for user_id, created in Counter(user_id for user_id, _ in items).items():
+                await self._change_counters(conn, user_id=user_id, total=created, unread=created)
+        await replica_routing.mark_write(*user_ids)
+        return ids
+
+    async def get_user_notifications(
+        self,
+        user_id: int,
+        pagination: Pagination,
+        exact_count: bool = False,
+    ) -> NotificationReadPagination:
+        """
+        Возвращает пагинированный список уведомлений.
 
+        При переданном курсоре страница выбирается по id (keyset), иначе через offset.
+        В обоих режимах в ответе есть `next_cursor` для перехода на keyset-пагинацию.
+        `total` берется из счетчика пользователя, `exact_count` форсирует COUNT(*).
+        Если настроена реплика и пользователь недавно не писал, оба запроса идут на нее.
+        """
+        total, rows, next_cursor = await self._fetch_page(user_id, pagination, exact_count)
         return NotificationReadPagination(
             total=total,
-            count=min(pagination.per_page, total),
+            count=len(rows),
             page=pagination.page,
             pages=ceil(total / pagination.per_page),
-            items=[NotificationRead.from_orm(n) for n in notifications],
+            next_cursor=next_cursor,
+            items=[NotificationRead.model_validate(row) for row in rows],
+        )
+
+    async def get_user_notifications_data(
+        self,
+        user_id: int,
+        pagination: Pagination,
+        exact_count: bool = False,
+    ) -> dict:
+        """
+        То же, что `get_user_notifications`, но без pydantic: строки из БД считаются
+        доверенными и отдаются как есть в формате `NotificationReadPagination`.
+        """
+        total, rows, next_cursor = await self._fetch_page(user_id, pagination, exact_count)
+        return {
+            "total": total,
+            "count": len(rows),
+            "page": pagination.page,
+            "pages": ceil(total / pagination.per_page),
+            "next_cursor": next_cursor,
+            "items": rows,
+        }
+
+    async def stream_user_notifications_data(
+        self,
+        user_id: int,
+        pagination: Pagination,
+        chunk_size: int,
+        exact_count: bool = False,
+    ) -> "NotificationPageStream":
+        """
+        Страница уведомлений, строки которой читаются из БД пачками по `chunk_size`.
+
+        `total` считается сразу, строки - по мере чтения `NotificationPageStream.chunks()`:
+        первая пачка выбирается как страница, следующие - по id после последней строки.
+        """
+        async with replica_routing.reads(user_id):
+            total = await self._get_total(user_id=user_id, exact=exact_count, unread_only=pagination.unread_only)
+        return NotificationPageStream(
+            repository=self,
+            user_id=user_id,
+            pagination=pagination,
+            chunk_size=chunk_size,
+            total=total,
+        )
+
+    async def get_user_notifications_after(
+        self,
+        user_id: int,
+        after_id: int,
+        limit: int,
+    ) -> list[NotificationRead]:
+        """Уведомления пользователя с id > after_id по возрастанию id (догон потока событий)."""
+        rows = await (
+            Notification.filter(user_id=user_id, id__gt=after_id)
+            .order_by("id")
+            .limit(limit)
+            .values(*NOTIFICATION_READ_FIELDS)
+        )
+        return [NotificationRead.model_validate(row) for row in rows]
+
+    async def get_last_notification_id(self, user_id: int) -> int:
+        """Id последнего уведомления пользователя, 0 - если уведомлений нет."""
+        last_id = await (
+            Notification.filter(user_id=user_id)
+            .order_by("-id")
+            .first()
+            .values_list("id", flat=True)
+        )
+        return last_id or 0
+
+    def page_queryset(self, user_id: int, pagination: Pagination, limit: Optional[int] = None) -> ValuesQuery:
+        """
+        Запрос страницы уведомлений (на одну запись больше `per_page` для `next_cursor`).
+
+        Выбираются только колонки `NotificationRead`, строки приходят словарями без
+        создания моделей. Используется и для проверки планов запросов в `src.db.index_check`.
+        """
+        base_qs: QuerySet = Notification.filter(user_id=user_id)
+        if pagination.unread_only:
+            # Частичный индекс idx_notification_user_unread отдает непрочитанные в порядке id без сортировки.
+            base_qs = base_qs.filter(is_read=False)
+        desc = pagination.order == "desc"
+        if pagination.is_keyset:
+            page_qs = base_qs.filter(
+                **{"id__lt" if desc else "id__gt": pagination.cursor_id}
+            )
+        else:
+            page_qs = base_qs.offset(pagination.offset or 0)
+        return (
+            page_qs
+            .limit(pagination.per_page + 1 if limit is None else limit)
+            .order_by("-id" if desc else "id")
+            .values(*NOTIFICATION_READ_FIELDS)
         )
 
     async def delete_user_notification(self, user_id: int, notification_id: int) -> None:
+        async with in_transaction("default") as conn:
+            deleted = await delete_returning(
+                conn,
+                table=Notification._meta.db_table,
+                conditions=[("user_id", "=", user_id), ("id", "=", notification_id)],
+                limit=1,
+                returning=("id", "is_read"),
+            )
+            if not deleted:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail="Notification not found")
+            await self._change_counters(conn, user_id=user_id, total=-1, unread=-_unread(deleted))
+        await replica_routing.mark_write(user_id)
+
+    async def delete_user_notifications(
+        self,
+        user_id: int,
+        chunk_size: int,
+        ids: Optional[Sequence[int]] = None,
+        before_id: Optional[int] = None,
+        before_date: Optional[datetime] = None,
+    ) -> int:
+        """
+        Удаляет уведомления пользователя по фильтрам (без фильтров - все).
+
+        Удаление идет пачками по `chunk_size` строк, каждая пачка - один
+        `DELETE ... WHERE user_id = $1 AND ...` в своей транзакции вместе с обновлением счетчика.
+
+        Returns:
+            int: количество удаленных уведомлений.
+        """
+        conditions = [("user_id", "=", user_id)]
+        if ids:
+            conditions.append(("id", "IN", ids))
+        if before_id is not None:
+            conditions.append(("id", "<", before_id))
+        if before_date is not None:
+            conditions.append(("created_at", "<", before_date))
+
+        deleted = 0
+        while True:
+            async with in_transaction("default") as conn:
+                deleted_rows = await delete_returning(
+                    conn,
+                    table=Notification._meta.db_table,
+                    conditions=conditions,
+                    limit=chunk_size,
+                    returning=("id", "is_read"),
+                )
+                if deleted_rows:
+                    await self._change_counters(
+                        conn,
+                        user_id=user_id,
+                        total=-len(deleted_rows),
+                        unread=-_unread(deleted_rows),
+                    )
+            deleted += len(deleted_rows)
+            if deleted_rows:
+                await replica_routing.mark_write(user_id)
+            if len(deleted_rows) < chunk_size:
+                return deleted
+
+    async def mark_read(self, user_id: int, up_to_id: Optional[int] = None) -> int:
+        """
+        Отмечает прочитанными непрочитанные уведомления пользователя с id <= `up_to_id` (без него - все).
+
+        Returns:
+            int: количество отмеченных уведомлений.
+        """
+        query = Notification.filter(user_id=user_id, is_read=False)
+        if up_to_id is not None:
+            query = query.filter(id__lte=up_to_id)
+        async with in_transaction("default") as conn:
+            marked = await query.using_db(conn).update(is_read=True)
+            if marked:
+                await self._change_counters(conn, user_id=user_id, total=0, unread=-marked)
+        if marked:
+            await replica_routing.mark_write(user_id)
+        return marked
+
+    async def get_unread_count(self, user_id: int) -> int:
+        """Количество непрочитанных уведомлений из счетчика пользователя: один запрос по первичному ключу."""
+        async with replica_routing.reads(user_id):
+            unread = await (
+                NotificationCounter.filter(user_id=user_id)
+                .first()
+                .values_list("unread", flat=True)
+            )
+        return max(unread or 0, 0)
+
+    async def get_list_version(self, user_id: int) -> Optional[int]:
+        """
+        Версия уведомлений пользователя: растет при каждом создании, удалении и пометке прочтения.
+
+        Returns:
+            Optional[int]: версия или None, если счетчика пользователя еще нет.
+        """
+        async with replica_routing.reads(user_id):
+            return await (
+                NotificationCounter.filter(user_id=user_id)
+                .first()
+                .values_list("version", flat=True)
+            )
+
+    async def reconcile_counters(self, batch_size: int) -> int:
+        """
+        Сверяет счетчики (всего и непрочитанных) с реальным количеством уведомлений и чинит расхождения.
+
+        Пользователи обходятся пачками по id. Для каждого расхождения строка счетчика
+        блокируется, после чего значение пересчитывается, поэтому параллельные
+        создания/удаления не теряются.
+
+        Returns:
+            int: количество исправленных счетчиков.
+        """
+        fixed = 0
+        last_user_id = 0
+        while True:
+            user_ids = await (
+                User.filter(id__gt=last_user_id)
+                .order_by("id")
+                .limit(batch_size)
+                .values_list("id", flat=True)
+            )
+            if not user_ids:
+                return fixed
+            last_user_id = user_ids[-1]
+
+            actual = {
+                user_id: (total, unread)
+                for user_id, total, unread in await Notification.filter(user_id__in=user_ids)
+                .annotate(cnt=Count("id"), unread=Count("id", _filter=Q(is_read=False)))
+                .group_by("user_id")
+                .values_list("user_id", "cnt", "unread")
+            }
+            stored = {
+                user_id: (total, unread)
+                for user_id, total, unread in await NotificationCounter.filter(user_id__in=user_ids)
+                .values_list("user_id", "total", "unread")
+            }
+            for user_id in user_ids:
+                if user_id in stored and stored[user_id] == actual.get(user_id, (0, 0)):
+                    continue
+                async with in_transaction("default") as conn:
+                    await NotificationCounter.select_for_update().using_db(conn).filter(
+                        user_id=user_id,
+                    ).first()
+                    await self._set_counters(conn, user_id=user_id)
+                fixed += 1
+
+    async def _fetch_page(
+        self,
+        user_id: int,
+        pagination: Pagination,
+        exact_count: bool,
+    ) -> tuple[int, list[dict], Optional[str]]:
+        async with replica_routing.reads(user_id):
+            total = await self._get_total(user_id=user_id, exact=exact_count, unread_only=pagination.unread_only)
+            rows = await self.page_queryset(user_id=user_id, pagination=pagination)
+        has_more = len(rows) > pagination.per_page
+        rows = rows[:pagination.per_page]
+        next_cursor = encode_cursor(rows[-1]["id"], pagination.order) if has_more else None
+        return total, rows, next_cursor
+
+    async def _get_total(self, user_id: int, exact: bool, unread_only: bool = False) -> int:
+        if not exact:
+            total = await (
+                NotificationCounter.filter(user_id=user_id)
+                .first()
+                .values_list("unread" if unread_only else "total", flat=True)
+            )
+            if total is not None:
+                return max(total, 0)
+        query = Notification.filter(user_id=user_id)
+        if unread_only:
+            query = query.filter(is_read=False)
+        return await query.count()
+
+    async def _change_counters(self, conn: BaseDBAsyncClient, user_id: int, total: int, unread: int) -> None:
+        updated = await NotificationCounter.filter(user_id=user_id).using_db(conn).update(
+            total=F("total") + total,
+            unread=F("unread") + unread,
+            version=F("version") + 1,
+        )
+        if not updated:
+            await self._set_counters(conn, user_id=user_id)
+
+    async def _set_counters(self, conn: BaseDBAsyncClient, user_id: int) -> None:
+        """Записывает в счетчик точное количество уведомлений (всего и непрочитанных) и увеличивает версию."""
+        total = await Notification.filter(user_id=user_id).using_db(conn).count()
+        unread = await Notification.filter(user_id=user_id, is_read=False).using_db(conn).count()
+        updated = await NotificationCounter.filter(user_id=user_id).using_db(conn).update(
+            total=total,
+            unread=unread,
+            version=F("version") + 1,
+        )
+        if updated:
+            return
         try:
-            notification = await Notification.get(id=notification_id, user_id=user_id)
-            await notification.delete()
-        except DoesNotExist:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                                detail="Notification not found")
+            async with in_transaction("default") as savepoint:
+                await NotificationCounter.create(user_id=user_id, total=total, unread=unread, using_db=savepoint)
+        except IntegrityError:
+            await NotificationCounter.filter(user_id=user_id).using_db(conn).update(
+                total=total,
+                unread=unread,
+                version=F("version") + 1,
+            )
+
+
+def _unread(rows: list[dict]) -> int:
+    return sum(1 for row in rows if not row["is_read"])
+
+
+class NotificationPageStream:
+    """Страница уведомлений, которая читается из БД пачками.
+
+    `count` и `next_cursor` известны только после того, как `chunks()` прочитаны до конца.
+    """
+
+    def __init__(
+        self,
+        repository: NotificationRepository,
+        user_id: int,
+        pagination: Pagination,
+        chunk_size: int,
+        total: int,
+    ):
+        """Initialize NotificationPageStream.
+
+        Args:
+            repository (NotificationRepository): Репозиторий, через который читаются строки.
+            user_id (int): Владелец уведомлений.
+            pagination (Pagination): Запрошенная страница.
+            chunk_size (int): Строк в одном запросе.
+            total (int): Всего уведомлений пользователя.
+        """
+        self.repository = repository
+        self.user_id = user_id
+        self.pagination = pagination
+        self.chunk_size = chunk_size
+        self.total = total
+        self.page = pagination.page
+        self.pages = ceil(total / pagination.per_page)
+        self.count = 0
+        self.next_cursor: Optional[str] = None
+
+    async def chunks(self) -> AsyncIterator[list[dict]]:
+        """Строки страницы пачками, в сумме не больше `per_page`."""
+        pagination = self.pagination
+        # На одну строку больше `per_page`: лишняя строка означает, что есть следующая страница.
+        remaining = pagination.per_page + 1
+        last_sent_id = None
+        while remaining > 0:
+            limit = min(self.chunk_size, remaining)
+            async with replica_routing.reads(self.user_id):
+                rows = await self.repository.page_queryset(user_id=self.user_id, pagination=pagination, limit=limit)
+            remaining -= len(rows)
+            cursor_id = rows[-1]["id"] if rows else None
+            if remaining == 0:
+                rows = rows[:-1]
+            if rows:
+                self.count += len(rows)
+                last_sent_id = rows[-1]["id"]
+                yield rows
+            if remaining == 0:
+                self.next_cursor = encode_cursor(last_sent_id, pagination.order)
+                return
+            if len(rows) < limit:
+                return
+            pagination = pagination.model_copy(update={"cursor_id": cursor_id})
 
 
 notification_repository = NotificationRepository()
@@ -1,9 +1,24 @@
+from collections.abc import Iterable
 from typing import Optional
 from fastapi import HTTPException, status
+from tortoise.transactions import in_transaction
+
+from src.config.settings import settings
+from src.metrics import track_db_methods
+from src.models.notification_counter import NotificationCounter
 from src.models.user import User
+from src.utils.ttl_cache import TTLCache
 
 
+@track_db_methods
 class AuthRepository:
+    def __init__(self):
+        # Только положительные ответы: пользователей не удаляют, а новый id может появиться.
+        self.existing_users = TTLCache(
+            maxsize=settings.cache.USER_EXISTS_CACHE_SIZE,
+            ttl=settings.cache.USER_EXISTS_CACHE_TTL,
+        )
+
     async def get_by_id(self, user_id: int) -> User:
         user = await User.get_or_none(id=user_id)
         if not user:
@@ -13,9 +28,39 @@ class AuthRepository:
     async def get_by_username(self, username: str) -> Optional[User]:
         return await User.get_or_none(username=username)
 
+    async def user_exists(self, user_id: int) -> bool:
+        """Проверяет существование пользователя, сначала по кешу."""
+        return user_id in await self.filter_existing([user_id])
+
+    async def filter_existing(self, user_ids: Iterable[int]) -> set[int]:
+        """
+        Возвращает id из `user_ids`, для которых есть пользователь.
+
+        Закешированные id не запрашиваются, остальные проверяются одним запросом.
+        """
+        existing = set()
+        unknown = set()
+        for user_id in user_ids:
+            if self.existing_users.get(user_id):
+                existing.add(user_id)
+            else:
+                unknown.add(user_id)
+        if unknown:
+            found = await User.filter(id__in=unknown).values_list("id", flat=True)
+            for user_id in found:
+                self.existing_users.set(user_id, True)
+            existing.update(found)
+        return existing
+
+    async def update_password(self, user_id: int, hashed_password: str) -> None:
+        await User.filter(id=user_id).update(password=hashed_password)
+
     async def create_user(self, username: str, hashed_password: str) -> User:
         try:
-            return await User.create(username=username, password=hashed_password)
+            async with in_transaction("default") as conn:
+                user = await User.create(username=username, password=hashed_password, using_db=conn)
+                await NotificationCounter.create(user=user, using_db=conn)
+                return user
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
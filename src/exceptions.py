@@ -17,3 +17,7 @@ class UnexpectedError(Exception):
         """
         self.request_data = request_data
         self.error = error
+
+
+class DatabasePoolTimeoutError(Exception):
+    """Исключение вызывается, если свободное соединение с БД не получено за `DB_POOL_ACQUIRE_TIMEOUT`."""
@@ -0,0 +1,236 @@
+"""Module with application metrics.
+
+Метрики HTTP-запросов, методов репозиториев, проверки токенов и bcrypt
+собираются в `registry` каждого процесса. С `METRICS_DIR` каждый воркер
+периодически сохраняет снимок в `<METRICS_DIR>/<pid>.json`, и `/api/metrics`
+в любом воркере отдает сумму снимков всех живых воркеров.
+"""
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import structlog
+from fastapi import HTTPException
+
+from src.config.settings import settings
+from src.db.pool import PoolMetrics, pool_metrics, pool_stats
+from src.utils.metrics import Counter, Gauge, Histogram, MetricsRegistry, merge_snapshots, render_text
+
+logger = structlog.stdlib.get_logger('metrics')
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.register(Counter(
+    'http_requests_total',
+    'HTTP requests by method, route template and status code.',
+    ('method', 'route', 'status'),
+))
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    'http_request_duration_seconds',
+    'HTTP request duration by method and route template.',
+    ('method', 'route'),
+))
+HTTP_REQUESTS_IN_PROGRESS = registry.register(Gauge(
+    'http_requests_in_progress',
+    'HTTP requests being processed.',
+    ('method',),
+))
+DB_METHOD_DURATION = registry.register(Histogram(
+    'db_method_duration_seconds',
+    'Repository method duration, including waiting for a pool connection.',
+    ('method',),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+))
+DB_METHOD_ERRORS = registry.register(Counter(
+    'db_method_errors_total',
+    'Repository method calls that raised an unexpected exception.',
+    ('method',),
+))
+DB_POOL_CONNECTIONS = registry.register(Gauge(
+    'db_pool_connections',
+    'Database pool connections by state.',
+    ('connection', 'state'),
+))
+DB_POOL_ACQUIRE_TIMEOUTS = registry.register(Counter(
+    'db_pool_acquire_timeouts_total',
+    'Requests that did not get a pool connection within DB_POOL_ACQUIRE_TIMEOUT.',
+    ('connection',),
+))
+DB_POOL_ACQUIRE_WAIT = registry.register(Histogram(
+    'db_pool_acquire_wait_seconds',
+    'Time spent waiting for a database pool connection.',
+    ('connection',),
+    buckets=PoolMetrics.wait_buckets,
+))
+AUTH_DECODE_DURATION = registry.register(Histogram(
+    'auth_decode_duration_seconds',
+    'Access token check duration by result: cache hit, decoded JWT or invalid token.',
+    ('result',),
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005),
+))
+PASSWORD_HASHING_DURATION = registry.register(Histogram(
+    'password_hashing_duration_seconds',
+    'bcrypt hash/verify duration including the wait for a hashing thread.',
+    ('operation',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+))
+
+INGEST_BATCH_SIZE = registry.register(Histogram(
+    'ingest_batch_size',
+    'Notifications written by one flush of the ingest buffer.',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+)).labels()
+INGEST_FLUSH_DURATION = registry.register(Histogram(
+    'ingest_flush_duration_seconds',
+    'Duration of one ingest buffer flush by result.',
+    ('result',),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+))
+INGEST_WAIT_DURATION = registry.register(Histogram(
+    'ingest_wait_duration_seconds',
+    'Time from accepting a notification into the ingest buffer until it is written.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)).labels()
+INGEST_REJECTED = registry.register(Counter(
+    'ingest_rejected_total',
+    'Notifications rejected with 503 because the ingest buffer was full.',
+)).labels()
+INGEST_FAILED = registry.register(Counter(
+    'ingest_failed_total',
+    'Notifications from the ingest buffer that could not be written.',
+)).labels()
+
+HTTP_COMPRESSION_BYTES = registry.register(Counter(
+    'http_compression_bytes_total',
+    'Bytes of compressed JSON responses before (raw) and after (compressed) compression.',
+    ('encoding', 'kind'),
+))
+HTTP_COMPRESSION_DURATION = registry.register(Histogram(
+    'http_compression_duration_seconds',
+    'Time to compress a response body or streamed chunk, including the wait for a thread when offloaded.',
+    ('encoding', 'offloaded'),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+))
+
+
+def _collect_db_pools() -> None:
+    for connection, stats in pool_stats().items():
+        DB_POOL_CONNECTIONS.labels(connection, 'in_use').set(stats['in_use'])
+        DB_POOL_CONNECTIONS.labels(connection, 'idle').set(stats['idle'])
+        DB_POOL_CONNECTIONS.labels(connection, 'waiting').set(stats['waiting'])
+        DB_POOL_ACQUIRE_TIMEOUTS.labels(connection).value = stats['timeouts']
+    # Корзины гистограммы совпадают с `PoolMetrics.wait_buckets`: счетчики пула копируются как есть.
+    for connection, metrics in pool_metrics().items():
+        wait = DB_POOL_ACQUIRE_WAIT.labels(connection)
+        wait.counts = list(metrics.wait_counts)
+        wait.sum = metrics.wait_total
+        wait.count = metrics.acquired
+
+
+registry.add_collector(_collect_db_pools)
+
+
+def track_db_methods(cls: type) -> type:
+    """Декоратор класса репозитория: время и ошибки каждого публичного async-метода.
+
+    HTTPException (например, 404 из репозитория) ошибкой не считается.
+    """
+    for name, func in list(vars(cls).items()):
+        if name.startswith('_') or not inspect.iscoroutinefunction(func):
+            continue
+        setattr(cls, name, _timed_db_method(func, '{cls}.{name}'.format(cls=cls.__name__, name=name)))
+    return cls
+
+
+def _timed_db_method(func: Callable, label: str) -> Callable:
+    duration = DB_METHOD_DURATION.labels(label)
+    errors = DB_METHOD_ERRORS.labels(label)
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except HTTPException:
+            raise
+        except Exception:
+            errors.inc()
+            raise
+        finally:
+            duration.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def _snapshot_path(pid: int) -> Path:
+    return Path(settings.metrics.METRICS_DIR) / '{pid}.json'.format(pid=pid)
+
+
+def write_snapshot() -> None:
+    """Сохранить снимок метрик процесса для остальных воркеров (если задан METRICS_DIR)."""
+    if not settings.metrics.METRICS_DIR:
+        return
+    path = _snapshot_path(os.getpid())
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(registry.snapshot()))
+    os.replace(tmp_path, path)
+
+
+def remove_snapshot() -> None:
+    """Удалить снимок процесса при остановке воркера."""
+    if settings.metrics.METRICS_DIR:
+        _snapshot_path(os.getpid()).unlink(missing_ok=True)
+
+
+def render_metrics() -> str:
+    """Метрики всех воркеров в текстовом формате Prometheus.
+
+    Свой процесс берется из памяти, остальные - из последних снимков живых процессов.
+    Снимки завершившихся процессов удаляются: их счетчики пропадают, что Prometheus
+    считает сбросом счетчика.
+    """
+    snapshots = [registry.snapshot()]
+    if settings.metrics.METRICS_DIR:
+        own_pid = os.getpid()
+        for path in Path(settings.metrics.METRICS_DIR).glob('*.json'):
+            try:
+                pid = int(path.stem)
+            except ValueError:
+                continue
+            if pid == own_pid:
+                continue
+            if not _is_alive(pid):
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # Файл мог исчезнуть вместе с воркером.
+                continue
+    return render_text(merge_snapshots(snapshots))
+
+
+async def run_snapshot_writer(interval: float) -> None:
+    """Периодически сохранять снимок метрик процесса."""
+    while True:
+        try:
+            write_snapshot()
+        except OSError as exc:
+            logger.warning('Не удалось сохранить снимок метрик: {error}'.format(error=exc))
+        await asyncio.sleep(interval)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
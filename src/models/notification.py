@@ -1,4 +1,5 @@
 from tortoise import models, fields
+from tortoise.indexes import Index, PartialIndex
 from enum import Enum
 
 
@@ -14,3 +15,19 @@ class Notification(models.Model):
     type = fields.CharEnumField(NotificationType)
     text = fields.CharField(max_length=255)
     created_at = fields.DatetimeField(auto_now_add=True)
+    # Сгруппированные уведомления: одна строка на (пользователь, тип, group_key, окно).
+    group_key = fields.CharField(max_length=255, null=True)
+    bucket = fields.BigIntField(null=True, description="Начало окна группировки, unix time")
+    actor_count = fields.IntField(default=1)
+    is_read = fields.BooleanField(default=False)
+
+    class Meta:
+        # group_key первым: выборки по user_id не должны выбирать этот индекс вместо idx_notification_user_*.
+        unique_together = (("group_key", "user", "type", "bucket"),)
+        indexes = (
+            # Все выборки идут в разрезе пользователя: список/курсор по id, удаление по id.
+            Index(fields=("user_id", "id"), name="idx_notification_user_id_id"),
+            Index(fields=("user_id", "created_at"), name="idx_notification_user_created"),
+            # Только непрочитанные строки: unread_only-списки и пометка прочтения не читают прочитанные.
+            PartialIndex(fields=("user_id", "id"), name="idx_notification_user_unread", condition={"is_read": False}),
+        )
@@ -0,0 +1,15 @@
+from tortoise import models, fields
+
+
+class NotificationCounter(models.Model):
+    """Денормализованные счетчики уведомлений пользователя.
+
+    Обновляются в той же транзакции, что и создание/удаление уведомлений,
+    расхождения исправляет периодическая сверка.
+    """
+    user = fields.OneToOneField("models.User", related_name="notification_counter", pk=True)
+    total = fields.IntField(default=0)
+    unread = fields.IntField(default=0)
+    # Растет при каждом изменении уведомлений пользователя: из него строится ETag списка.
+    version = fields.BigIntField(default=0)
+    updated_at = fields.DatetimeField(auto_now=True)
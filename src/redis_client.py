@@ -0,0 +1,32 @@
+"""Module with shared Redis client."""
+
+from src.config.settings import settings
+
+try:
+    from redis import asyncio as aioredis
+except ImportError:  # redis нужен только для BROKER_BACKEND=redis
+    aioredis = None
+
+_redis_client = None
+
+
+async def get_redis_client():
+    """Вернуть общий клиент Redis процесса, создав его при первом вызове.
+
+    Returns:
+        redis.asyncio.Redis: Клиент, подключенный к `REDIS_URL`.
+    """
+    global _redis_client
+    if _redis_client is None:
+        if aioredis is None:
+            raise RuntimeError('Redis backend requires the "redis" package: pip install "redis>=5.0"')
+        _redis_client = aioredis.Redis.from_url(settings.broker.REDIS_URL)
+    return _redis_client
+
+
+async def close_redis_client() -> None:
+    """Закрыть общий клиент Redis, если он был создан."""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
@@ -1,8 +1,9 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
 from pydantic import BaseModel, Field
 from tortoise.contrib.pydantic import pydantic_model_creator
+from src.config.settings import settings
 from src.models.notification import Notification, NotificationType
 from src.models.user import User
 from src.rest_models.base_schema import BaseSchema
@@ -15,6 +16,71 @@ class NotificationCreate(BaseModel):
     """
     type: NotificationType
     text: str = Field(..., max_length=255)
+    group_key: Optional[str] = Field(
+        default=None,
+        max_length=255,
+        description="Объект события (например, `post:42`): лайки и репосты одного объекта объединяются",
+    )
+
+
+class NotificationBatchItem(NotificationCreate):
+    """
+    Элемент пакетного создания. Без `user_id` уведомление создается текущему пользователю.
+    """
+    user_id: Optional[int] = None
+
+
+class NotificationBatchCreate(BaseModel):
+    """
+    Входная модель для пакетного создания уведомлений.
+    """
+    items: list[NotificationBatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.notifications.BATCH_MAX_ITEMS,
+    )
+
+
+class NotificationBatchCreated(BaseModel):
+    """
+    Результат пакетного создания: id уведомлений в порядке `items`.
+    """
+    ids: list[int]
+
+
+class NotificationAccepted(BaseModel):
+    """
+    Квитанция о приеме уведомления в буфер записи (`INGEST_MODE=accepted`).
+    """
+    receipt_id: str
+
+
+class NotificationMarkRead(BaseModel):
+    """
+    Входная модель пометки прочтения: уведомления с id <= `up_to_id`, без него - все.
+    """
+    up_to_id: Optional[int] = None
+
+
+class NotificationMarkedRead(BaseModel):
+    """
+    Результат пометки прочтения.
+    """
+    marked: int
+
+
+class NotificationUnreadCount(BaseModel):
+    """
+    Количество непрочитанных уведомлений.
+    """
+    unread: int
+
+
+class NotificationBulkDeleted(BaseModel):
+    """
+    Результат массового удаления уведомлений.
+    """
+    deleted: int
 
 
 class NotificationRead(BaseSchema):
@@ -26,6 +92,9 @@ class NotificationRead(BaseSchema):
     text: str
     created_at: datetime
     user_id: int
+    group_key: Optional[str] = None
+    actor_count: int = 1
+    is_read: bool = False
 
 
 class NotificationReadPagination(PaginationOut):
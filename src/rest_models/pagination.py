@@ -1,5 +1,7 @@
 """Module with pagination schemas."""
 
+import base64
+import binascii
 from typing import Optional
 
 from src.choices.api_choices import PaginationOrderChoices
@@ -12,6 +14,8 @@ class Pagination(BaseSchema):
     page: int
     per_page: int
     order: PaginationOrderChoices = PaginationOrderChoices.asc
+    cursor_id: Optional[int] = None
+    unread_only: bool = False
 
     @property
     def offset(self) -> Optional[int]:
@@ -23,6 +27,16 @@ class Pagination(BaseSchema):
         """
         return (self.page - 1) * self.per_page if self.page != 1 else None
 
+    @property
+    def is_keyset(self) -> bool:
+        """
+        Check whether the page is requested by cursor instead of offset.
+
+        Returns:
+            bool: True for cursor (keyset) pagination.
+        """
+        return self.cursor_id is not None
+
 
 class PaginationOut(BaseSchema):
     """Model with base pagination schema out."""
@@ -31,3 +45,44 @@ class PaginationOut(BaseSchema):
     count: int
     page: int
     pages: int
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(last_id: int, order: PaginationOrderChoices) -> str:
+    """
+    Build an opaque cursor pointing after the given row id.
+
+    Args:
+        last_id (int): Id of the last row on the current page.
+        order (PaginationOrderChoices): Order the cursor is valid for.
+
+    Returns:
+        str: urlsafe cursor string.
+    """
+    raw = '{order}:{last_id}'.format(order=order.value, last_id=last_id).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, order: PaginationOrderChoices) -> int:
+    """
+    Extract the row id from a cursor built by `encode_cursor`.
+
+    Args:
+        cursor (str): Cursor received from the client.
+        order (PaginationOrderChoices): Order requested by the client.
+
+    Returns:
+        int: Id of the last row seen by the client.
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        cursor_order, last_id = raw.split(':', 1)
+        last_id = int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Malformed cursor') from e
+    if cursor_order != order.value:
+        raise ValueError('Cursor was issued for another order')
+    return last_id
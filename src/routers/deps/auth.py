@@ -1,5 +1,10 @@
-from fastapi import Depends
+import hmac
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, Query, WebSocket, WebSocketException, status
 from fastapi.security import OAuth2PasswordBearer
+
+from src.config.settings import settings
 from src.services.auth_service import auth_service  # тебе нужно реализовать
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
@@ -8,3 +13,38 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
     payload = await auth_service.decode_jwt(token)
     return payload['sub']
+
+
+async def is_batch_producer(
+    producer_token: Optional[str] = Header(default=None, alias="X-Producer-Token"),
+) -> bool:
+    """Запрос от доверенного продюсера: заголовок X-Producer-Token совпадает с BATCH_PRODUCER_TOKEN."""
+    expected = settings.notifications.BATCH_PRODUCER_TOKEN
+    if not expected or not producer_token:
+        return False
+    return hmac.compare_digest(producer_token.encode(), expected.encode())
+
+
+async def require_ops_token(authorization: Optional[str] = Header(default=None)) -> None:
+    """Доступ к служебным эндпоинтам: `Authorization: Bearer <OPS_TOKEN>`. Без OPS_TOKEN они закрыты."""
+    expected = settings.metrics.OPS_TOKEN
+    scheme, _, token = (authorization or "").partition(" ")
+    if not expected or scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Ops token required")
+
+
+async def get_websocket_user_id(
+    websocket: WebSocket,
+    token: Optional[str] = Query(default=None, description="Access-токен, если нельзя передать заголовок"),
+) -> int:
+    """Пользователь WebSocket-подключения по токену из query `token` или заголовка Authorization."""
+    if token is None:
+        scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else None
+    if not token:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated")
+    try:
+        payload = await auth_service.decode_jwt(token)
+    except HTTPException as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc.detail))
+    return payload['sub']
@@ -1,24 +1,36 @@
 """Module with pagination dependencies."""
-from fastapi import Query
+from typing import Optional
+
+from fastapi import HTTPException, Query, status
 
 from src.choices.api_choices import PaginationOrderChoices
-from src.rest_models.pagination import Pagination
+from src.rest_models.pagination import Pagination, decode_cursor
 
 
 def generate_pagination_query_params(
     page: int = Query(ge=1, default=1),
     per_page: int = Query(ge=1, le=1000, default=50),
     order: PaginationOrderChoices = PaginationOrderChoices.asc,
+    cursor: Optional[str] = Query(default=None, max_length=64),
+    unread_only: bool = Query(default=False, description="Только непрочитанные"),
 ) -> Pagination:
     """
     Generate pagination query parameters for FastAPI endpoints.
 
     Args:
-        page (int): The page number, must be 1 or higher.
+        page (int): The page number, must be 1 or higher. Ignored when `cursor` is passed.
         per_page (int): Number of items per page, must be between 1 and 1000.
         order (PaginationOrderChoices): The order of pagination, either ascending or descending.
+        cursor (str): Opaque `next_cursor` value from the previous page, enables keyset pagination.
+        unread_only (bool): Return only unread notifications.
 
     Returns:
         Pagination: An instance of the Pagination schema containing the pagination parameters.
     """
-    return Pagination(page=page, per_page=per_page, order=order)
+    cursor_id = None
+    if cursor:
+        try:
+            cursor_id = decode_cursor(cursor, order)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return Pagination(page=page, per_page=per_page, order=order, cursor_id=cursor_id, unread_only=unread_only)
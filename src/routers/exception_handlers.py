@@ -5,7 +5,7 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 
-from src.exceptions import  UnexpectedError
+from src.exceptions import DatabasePoolTimeoutError, UnexpectedError
 
 
 logger = structlog.stdlib.get_logger('post')
@@ -31,6 +31,28 @@ async def unexpected_error(
     )
 
 
+async def database_pool_timeout(
+    request: Request,
+    exc: DatabasePoolTimeoutError,
+) -> JSONResponse:
+    """Handle DatabasePoolTimeoutError.
+
+    Args:
+        request (Request): The incoming request.
+        exc (DatabasePoolTimeoutError): The exception instance.
+
+    Returns:
+        JSONResponse: 503, клиенту стоит повторить запрос позже.
+    """
+    logger.warning('Пул соединений с БД исчерпан: {error}.'.format(error=str(exc)))
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={'detail': 'Database is overloaded, retry later'},
+        headers={'Retry-After': '1'},
+    )
+
+
 exception_handlers: dict = {
     UnexpectedError: unexpected_error,
+    DatabasePoolTimeoutError: database_pool_timeout,
 }
@@ -1,6 +1,16 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from starlette.responses import JSONResponse
 
+from src.brokers import notification_broker
+from src.config.log_queue import default_log_queue
+from src.db.pool import pool_stats
+from src.db.replica import replica_routing
+from src.db_services.users_repository import auth_repository
+from src.routers.deps.auth import require_ops_token
+from src.services.auth_service import auth_service
+from src.services.notification_service import notification_service
+from src.services.password_hasher import password_hasher
+
 
 healthcheck_router = APIRouter()
 
@@ -8,3 +18,19 @@ healthcheck_router = APIRouter()
 @healthcheck_router.get("/health")
 def health_check():
     return JSONResponse(content={"status": "ok"})
+
+
+@healthcheck_router.get("/health/stats", dependencies=[Depends(require_ops_token)])
+def health_stats():
+    return JSONResponse(content={
+        "caches": {
+            "tokens": auth_service.token_cache.stats(),
+            "existing_users": auth_repository.existing_users.stats(),
+        },
+        "password_hashing": password_hasher.stats(),
+        "log_queue": default_log_queue.stats(),
+        "notification_stream": notification_broker.stats(),
+        "db_pools": pool_stats(),
+        "replica_routing": replica_routing.stats(),
+        "ingest_buffer": notification_service.ingest.stats(),
+    })
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from starlette.responses import PlainTextResponse
+
+from src.metrics import render_metrics
+from src.routers.deps.auth import require_ops_token
+
+
+metrics_router = APIRouter(dependencies=[Depends(require_ops_token)])
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
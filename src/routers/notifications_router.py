@@ -1,31 +1,237 @@
-from fastapi import APIRouter, Depends, status, Query, Path
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import suppress
+from datetime import datetime
+from typing import Optional
 
-from src.rest_models.notification_schema import NotificationCreate, NotificationRead
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Path, Response, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.websockets import WebSocketDisconnect
+
+from src.config.settings import settings
+from src.db_services.notifications_repository import NotificationPageStream
+
+from src.rest_models.notification_schema import NotificationAccepted, NotificationBatchCreate, \
+    NotificationBatchCreated, NotificationBulkDeleted, NotificationCreate, NotificationMarkedRead, \
+    NotificationMarkRead, NotificationRead, NotificationUnreadCount
 
 from src.rest_models.notification_schema import NotificationReadPagination
 from src.rest_models.pagination import Pagination
 from src.routers.deps.pagination import generate_pagination_query_params
+from src.routers.responses import FastJSONResponse
 from src.services.notification_service import notification_service
+from src.utils.fast_json import dumps
 
-from src.routers.deps.auth import get_current_user_id
+from src.routers.deps.auth import get_current_user_id, get_websocket_user_id, is_batch_producer
 
 notifications_router = APIRouter()
 
 
-@notifications_router.post("/", status_code=status.HTTP_201_CREATED)
+@notifications_router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": NotificationAccepted, "description": "INGEST_MODE=accepted"}},
+)
 async def create_notification(
     payload: NotificationCreate,
     current_user_id: int = Depends(get_current_user_id),
 ) -> NotificationRead:
-    return await notification_service.create(user_id=current_user_id, data=payload)
+    notification = await notification_service.create(user_id=current_user_id, data=payload)
+    if isinstance(notification, NotificationAccepted):
+        # Уведомление будет записано со следующей пачкой буфера.
+        return FastJSONResponse(notification, status_code=status.HTTP_202_ACCEPTED)
+    if settings.notifications.FAST_JSON_RESPONSES:
+        return FastJSONResponse(notification, status_code=status.HTTP_201_CREATED)
+    return notification
+
+
+@notifications_router.post("/batch", status_code=status.HTTP_201_CREATED)
+async def create_notifications_batch(
+    payload: NotificationBatchCreate,
+    current_user_id: int = Depends(get_current_user_id),
+    producer: bool = Depends(is_batch_producer),
+) -> NotificationBatchCreated:
+    """
+    Создает уведомления пачкой. Чужой `user_id` в элементах разрешен только с X-Producer-Token.
+    """
+    return await notification_service.create_batch(user_id=current_user_id, data=payload, producer=producer)
 
 
-@notifications_router.get("/")
+@notifications_router.get("/", responses={status.HTTP_304_NOT_MODIFIED: {"description": "Список не изменился"}})
 async def list_notifications(
+    response: Response,
     pagination: Pagination = Depends(generate_pagination_query_params),
+    exact_count: bool = Query(default=False, description="Считать total через COUNT(*)"),
+    if_none_match: Optional[str] = Header(default=None, alias="If-None-Match"),
     current_user_id: int = Depends(get_current_user_id),
 ) -> NotificationReadPagination:
-    return await notification_service.list(user_id=current_user_id, pagination=pagination)
+    """
+    Список уведомлений с ETag.
+
+    Тег читается до страницы: если список изменится между двумя запросами, ответ окажется
+    новее тега и следующий `If-None-Match` просто не совпадет. При совпадении - 304 без
+    запроса страницы и сериализации.
+    """
+    etag = await notification_service.list_etag(user_id=current_user_id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else {}
+    if etag and _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if settings.notifications.FAST_JSON_RESPONSES:
+        if pagination.per_page > settings.notifications.LIST_CHUNK_SIZE:
+            # Большая страница читается из БД и отдается клиенту пачками.
+            page = await notification_service.stream_list_data(
+                user_id=current_user_id,
+                pagination=pagination,
+                chunk_size=settings.notifications.LIST_CHUNK_SIZE,
+                exact_count=exact_count,
+            )
+            return StreamingResponse(_format_page_json(page), media_type="application/json", headers=headers)
+        # Строки из БД не валидируются повторно, ответ кодируется сразу в байты.
+        return FastJSONResponse(await notification_service.list_data(
+            user_id=current_user_id,
+            pagination=pagination,
+            exact_count=exact_count,
+        ), headers=headers)
+    response.headers.update(headers)
+    return await notification_service.list(
+        user_id=current_user_id,
+        pagination=pagination,
+        exact_count=exact_count,
+    )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Слабое сравнение (RFC 9110): префикс W/ не учитывается.
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in if_none_match.split(","))
+
+
+@notifications_router.post("/read")
+async def mark_notifications_read(
+    payload: NotificationMarkRead,
+    current_user_id: int = Depends(get_current_user_id),
+) -> NotificationMarkedRead:
+    """
+    Отмечает прочитанными уведомления с id <= `up_to_id` (без него - все) одним UPDATE.
+    """
+    return await notification_service.mark_read(user_id=current_user_id, up_to_id=payload.up_to_id)
+
+
+@notifications_router.get("/unread_count")
+async def get_unread_count(
+    current_user_id: int = Depends(get_current_user_id),
+) -> NotificationUnreadCount:
+    """
+    Количество непрочитанных уведомлений из счетчика пользователя, без подсчета строк.
+    """
+    return await notification_service.unread_count(user_id=current_user_id)
+
+
+@notifications_router.get("/stream", response_class=StreamingResponse)
+async def stream_notifications(
+    last_event_id: Optional[int] = Header(default=None, alias="Last-Event-ID"),
+    current_user_id: int = Depends(get_current_user_id),
+) -> StreamingResponse:
+    """
+    Поток новых уведомлений в формате Server-Sent Events.
+
+    Токен проверяется один раз при подключении. id события - id уведомления,
+    при переподключении с `Last-Event-ID` пропущенные уведомления догоняются из БД.
+    """
+    events = notification_service.stream(
+        user_id=current_user_id,
+        last_event_id=last_event_id,
+        heartbeat_interval=settings.notifications.STREAM_HEARTBEAT_INTERVAL,
+    )
+    return StreamingResponse(
+        _format_sse(events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _format_page_json(page: NotificationPageStream) -> AsyncIterator[bytes]:
+    # count и next_cursor известны только после всех строк, поэтому идут после items.
+    yield b'{"total":%d,"page":%d,"pages":%d,"items":[' % (page.total, page.page, page.pages)
+    separator = b""
+    async for rows in page.chunks():
+        yield separator + dumps(rows)[1:-1]
+        separator = b","
+    yield b'],"count":%d,"next_cursor":%s}' % (page.count, dumps(page.next_cursor))
+
+
+async def _format_sse(events: AsyncIterator[Optional[NotificationRead]]) -> AsyncIterator[str]:
+    async for event in events:
+        if event is None:
+            yield ": ping\n\n"
+        else:
+            yield "id: {id}\nevent: notification\ndata: {data}\n\n".format(
+                id=event.id,
+                data=event.model_dump_json(),
+            )
+
+
+@notifications_router.websocket("/ws")
+async def notifications_websocket(
+    websocket: WebSocket,
+    last_id: Optional[int] = Query(default=None, description="Отдать сначала уведомления с id > last_id"),
+    current_user_id: int = Depends(get_websocket_user_id),
+):
+    """
+    Новые уведомления по WebSocket: `{"event": "notification", "data": {...}}` и `{"event": "ping"}`.
+
+    Уведомления приходят из любого воркера через брокер (`BROKER_BACKEND`). Клиент,
+    который не успевает читать (очередь переполнена или отправка дольше `WS_SEND_TIMEOUT`),
+    отключается с кодом 1013 и может переподключиться с `last_id`.
+    """
+    await websocket.accept()
+    events = notification_service.stream(
+        user_id=current_user_id,
+        last_event_id=last_id,
+        heartbeat_interval=settings.notifications.STREAM_HEARTBEAT_INTERVAL,
+        resume_on_lag=False,
+    )
+    sender = asyncio.create_task(_send_websocket_events(websocket, events))
+    receiver = asyncio.create_task(_wait_websocket_disconnect(websocket))
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if sender in done and not sender.exception():
+        # Поток завершился сам - клиент не успевал читать.
+        with suppress(Exception):
+            await asyncio.wait_for(
+                websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Slow consumer"),
+                timeout=settings.notifications.WS_SEND_TIMEOUT,
+            )
+
+
+async def _send_websocket_events(
+    websocket: WebSocket,
+    events: AsyncIterator[Optional[NotificationRead]],
+) -> None:
+    async for event in events:
+        if event is None:
+            message = '{"event": "ping"}'
+        else:
+            message = '{{"event": "notification", "data": {data}}}'.format(data=event.model_dump_json())
+        try:
+            await asyncio.wait_for(websocket.send_text(message), timeout=settings.notifications.WS_SEND_TIMEOUT)
+        except TimeoutError:
+            return
+
+
+async def _wait_websocket_disconnect(websocket: WebSocket) -> None:
+    # Сообщения клиента не используются, читаются только чтобы заметить отключение.
+    with suppress(WebSocketDisconnect):
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
 
 
 @notifications_router.delete("/{notification_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -34,3 +240,22 @@ async def delete_notification(
     current_user_id: int = Depends(get_current_user_id),
 ):
     await notification_service.delete(user_id=current_user_id, notification_id=notification_id)
+
+
+@notifications_router.delete("/")
+async def delete_notifications(
+    ids: Optional[list[int]] = Query(default=None, description="Удалить уведомления с этими id"),
+    before_id: Optional[int] = Query(default=None, description="Удалить уведомления с id < before_id"),
+    before_date: Optional[datetime] = Query(default=None, description="Удалить уведомления старше даты"),
+    delete_all: bool = Query(default=False, alias="all", description="Удалить все уведомления"),
+    current_user_id: int = Depends(get_current_user_id),
+) -> NotificationBulkDeleted:
+    if not (ids or before_id is not None or before_date is not None or delete_all):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Pass ids, before_id, before_date or all=true")
+    return await notification_service.delete_many(
+        user_id=current_user_id,
+        ids=ids,
+        before_id=before_id,
+        before_date=before_date,
+    )
@@ -0,0 +1,26 @@
+"""Модуль с классами ответов."""
+
+from typing import Any
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from src.utils.fast_json import dumps
+
+
+class FastJSONResponse(Response):
+    """JSON-ответ, который FastAPI отдает как есть, без `response_model`.
+
+    Возврат экземпляра `Response` из эндпоинта пропускает повторную валидацию
+    и `jsonable_encoder`: pydantic-модель сериализуется один раз своим
+    сериализатором, dict/list - через `src.utils.fast_json.dumps`.
+    """
+
+    media_type = 'application/json'
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode('utf-8')
+        return dumps(content)
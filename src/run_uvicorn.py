@@ -1,37 +1,89 @@
 """Module for running the Uvicorn server with custom logging configuration."""
 
 import os
+import shutil
 import sys
+import tempfile
 
 import uvicorn
+from fastapi import FastAPI
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.app.main import app
+from src.choices.service_choices import ReplicaPinStoreChoices
 from src.config.logger_setup import configure_logger
 from src.config.settings import settings
 from src.config.uvicorn_logger import build_uvicorn_log_config
 
 
-def run():
-    """Configure logging and run the ASGI application using uvicorn."""
+def resolve_workers(workers: int) -> int:
+    """Количество воркеров: 0 - по числу CPU, доступных процессу (учитывает affinity)."""
+    if workers > 0:
+        return workers
+    return os.process_cpu_count() or 1
+
+
+def create_app() -> FastAPI:
+    """Фабрика приложения для uvicorn.
+
+    Вызывается в каждом процессе-воркере, поэтому structlog и корневой логгер
+    настраиваются в том процессе, который обслуживает запросы.
+    """
     configure_logger(
         level=settings.logging.LOGGING_LEVEL,
         json_console_format=settings.logging.JSON_CONSOLE_FORMAT,
         json_file_format=settings.logging.JSON_FILE_FORMAT,
+        profile=settings.logging.LOG_PROFILE,
+        per_process_file=resolve_workers(settings.server.SERVER_WORKERS) > 1,
     )
+    from src.app.main import app
+
+    return app
+
+
+def run():
+    """Configure logging and run the ASGI application using uvicorn.
+
+    С `SERVER_WORKERS` больше 1 uvicorn запускает процессы-воркеры с общим сокетом
+    и перезапускает упавшие. Логирование uvicorn настраивается в каждом воркере заново.
+    Если `METRICS_DIR` не задан, для снимков метрик воркеров создается временный
+    каталог: воркеры наследуют его через окружение.
+    """
+    workers = resolve_workers(settings.server.SERVER_WORKERS)
+    shared_pins = settings.db.DB_READ_YOUR_WRITES_STORE != ReplicaPinStoreChoices.memory
+    if workers > 1 and settings.db.HAS_REPLICA and not shared_pins:
+        # Отметку о записи видел бы только воркер, обработавший запись, остальные читали бы реплику.
+        raise SystemExit('With a read replica and several workers set DB_READ_YOUR_WRITES_STORE=redis')
+    metrics_dir = None
+    if workers > 1 and not settings.metrics.METRICS_DIR:
+        metrics_dir = tempfile.mkdtemp(prefix='notifications-metrics-')
+        os.environ['METRICS_DIR'] = metrics_dir
     uvicorn_logger_config = build_uvicorn_log_config(
         level=settings.logging.LOGGING_LEVEL,
         json_console_format=settings.logging.JSON_CONSOLE_FORMAT,
         json_file_format=settings.logging.JSON_FILE_FORMAT,
+        profile=settings.logging.LOG_PROFILE,
+        per_process_file=workers > 1,
     )
-    uvicorn.run(
-        app=app,
-        host=settings.server.SERVER_HOST,
-        port=settings.server.SERVER_PORT,
-        log_config=uvicorn_logger_config,
-        use_colors=True,
-    )
+    try:
+        uvicorn.run(
+            app='src.run_uvicorn:create_app',
+            factory=True,
+            host=settings.server.SERVER_HOST,
+            port=settings.server.SERVER_PORT,
+            workers=workers,
+            loop=settings.server.SERVER_LOOP,
+            http=settings.server.SERVER_HTTP,
+            backlog=settings.server.BACKLOG,
+            timeout_keep_alive=settings.server.KEEP_ALIVE_TIMEOUT,
+            limit_concurrency=settings.server.LIMIT_CONCURRENCY or None,
+            log_config=uvicorn_logger_config,
+            use_colors=True,
+            timeout_graceful_shutdown=settings.server.GRACEFUL_SHUTDOWN_TIMEOUT,
+        )
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
 
 
 if __name__ == '__main__':
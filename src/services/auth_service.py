@@ -1,23 +1,43 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
-from passlib.context import CryptContext
 import jwt
+from src.metrics import AUTH_DECODE_DURATION
 from src.services.base_service import BaseService
 from src.config.settings import settings
 from src.rest_models.token import TokenPair, OAuth2TokenResponse
 from src.db_services.users_repository import auth_repository
+from src.services.password_hasher import password_hasher
+from src.utils.ttl_cache import TTLCache
+
+
+_DECODE_HIT = AUTH_DECODE_DURATION.labels("hit")
+_DECODE_DECODED = AUTH_DECODE_DURATION.labels("decoded")
+_DECODE_INVALID = AUTH_DECODE_DURATION.labels("invalid")
 
 
 class AuthService(BaseService):
     """Service for authentication logic using JWT."""
 
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    def __init__(self, db, hasher):
+        super().__init__(db)
+        self.hasher = hasher
+        # Проверенные access-токены: ключ - sha256 токена, запись живет не дольше exp.
+        self.token_cache = TTLCache(
+            maxsize=settings.cache.TOKEN_CACHE_SIZE,
+            ttl=settings.cache.TOKEN_CACHE_TTL,
+        )
 
-    def hash_password(self, password: str) -> str:
-        return self.pwd_context.hash(password)
+    async def hash_password(self, password: str) -> str:
+        return await self.hasher.hash(password)
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def verify_password(self, user_id: int, plain_password: str, hashed_password: str) -> bool:
+        """Проверяет пароль; хеш, посчитанный с устаревшими параметрами, сразу пересчитывается."""
+        valid, new_hash = await self.hasher.verify_and_update(plain_password, hashed_password)
+        if valid and new_hash:
+            await self.db.update_password(user_id=user_id, hashed_password=new_hash)
+        return valid
 
     async def _create_tokens(self, user_id: int) -> TokenPair:
         access_payload = {
@@ -41,13 +61,13 @@ class AuthService(BaseService):
         return TokenPair(access=access_token, refresh=refresh_token, user_id=user_id)
 
     async def register_oauth2_response(self, username: str, password: str) -> OAuth2TokenResponse:
-        hashed = self.hash_password(password)
+        hashed = await self.hash_password(password)
         user = await self.db.create_user(username=username, hashed_password=hashed)
         return await self._as_oauth2_response(user.id)
 
     async def login_oauth2_response(self, username: str, password: str) -> OAuth2TokenResponse:
         user = await self.db.get_by_username(username=username)
-        if not user or not self.verify_password(password, user.password):
+        if not user or not await self.verify_password(user.id, password, user.password):
             raise HTTPException(status_code=401, detail="Invalid credentials")
         return await self._as_oauth2_response(user.id)
 
@@ -73,16 +93,28 @@ class AuthService(BaseService):
         )
 
     async def decode_jwt(self, token: str) -> dict:
+        started = time.perf_counter()
+        key = hashlib.sha256(token.encode()).digest()
+        payload = self.token_cache.get(key)
+        if payload is not None:
+            _DECODE_HIT.observe(time.perf_counter() - started)
+            return payload
         try:
-            return jwt.decode(
+            payload = jwt.decode(
                 token,
                 settings.token.JWT_SECRET,
                 algorithms=[settings.token.ALGORITHM],
             )
         except jwt.ExpiredSignatureError:
+            _DECODE_INVALID.observe(time.perf_counter() - started)
             raise HTTPException(status_code=401, detail="Token expired")
         except jwt.PyJWTError:
+            _DECODE_INVALID.observe(time.perf_counter() - started)
             raise HTTPException(status_code=401, detail="Invalid token")
+        exp = payload.get("exp")
+        self.token_cache.set(key, payload, ttl=exp - time.time() if exp is not None else None)
+        _DECODE_DECODED.observe(time.perf_counter() - started)
+        return payload
 
 
-auth_service = AuthService(db=auth_repository)
+auth_service = AuthService(db=auth_repository, hasher=password_hasher)
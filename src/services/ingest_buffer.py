@@ -0,0 +1,181 @@
+"""Module with write-behind buffer for created notifications."""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any, NamedTuple, Optional
+
+import structlog
+from fastapi import HTTPException, status
+
+from src.metrics import INGEST_BATCH_SIZE, INGEST_FAILED, INGEST_FLUSH_DURATION, INGEST_REJECTED, INGEST_WAIT_DURATION
+
+logger = structlog.stdlib.get_logger('ingest_buffer')
+
+_FLUSH_OK = INGEST_FLUSH_DURATION.labels('ok')
+_FLUSH_ERROR = INGEST_FLUSH_DURATION.labels('error')
+
+
+class IngestItem(NamedTuple):
+    """Элемент буфера: данные для записи, квитанция и future ожидающего запроса."""
+
+    user_id: int
+    data: Any
+    receipt_id: str
+    enqueued_at: float
+    future: Optional[asyncio.Future]
+
+
+class IngestBuffer:
+    """Буфер записи: одиночные создания копятся и пишутся одной пачкой.
+
+    Пачка сбрасывается через `flush_interval` секунд после первого элемента или
+    сразу, как набралось `max_batch` элементов. Одновременно пишется одна пачка,
+    очередь ограничена `max_pending`: сверх лимита запрос сразу получает 503.
+    Если пачка не записалась, элементы повторяются по одному, чтобы одна
+    ошибочная строка не отменяла остальные. Буфер живет в памяти процесса:
+    принятое, но не записанное при аварийной остановке теряется.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[list[tuple[int, Any]]], Awaitable[list[Any]]],
+        max_batch: int,
+        flush_interval: float,
+        max_pending: int,
+    ):
+        """Initialize IngestBuffer.
+
+        Args:
+            write (Callable): Запись пачки пар (user_id, данные), возвращает результаты в том же порядке.
+            max_batch (int): Максимум элементов в одной пачке.
+            flush_interval (float): Сколько секунд первый элемент может ждать сброса.
+            max_pending (int): Максимум элементов в очереди.
+        """
+        self.write = write
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._items: deque[IngestItem] = deque()
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._closed = False
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, user_id: int, data: Any, receipt_id: str, wait: bool) -> Optional[asyncio.Future]:
+        """Поставить элемент в очередь.
+
+        Args:
+            user_id (int): Владелец уведомления.
+            data (Any): Данные для записи.
+            receipt_id (str): Id квитанции, попадает в лог, если запись не удалась.
+            wait (bool): Вернуть future с результатом записи.
+
+        Returns:
+            Optional[asyncio.Future]: Результат записи, если `wait`.
+
+        Raises:
+            HTTPException: 503, если очередь заполнена или буфер остановлен.
+        """
+        if self._closed or len(self._items) >= self.max_pending:
+            self.rejected += 1
+            INGEST_REJECTED.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Notification ingest is overloaded, retry later',
+                headers={'Retry-After': '1'},
+            )
+        future = asyncio.get_running_loop().create_future() if wait else None
+        self._items.append(IngestItem(user_id, data, receipt_id, time.perf_counter(), future))
+        self._has_items.set()
+        if len(self._items) >= self.max_batch:
+            self._batch_full.set()
+        return future
+
+    def start(self) -> None:
+        """Запустить фоновый сброс пачек."""
+        # События привязываются к event loop, а при перезапуске приложения он может быть новым.
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Перестать принимать элементы и записать все, что уже в очереди."""
+        self._closed = True
+        self._has_items.set()
+        self._batch_full.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        """Статистика буфера."""
+        return {
+            'pending': len(self._items),
+            'max_pending': self.max_pending,
+            'flushed': self.flushed,
+            'batches': self.batches,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_items.wait()
+            if not self._items:
+                if self._closed:
+                    return
+                self._has_items.clear()
+                continue
+            if not self._closed and len(self._items) < self.max_batch:
+                # Ждем оставшуюся часть интервала первого элемента или полную пачку.
+                timeout = self._items[0].enqueued_at + self.flush_interval - time.perf_counter()
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=max(timeout, 0))
+                except TimeoutError:
+                    pass
+            batch = [self._items.popleft() for _ in range(min(self.max_batch, len(self._items)))]
+            if len(self._items) < self.max_batch and not self._closed:
+                self._batch_full.clear()
+            INGEST_BATCH_SIZE.observe(len(batch))
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[IngestItem]) -> None:
+        started = time.perf_counter()
+        try:
+            results = await self.write([(item.user_id, item.data) for item in batch])
+        except Exception as exc:
+            _FLUSH_ERROR.observe(time.perf_counter() - started)
+            if len(batch) == 1:
+                self._fail(batch[0], exc)
+                return
+            for item in batch:
+                await self._flush([item])
+            return
+        finished = time.perf_counter()
+        _FLUSH_OK.observe(finished - started)
+        self.flushed += len(batch)
+        self.batches += 1
+        for item, result in zip(batch, results):
+            INGEST_WAIT_DURATION.observe(finished - item.enqueued_at)
+            if item.future is not None and not item.future.done():
+                item.future.set_result(result)
+
+    def _fail(self, item: IngestItem, error: Exception) -> None:
+        self.failed += 1
+        INGEST_FAILED.inc()
+        if item.future is not None:
+            if not item.future.done():
+                item.future.set_exception(error)
+            return
+        logger.error('Не удалось записать уведомление из буфера. receipt_id={receipt_id}, user_id={user_id}: {error!r}'.format(
+            receipt_id=item.receipt_id,
+            user_id=item.user_id,
+            error=error,
+        ))
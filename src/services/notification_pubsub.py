@@ -0,0 +1,98 @@
+"""Внутрипроцессная рассылка новых уведомлений подписчикам (SSE)."""
+
+import asyncio
+from collections import defaultdict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from src.config.settings import settings
+from src.rest_models.notification_schema import NotificationRead
+
+# Маркер в очереди подписчика: события были потеряны, нужно догнать их из БД.
+LAGGED = object()
+
+
+class Subscription:
+    """Подписка на уведомления одного пользователя с ограниченной очередью."""
+
+    def __init__(self, user_id: int, queue_size: int):
+        """Initialize Subscription.
+
+        Args:
+            user_id (int): Пользователь, чьи уведомления приходят в очередь.
+            queue_size (int): Размер очереди событий.
+        """
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, event: NotificationRead) -> bool:
+        """Положить событие в очередь без ожидания.
+
+        Если подписчик не успевает читать, очередь очищается и в нее кладется
+        `LAGGED`: читатель сам догоняет пропущенное из БД, а публикация не ждет.
+
+        Returns:
+            bool: False, если событие не поместилось.
+        """
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(LAGGED)
+            return False
+        return True
+
+    async def get(self) -> NotificationRead | object:
+        """Дождаться следующего события или `LAGGED`."""
+        return await self.queue.get()
+
+
+class NotificationPubSub:
+    """Fan-out новых уведомлений подписчикам по user_id внутри процесса."""
+
+    def __init__(self, queue_size: int):
+        """Initialize NotificationPubSub.
+
+        Args:
+            queue_size (int): Размер очереди каждого подписчика.
+        """
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[Subscription]] = defaultdict(set)
+        self.published = 0
+        self.lagged = 0
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int) -> AsyncIterator[Subscription]:
+        """Подписаться на уведомления пользователя на время контекста."""
+        subscription = Subscription(user_id=user_id, queue_size=self.queue_size)
+        self._subscribers[user_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            subscribers = self._subscribers.get(user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return user_id in self._subscribers
+
+    def publish(self, event: NotificationRead) -> None:
+        """Разослать уведомление подписчикам его пользователя."""
+        for subscription in self._subscribers.get(event.user_id, ()):
+            if not subscription.push(event):
+                self.lagged += 1
+        self.published += 1
+
+    def stats(self) -> dict:
+        return {
+            'users': len(self._subscribers),
+            'subscriptions': sum(len(subscribers) for subscribers in self._subscribers.values()),
+            'published': self.published,
+            'lagged': self.lagged,
+        }
+
+
+notification_pubsub = NotificationPubSub(queue_size=settings.notifications.STREAM_QUEUE_SIZE)
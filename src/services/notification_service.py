@@ -1,12 +1,27 @@
+import asyncio
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from datetime import datetime
+from typing import Optional
+
 import structlog
+from fastapi import HTTPException, status
+from tortoise.timezone import now
 
-from src.rest_models.notification_schema import NotificationCreate
-from src.db_services.notifications_repository import notification_repository
+from src.choices.service_choices import IngestModeChoices
+from src.config.settings import settings
+from src.rest_models.notification_schema import NotificationAccepted, NotificationBatchCreate, \
+    NotificationBatchCreated, NotificationBulkDeleted, NotificationCreate, NotificationMarkedRead, \
+    NotificationUnreadCount
+from src.db_services.notifications_repository import NotificationPageStream, notification_repository
 from src.rest_models.notification_schema import NotificationRead
 
 from src.rest_models.notification_schema import NotificationReadPagination
 from src.rest_models.pagination import Pagination
+from src.brokers import notification_broker
 from src.services.base_service import BaseService
+from src.services.ingest_buffer import IngestBuffer
+from src.services.notification_pubsub import LAGGED
 
 
 logger = structlog.stdlib.get_logger('notification_service')
@@ -14,19 +29,299 @@ logger = structlog.stdlib.get_logger('notification_service')
 
 class NotificationService(BaseService):
 
-    async def create(self, user_id: int, data: NotificationCreate):
-        obj = await self.db.create_notification_for_user(user_id=user_id, data=data)
-        return NotificationRead.from_orm(obj)
+    def __init__(self, db, broker):
+        super().__init__(db)
+        self.broker = broker
+        self.ingest = IngestBuffer(
+            write=self._write_buffered,
+            max_batch=settings.notifications.INGEST_MAX_BATCH,
+            flush_interval=settings.notifications.INGEST_FLUSH_INTERVAL_MS / 1000,
+            max_pending=settings.notifications.INGEST_MAX_PENDING,
+        )
+        self.aggregated_types = {
+            name.strip() for name in settings.notifications.AGGREGATION_TYPES.split(',') if name.strip()
+        }
+
+    async def create(self, user_id: int, data: NotificationCreate) -> NotificationRead | NotificationAccepted:
+        """
+        Создать уведомление.
+
+        В режиме `INGEST_MODE=direct` - отдельный INSERT. В остальных режимах уведомление
+        пишется пачкой через буфер записи: `buffered` ждет записи и возвращает уведомление,
+        `accepted` сразу возвращает квитанцию. Уведомления с `group_key` типов из
+        `AGGREGATION_TYPES` при `AGGREGATION_WINDOW` > 0 объединяются с группой одним
+        upsert в обход буфера.
+        """
+        if self._is_grouped(data):
+            notification, _ = await self.db.upsert_grouped_notification(
+                user_id=user_id,
+                data=data,
+                window=settings.notifications.AGGREGATION_WINDOW,
+            )
+            await self.broker.publish([notification])
+            return notification
+        mode = settings.notifications.INGEST_MODE
+        if mode == IngestModeChoices.direct:
+            obj = await self.db.create_notification_for_user(user_id=user_id, data=data)
+            notification = NotificationRead.from_orm(obj)
+            await self.broker.publish([notification])
+            return notification
+        receipt_id = uuid.uuid4().hex
+        created = self.ingest.submit(
+            user_id=user_id,
+            data=data,
+            receipt_id=receipt_id,
+            wait=mode == IngestModeChoices.buffered,
+        )
+        if created is None:
+            return NotificationAccepted(receipt_id=receipt_id)
+        return await created
+
+    async def create_batch(
+        self,
+        user_id: int,
+        data: NotificationBatchCreate,
+        producer: bool = False,
+    ) -> NotificationBatchCreated:
+        """
+        Создать уведомления пачкой.
+
+        Элементы без `user_id` создаются текущему пользователю. Чужой `user_id` разрешен
+        только доверенному продюсеру, иначе любой пользователь мог бы писать в чужую ленту.
+        Элементы, которые группируются (см. `create`), пишутся upsert-ом в свою группу после
+        пачки остальных, их id в ответе - id группы.
+        """
+        if not producer and any(item.user_id not in (None, user_id) for item in data.items):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Creating notifications for other users requires a producer token",
+            )
+        items = [(item.user_id or user_id, item) for item in data.items]
+        ids: list[Optional[int]] = [None] * len(items)
+        plain = [(index, pair) for index, pair in enumerate(items) if not self._is_grouped(pair[1])]
+        if plain:
+            plain_items = [pair for _, pair in plain]
+            created_at = now()
+            plain_ids = await self.db.bulk_create_notifications(
+                items=plain_items,
+                chunk_size=settings.notifications.BATCH_CHUNK_SIZE,
+                created_at=created_at,
+            )
+            for (index, _), notification_id in zip(plain, plain_ids):
+                ids[index] = notification_id
+            await self._publish_created(items=plain_items, ids=plain_ids, created_at=created_at)
+        grouped = []
+        for index, (owner_id, item) in enumerate(items):
+            if ids[index] is None:
+                notification, _ = await self.db.upsert_grouped_notification(
+                    user_id=owner_id,
+                    data=item,
+                    window=settings.notifications.AGGREGATION_WINDOW,
+                )
+                ids[index] = notification.id
+                grouped.append(notification)
+        if grouped:
+            await self.broker.publish(grouped)
+        return NotificationBatchCreated(ids=ids)
+
+    def _is_grouped(self, data: NotificationCreate) -> bool:
+        """Объединяется ли уведомление с группой (`AGGREGATION_WINDOW` > 0, тип из `AGGREGATION_TYPES`)."""
+        return (
+            settings.notifications.AGGREGATION_WINDOW > 0
+            and data.group_key is not None
+            and data.type.value in self.aggregated_types
+        )
+
+    async def _write_buffered(self, items: list[tuple[int, NotificationCreate]]) -> list[NotificationRead]:
+        # Группируемые уведомления сюда не попадают: `create` пишет их upsert-ом в обход буфера.
+        created_at = now()
+        ids = await self.db.bulk_create_notifications(
+            items=items,
+            chunk_size=settings.notifications.BATCH_CHUNK_SIZE,
+            created_at=created_at,
+        )
+        await self._publish_created(items=items, ids=ids, created_at=created_at)
+        return [
+            _created_read(notification_id, owner_id, item, created_at)
+            for notification_id, (owner_id, item) in zip(ids, items)
+        ]
+
+    async def _publish_created(
+        self,
+        items: list[tuple[int, NotificationCreate]],
+        ids: list[int],
+        created_at: datetime,
+    ) -> None:
+        # События собираются только для пользователей с открытым потоком.
+        subscribed = await self.broker.subscribed_users({owner_id for owner_id, _ in items})
+        if subscribed:
+            await self.broker.publish([
+                _created_read(notification_id, owner_id, item, created_at)
+                for notification_id, (owner_id, item) in zip(ids, items)
+                if owner_id in subscribed
+            ])
+
+    async def stream(
+        self,
+        user_id: int,
+        last_event_id: Optional[int] = None,
+        heartbeat_interval: float = 15,
+        resume_on_lag: bool = True,
+    ) -> AsyncIterator[Optional[NotificationRead]]:
+        """
+        Поток новых уведомлений пользователя.
+
+        С `last_event_id` сначала отдаются уведомления из БД с большим id. Если подписчик
+        не успевает читать и события теряются, пропущенное так же догоняется из БД,
+        а при `resume_on_lag=False` поток завершается (медленный клиент отключается).
+        None означает, что за `heartbeat_interval` событий не было.
+        """
+        async with self.broker.subscribe(user_id) as subscription:
+            # Подписка оформляется до чтения из БД, чтобы не потерять уведомления между ними.
+            if last_event_id is None:
+                last_id = await self.db.get_last_notification_id(user_id=user_id)
+            else:
+                last_id = last_event_id
+            catch_up = last_event_id is not None
+            delivered: set[int] = set()
+
+            while True:
+                if catch_up:
+                    # Уведомления, отданные из БД, могут прийти и через подписку - их пропускаем.
+                    delivered = set()
+                    async for notification in self._backfill(user_id=user_id, after_id=last_id):
+                        delivered.add(notification.id)
+                        last_id = notification.id
+                        yield notification
+                    catch_up = False
+
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=heartbeat_interval)
+                except TimeoutError:
+                    yield None
+                    continue
+                if event is LAGGED:
+                    if not resume_on_lag:
+                        return
+                    catch_up = True
+                elif event.id not in delivered:
+                    last_id = max(last_id, event.id)
+                    yield event
+
+    async def _backfill(self, user_id: int, after_id: int) -> AsyncIterator[NotificationRead]:
+        while True:
+            notifications = await self.db.get_user_notifications_after(
+                user_id=user_id,
+                after_id=after_id,
+                limit=settings.notifications.STREAM_BACKFILL_BATCH,
+            )
+            for notification in notifications:
+                yield notification
+            if len(notifications) < settings.notifications.STREAM_BACKFILL_BATCH:
+                return
+            after_id = notifications[-1].id
 
-    async def list(self, user_id: int, pagination: Pagination) -> NotificationReadPagination:
+    async def list(
+        self,
+        user_id: int,
+        pagination: Pagination,
+        exact_count: bool = False,
+    ) -> NotificationReadPagination:
         result = await self.db.get_user_notifications(
             user_id=user_id,
-            pagination=pagination
+            pagination=pagination,
+            exact_count=exact_count,
         )
         return result
 
+    async def list_data(
+        self,
+        user_id: int,
+        pagination: Pagination,
+        exact_count: bool = False,
+    ) -> dict:
+        return await self.db.get_user_notifications_data(
+            user_id=user_id,
+            pagination=pagination,
+            exact_count=exact_count,
+        )
+
+    async def stream_list_data(
+        self,
+        user_id: int,
+        pagination: Pagination,
+        chunk_size: int,
+        exact_count: bool = False,
+    ) -> NotificationPageStream:
+        return await self.db.stream_user_notifications_data(
+            user_id=user_id,
+            pagination=pagination,
+            chunk_size=chunk_size,
+            exact_count=exact_count,
+        )
+
     async def delete(self, user_id: int, notification_id: int):
         await self.db.delete_user_notification(user_id=user_id, notification_id=notification_id)
 
+    async def delete_many(
+        self,
+        user_id: int,
+        ids: Optional[Sequence[int]] = None,
+        before_id: Optional[int] = None,
+        before_date: Optional[datetime] = None,
+    ) -> NotificationBulkDeleted:
+        deleted = await self.db.delete_user_notifications(
+            user_id=user_id,
+            chunk_size=settings.notifications.DELETE_CHUNK_SIZE,
+            ids=ids,
+            before_id=before_id,
+            before_date=before_date,
+        )
+        return NotificationBulkDeleted(deleted=deleted)
+
+    async def mark_read(self, user_id: int, up_to_id: Optional[int] = None) -> NotificationMarkedRead:
+        marked = await self.db.mark_read(user_id=user_id, up_to_id=up_to_id)
+        return NotificationMarkedRead(marked=marked)
+
+    async def unread_count(self, user_id: int) -> NotificationUnreadCount:
+        return NotificationUnreadCount(unread=await self.db.get_unread_count(user_id=user_id))
+
+    async def list_etag(self, user_id: int) -> Optional[str]:
+        """
+        ETag списка уведомлений пользователя из версии его счетчика.
+
+        Версия растет при любом изменении уведомлений, поэтому тег совпадает, пока список
+        не менялся. Тег слабый: тело одной версии зависит еще и от формата ответа.
+        """
+        version = await self.db.get_list_version(user_id=user_id)
+        if version is None:
+            return None
+        return 'W/"{user_id}-{version}"'.format(user_id=user_id, version=version)
+
+    async def reconcile_counters(self, batch_size: int) -> int:
+        fixed = await self.db.reconcile_counters(batch_size=batch_size)
+        logger.info('Сверка счетчиков уведомлений завершена. Исправлено: {fixed}'.format(fixed=fixed))
+        return fixed
+
+    async def run_counter_reconciler(self, interval: int, batch_size: int) -> None:
+        """Периодически сверяет счетчики уведомлений, пока задачу не отменят."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reconcile_counters(batch_size=batch_size)
+            except Exception:
+                logger.exception('Ошибка сверки счетчиков уведомлений')
+
+
+def _created_read(notification_id: int, user_id: int, data: NotificationCreate, created_at: datetime) -> NotificationRead:
+    return NotificationRead(
+        id=notification_id,
+        type=data.type.value,
+        text=data.text,
+        created_at=created_at,
+        user_id=user_id,
+        group_key=data.group_key,
+    )
+
 
-notification_service = NotificationService(db=notification_repository)
+notification_service = NotificationService(db=notification_repository, broker=notification_broker)
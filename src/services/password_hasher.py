@@ -0,0 +1,107 @@
+"""Module with password hashing pool."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from src.config.settings import settings
+from src.metrics import PASSWORD_HASHING_DURATION
+from src.utils.metrics import HistogramChild
+
+_HASH_DURATION = PASSWORD_HASHING_DURATION.labels('hash')
+_VERIFY_DURATION = PASSWORD_HASHING_DURATION.labels('verify')
+
+
+class PasswordHasher:
+    """Хеширование паролей bcrypt вне event loop.
+
+    bcrypt занимает сотни миллисекунд CPU, поэтому вычисления идут в отдельном
+    пуле потоков фиксированного размера. Если в очереди уже `queue_limit` задач,
+    новый запрос сразу получает 503, а не ждет и не копит нагрузку.
+    """
+
+    def __init__(self, rounds: int, workers: int, queue_limit: int):
+        """Initialize PasswordHasher.
+
+        Args:
+            rounds (int): Cost factor bcrypt для новых хешей. Хеши с меньшим
+                значением пересчитываются при успешном входе.
+            workers (int): Количество потоков хеширования.
+            queue_limit (int): Сколько задач может ждать свободный поток.
+        """
+        self.context = CryptContext(
+            schemes=['bcrypt'],
+            deprecated='auto',
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+        )
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+        self.rejected = 0
+
+    async def hash(self, password: str) -> str:
+        """Посчитать хеш пароля.
+
+        Returns:
+            str: bcrypt-хеш.
+        """
+        return await self._run(_HASH_DURATION, self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """Проверить пароль и при необходимости пересчитать устаревший хеш.
+
+        Returns:
+            tuple[bool, Optional[str]]: Результат проверки и новый хеш, если старый устарел.
+        """
+        return await self._run(_VERIFY_DURATION, self.context.verify_and_update, password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Остановить пул потоков."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict[str, int]:
+        """Статистика пула.
+
+        Returns:
+            dict[str, int]: Размер пула, задачи в работе и отклоненные запросы.
+        """
+        return {
+            'workers': self.workers,
+            'queue_limit': self.queue_limit,
+            'in_flight': self._in_flight,
+            'rejected': self.rejected,
+        }
+
+    async def _run(self, duration: HistogramChild, func: Callable[..., Any], *args: Any) -> Any:
+        # Счетчик меняется только из потока event loop, блокировка не нужна.
+        if self._in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Password hashing is overloaded, retry later',
+                headers={'Retry-After': '1'},
+            )
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+        self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            duration.observe(time.perf_counter() - started)
+
+
+password_hasher = PasswordHasher(
+    rounds=settings.hashing.BCRYPT_ROUNDS,
+    workers=settings.hashing.HASHING_WORKERS,
+    queue_limit=settings.hashing.HASHING_QUEUE_LIMIT,
+)
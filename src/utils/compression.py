@@ -0,0 +1,152 @@
+"""Module with HTTP response compression codecs.
+
+gzip есть всегда (zlib из стандартной библиотеки), brotli и zstd - если
+установлены пакеты `brotli` и `zstandard` (`uv sync --extra compression`).
+Кодек с потоковым компрессором нужен для ответов, которые отдаются частями:
+каждая часть сжимается и сбрасывается сразу, клиент не ждет конца ответа.
+"""
+
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from typing import Any, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него остаются zstd и gzip
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard необязателен, без него остаются brotli и gzip
+    zstandard = None
+
+
+class StreamCompressor(ABC):
+    """Потоковый компрессор одного ответа."""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        """Сжать часть тела и сбросить буфер, чтобы часть сразу ушла клиенту."""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        """Завершить поток."""
+
+
+class _GzipStream(StreamCompressor):
+
+    def __init__(self, level: int):
+        # wbits=31 - формат gzip (заголовок и CRC), а не голый deflate.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream(StreamCompressor):
+
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdStream(StreamCompressor):
+
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, mode=brotli.MODE_TEXT, quality=level)
+
+
+# Значение Content-Encoding -> (сжатие тела целиком, потоковый компрессор).
+_CODECS: dict[str, tuple[Any, type[StreamCompressor]]] = {'gzip': (_gzip, _GzipStream)}
+if brotli is not None:
+    _CODECS['br'] = (_brotli, _BrotliStream)
+if zstandard is not None:
+    _CODECS['zstd'] = (_zstd, _ZstdStream)
+
+
+def available_encodings(preferred: Iterable[str]) -> tuple[str, ...]:
+    """Кодировки из `preferred`, для которых установлен кодек, в том же порядке."""
+    return tuple(encoding for encoding in preferred if encoding in _CODECS)
+
+
+def compress(encoding: str, data: bytes, level: int) -> bytes:
+    """Сжать тело целиком.
+
+    Args:
+        encoding (str): Значение Content-Encoding из `available_encodings`.
+        data (bytes): Тело ответа.
+        level (int): Уровень сжатия кодека.
+
+    Returns:
+        bytes: Сжатое тело.
+    """
+    return _CODECS[encoding][0](data, level)
+
+
+def stream_compressor(encoding: str, level: int) -> StreamCompressor:
+    """Потоковый компрессор для ответа, который отдается частями."""
+    return _CODECS[encoding][1](level)
+
+
+def negotiate(accept_encoding: str, encodings: Iterable[str]) -> Optional[str]:
+    """Выбрать кодировку по заголовку Accept-Encoding.
+
+    Из поддерживаемых клиентом (q > 0) берется кодировка с наибольшим q, при равных q -
+    первая в `encodings` (порядок предпочтения сервера). `*` относится ко всем кодировкам,
+    не названным явно.
+
+    Args:
+        accept_encoding (str): Значение заголовка Accept-Encoding.
+        encodings (Iterable[str]): Доступные кодировки в порядке предпочтения.
+
+    Returns:
+        Optional[str]: Кодировка или None, если сжимать нельзя.
+    """
+    weights: dict[str, float] = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.partition(';')
+        name = name.strip()
+        if not name:
+            continue
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name] = weight
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
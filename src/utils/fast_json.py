@@ -0,0 +1,45 @@
+"""Module with fast JSON encoding.
+
+Использует orjson, если он установлен (`uv sync --extra fast-json`), иначе
+стандартный `json`. Результат совпадает с тем, что отдает FastAPI для тех же
+данных: компактный JSON в UTF-8, datetime в ISO 8601 с `Z` для UTC.
+"""
+
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson нужен только для ускорения, без него работает json
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Закодировать данные в JSON.
+
+    Args:
+        content (Any): dict/list из простых типов, datetime и Enum.
+
+    Returns:
+        bytes: JSON в UTF-8.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(',', ':'),
+        default=_default,
+    ).encode('utf-8')
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        text = value.isoformat()
+        return text[:-6] + 'Z' if text.endswith('+00:00') else text
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError('Object of type {name} is not JSON serializable'.format(name=type(value).__name__))
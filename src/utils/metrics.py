@@ -0,0 +1,278 @@
+"""Module with in-process metrics in Prometheus text format.
+
+Метрики обновляются только из потока event loop, поэтому обходятся без
+блокировок. Дочерние метрики с метками создаются один раз и кешируются:
+на горячем пути - поиск в словаре и сложение. Для нескольких воркеров
+каждый процесс сохраняет снимок своих значений (`snapshot`), а при
+отдаче снимки складываются (`merge_snapshots`).
+"""
+
+import bisect
+import math
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class CounterChild:
+    """Значение счетчика для одного набора меток."""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class GaugeChild(CounterChild):
+    """Значение gauge для одного набора меток."""
+
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramChild:
+    """Гистограмма для одного набора меток: счетчики корзин, сумма и количество."""
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        # Последняя корзина - значения больше всех границ (+Inf).
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric(ABC):
+    """Семейство метрик с общим именем и набором меток."""
+
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Initialize Metric.
+
+        Args:
+            name (str): Имя метрики в Prometheus.
+            documentation (str): Текст `# HELP`.
+            labelnames (Sequence[str]): Имена меток.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any) -> Any:
+        """Дочерняя метрика для значений меток (создается при первом обращении).
+
+        Ключ кеша - сами значения, поэтому при попадании нет ни преобразований, ни новых объектов
+        кроме кортежа аргументов. Значения приводятся к строкам при снимке.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError('{name} expects labels {labels}'.format(name=self.name, labels=self.labelnames))
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abstractmethod
+    def _new_child(self) -> Any:
+        """Создать значение для нового набора меток."""
+
+    def snapshot(self) -> dict:
+        """Значения в виде, пригодном для JSON и сложения с другими процессами."""
+        return {
+            'type': self.type_name,
+            'help': self.documentation,
+            'labelnames': list(self.labelnames),
+            'samples': [[[str(value) for value in key], self._dump(child)] for key, child in self._children.items()],
+        }
+
+    def _dump(self, child: Any) -> Any:
+        return child.value
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        """Initialize Histogram.
+
+        Args:
+            name (str): Имя метрики в Prometheus.
+            documentation (str): Текст `# HELP`.
+            labelnames (Sequence[str]): Имена меток.
+            buckets (Sequence[float]): Верхние границы корзин по возрастанию, без +Inf.
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def snapshot(self) -> dict:
+        result = super().snapshot()
+        result['buckets'] = list(self.buckets)
+        return result
+
+    def _dump(self, child: HistogramChild) -> Any:
+        return {'counts': list(child.counts), 'sum': child.sum, 'count': child.count}
+
+
+class MetricsRegistry:
+    """Набор метрик процесса."""
+
+    def __init__(self):
+        """Initialize MetricsRegistry."""
+        self._metrics: dict[str, Metric] = {}
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Any:
+        """Добавить метрику в реестр.
+
+        Returns:
+            Metric: Та же метрика, чтобы ее можно было объявить одной строкой.
+        """
+        if metric.name in self._metrics:
+            raise ValueError('Metric {name} is already registered'.format(name=metric.name))
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Добавить функцию, которая обновляет gauge перед каждым снимком (например, из статистики пулов)."""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        """Снимок всех метрик по имени."""
+        for collector in self._collectors:
+            collector()
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    """Сложить снимки нескольких процессов: счетчики, gauge и гистограммы суммируются.
+
+    Совпадающие наборы меток внутри одного снимка (например, статус 200 и '200') тоже складываются.
+
+    Args:
+        snapshots (Iterable[dict]): Снимки `MetricsRegistry.snapshot`.
+
+    Returns:
+        dict: Снимок того же формата.
+    """
+    merged: dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = {**family, 'samples': {}}
+            samples = target['samples']
+            for labels, value in family['samples']:
+                key = tuple(labels)
+                current = samples.get(key)
+                if current is None:
+                    samples[key] = dict(value, counts=list(value['counts'])) if isinstance(value, dict) else value
+                elif isinstance(value, dict):
+                    current['counts'] = [a + b for a, b in zip(current['counts'], value['counts'])]
+                    current['sum'] += value['sum']
+                    current['count'] += value['count']
+                else:
+                    samples[key] = current + value
+    for family in merged.values():
+        family['samples'] = [[list(key), value] for key, value in family['samples'].items()]
+    return merged
+
+
+def render_text(snapshot: dict) -> str:
+    """Снимок в текстовом формате Prometheus (version 0.0.4).
+
+    Args:
+        snapshot (dict): Снимок `MetricsRegistry.snapshot` или `merge_snapshots`.
+
+    Returns:
+        str: Текст для ответа `/metrics`.
+    """
+    lines = []
+    for name, family in snapshot.items():
+        lines.append('# HELP {name} {help}'.format(name=name, help=_escape_help(family['help'])))
+        lines.append('# TYPE {name} {type}'.format(name=name, type=family['type']))
+        labelnames = family['labelnames']
+        for labels, value in family['samples']:
+            pairs = list(zip(labelnames, labels))
+            if family['type'] != 'histogram':
+                lines.append('{name}{labels} {value}'.format(
+                    name=name, labels=_format_labels(pairs), value=_format_value(value),
+                ))
+                continue
+            cumulative = 0
+            for bound, count in zip(family['buckets'] + [math.inf], value['counts']):
+                cumulative += count
+                lines.append('{name}_bucket{labels} {value}'.format(
+                    name=name,
+                    labels=_format_labels(pairs + [('le', _format_value(bound))]),
+                    value=cumulative,
+                ))
+            lines.append('{name}_sum{labels} {value}'.format(
+                name=name, labels=_format_labels(pairs), value=_format_value(value['sum']),
+            ))
+            lines.append('{name}_count{labels} {value}'.format(
+                name=name, labels=_format_labels(pairs), value=value['count'],
+            ))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def _format_labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ''
+    return '{' + ','.join('{name}="{value}"'.format(name=name, value=_escape_label(value)) for name, value in pairs) + '}'
+
+
+def _format_value(value: Optional[float]) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n')
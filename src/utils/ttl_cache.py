@@ -0,0 +1,100 @@
+"""Module with bounded in-process cache."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Optional
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кеш с ограничением размера и временем жизни записей.
+
+    Записи живут не дольше `ttl` секунд; при `set` можно передать меньший срок
+    (например, до истечения токена). При переполнении вытесняется самая давно
+    использованная запись.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """Initialize TTLCache.
+
+        Args:
+            maxsize (int): Максимальное количество записей.
+            ttl (float): Максимальное время жизни записи в секундах.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Вернуть значение по ключу, если запись есть и не истекла.
+
+        Args:
+            key (Hashable): Ключ.
+            default (Any): Значение при промахе.
+
+        Returns:
+            Any: Значение из кеша или `default`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохранить значение.
+
+        Args:
+            key (Hashable): Ключ.
+            value (Any): Значение.
+            ttl (float): Время жизни записи, не больше `self.ttl`.
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """Удалить запись, если она есть."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистить кеш."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        """Статистика использования кеша.
+
+        Returns:
+            dict[str, int]: Размер, попадания, промахи и вытеснения.
+        """
+        with self._lock:
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,63 @@
+"""Планы горячих запросов уведомлений на SQLite (EXPLAIN QUERY PLAN).
+
+Схема создается из моделей, как и миграции: если запрос списка, подсчета, пометки
+прочтения или удаления перестанет использовать индексы `Notification`, тест упадет.
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from tortoise import Tortoise, connections
+
+from src.db.index_check import PlanCheck, check_notification_indexes
+
+NOTIFICATION_INDEXES = (
+    'idx_notification_user_id_id',
+    'idx_notification_user_created',
+    'idx_notification_user_unread',
+)
+
+
+@asynccontextmanager
+async def schema() -> AsyncIterator[None]:
+    await Tortoise.init(
+        db_url='sqlite://:memory:',
+        modules={'models': ['src.models.user', 'src.models.notification', 'src.models.notification_counter']},
+    )
+    try:
+        await Tortoise.generate_schemas()
+        yield
+    finally:
+        await Tortoise.close_connections()
+
+
+def failures(results: list[PlanCheck]) -> list[str]:
+    return ['{name}: {plan}'.format(name=result.name, plan=result.plan) for result in results if not result.ok]
+
+
+def test_hot_queries_use_notification_indexes():
+    async def scenario() -> list[PlanCheck]:
+        async with schema():
+            return await check_notification_indexes()
+
+    results = asyncio.run(scenario())
+
+    assert len(results) == 12
+    assert failures(results) == []
+
+
+def test_check_fails_when_query_falls_back_to_full_scan():
+    async def scenario() -> list[PlanCheck]:
+        async with schema():
+            conn = connections.get('default')
+            for index in NOTIFICATION_INDEXES:
+                await conn.execute_script('DROP INDEX {index}'.format(index=index))
+            return await check_notification_indexes()
+
+    results = asyncio.run(scenario())
+
+    failed = {result.name for result in results if not result.ok}
+    # Удаление по первичному ключу индексы пользователя не использует, остальные запросы - используют.
+    assert failed == {result.name for result in results} - {'delete_by_id'}
+    assert {'list_asc_offset', 'list_desc_offset'} <= {result.name for result in results if result.full_scan}
@@ -0,0 +1,172 @@
+"""Брокер Redis на fakeredis: два экземпляра `RedisBroker` - два воркера с общим Redis.
+
+WebSocket-клиент подключается к эндпоинту `/notifications/ws` второго воркера через
+ASGI напрямую, уведомления публикует первый.
+"""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from tortoise import Tortoise
+
+from src.brokers.redis_broker import RedisBroker
+from src.models.notification import NotificationType
+from src.rest_models.notification_schema import NotificationRead
+from src.routers.deps.auth import get_websocket_user_id
+from src.routers.notifications_router import notifications_router
+from src.services.notification_pubsub import NotificationPubSub
+from src.services.notification_service import notification_service
+
+fakeredis = pytest.importorskip('fakeredis')
+
+USER_ID = 1
+
+
+class WebSocketClient:
+    """Клиент ASGI WebSocket: пока `unblocked` сброшен, сообщения не доставляются, как в медленной сети."""
+
+    def __init__(self, app: FastAPI, path: str):
+        self.app = app
+        self.path = path
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.outgoing: asyncio.Queue = asyncio.Queue()
+        self.unblocked = asyncio.Event()
+        self.unblocked.set()
+        self.task = None
+
+    async def connect(self) -> None:
+        scope = {
+            'type': 'websocket',
+            'path': self.path,
+            'raw_path': self.path.encode(),
+            'root_path': '',
+            'query_string': b'',
+            'headers': [],
+            'scheme': 'ws',
+            'server': ('test', 80),
+            'client': ('test', 1),
+            'subprotocols': [],
+        }
+        await self.incoming.put({'type': 'websocket.connect'})
+        self.task = asyncio.create_task(self.app(scope, self.incoming.get, self._send))
+        assert (await self.receive())['type'] == 'websocket.accept'
+
+    async def receive(self) -> dict:
+        return await asyncio.wait_for(self.outgoing.get(), timeout=5)
+
+    async def close(self) -> None:
+        await self.incoming.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, timeout=5)
+
+    async def _send(self, message: dict) -> None:
+        if message['type'] == 'websocket.send':
+            await self.unblocked.wait()
+        await self.outgoing.put(message)
+
+
+def event(notification_id: int) -> NotificationRead:
+    return NotificationRead(
+        id=notification_id,
+        type=NotificationType.like.value,
+        text='event {id}'.format(id=notification_id),
+        created_at='2026-01-01T00:00:00Z',
+        user_id=USER_ID,
+    )
+
+
+@asynccontextmanager
+async def workers(monkeypatch: pytest.MonkeyPatch, queue_size: int = 10) -> AsyncIterator[tuple[RedisBroker, FastAPI]]:
+    """Два брокера на одном fakeredis и приложение второго воркера с WebSocket-эндпоинтом."""
+    server = fakeredis.FakeServer()
+
+    async def get_client():
+        return fakeredis.aioredis.FakeRedis(server=server)
+
+    monkeypatch.setattr('src.brokers.redis_broker.get_redis_client', get_client)
+    publisher = RedisBroker(local=NotificationPubSub(queue_size=queue_size), channel_prefix='test')
+    subscriber = RedisBroker(local=NotificationPubSub(queue_size=queue_size), channel_prefix='test')
+    monkeypatch.setattr(notification_service, 'broker', subscriber)
+
+    app = FastAPI()
+    app.include_router(notifications_router, prefix='/notifications')
+    app.dependency_overrides[get_websocket_user_id] = lambda: USER_ID
+
+    await Tortoise.init(
+        db_url='sqlite://:memory:',
+        modules={'models': ['src.models.user', 'src.models.notification', 'src.models.notification_counter']},
+    )
+    await Tortoise.generate_schemas()
+    await publisher.start()
+    await subscriber.start()
+    try:
+        yield publisher, app
+    finally:
+        await subscriber.stop()
+        await publisher.stop()
+        await Tortoise.close_connections()
+
+
+async def wait_subscribed(publisher: RedisBroker) -> None:
+    """Дождаться, пока подписка второго воркера дойдет до Redis."""
+    for _ in range(100):
+        if await publisher.subscribed_users({USER_ID}):
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError('Subscriber did not reach Redis')
+
+
+def test_publish_reaches_websocket_on_another_worker(monkeypatch: pytest.MonkeyPatch):
+    async def scenario():
+        async with workers(monkeypatch) as (publisher, app):
+            client = WebSocketClient(app, '/notifications/ws')
+            await client.connect()
+            await wait_subscribed(publisher)
+
+            await publisher.publish([event(1), event(2)])
+
+            for notification_id in (1, 2):
+                message = await client.receive()
+                payload = json.loads(message['text'])
+                assert payload['event'] == 'notification'
+                assert payload['data']['id'] == notification_id
+            # Публикующий воркер сам событие не рассылает: оно приходит только через Redis.
+            assert publisher.local.published == 0
+            await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_consumer_lags_and_is_closed_with_1013(monkeypatch: pytest.MonkeyPatch):
+    async def scenario():
+        async with workers(monkeypatch, queue_size=2) as (publisher, app):
+            client = WebSocketClient(app, '/notifications/ws')
+            await client.connect()
+            await wait_subscribed(publisher)
+            subscriber = notification_service.broker
+
+            # Клиент не читает: первое событие висит в отправке, остальные переполняют очередь.
+            client.unblocked.clear()
+            await publisher.publish([event(notification_id) for notification_id in range(1, 6)])
+            for _ in range(100):
+                if subscriber.local.lagged:
+                    break
+                await asyncio.sleep(0.01)
+            assert subscriber.local.lagged > 0
+            client.unblocked.set()
+
+            # Потерянные события не догоняются: поток обрывается, клиент получает 1013.
+            delivered = []
+            message = await client.receive()
+            while message['type'] == 'websocket.send':
+                delivered.append(json.loads(message['text'])['data']['id'])
+                message = await client.receive()
+            assert message['type'] == 'websocket.close'
+            assert message['code'] == 1013
+            assert len(delivered) < 5
+            await asyncio.wait_for(client.task, timeout=5)
+
+    asyncio.run(scenario())
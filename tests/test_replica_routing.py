@@ -0,0 +1,188 @@
+"""Маршрутизация чтений на реплику: основная БД и реплика - два файла SQLite.
+
+Реплика здесь - копия файла основной БД, снятая в момент `replicate()`: все, что
+записано в основную БД позже, реплика "еще не получила", как отстающая реплика.
+"""
+
+import asyncio
+import sqlite3
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import pytest
+from tortoise import Tortoise, connections
+from tortoise.expressions import F
+
+from src.db.replica import REPLICA_CONNECTION, MemoryPinStore, RedisPinStore, ReplicaRouting, replica_routing
+from src.db_services.notifications_repository import notification_repository
+from src.models.notification import Notification, NotificationType
+from src.models.notification_counter import NotificationCounter
+from src.models.user import User
+from src.rest_models.notification_schema import NotificationCreate
+from src.rest_models.pagination import Pagination
+
+WINDOW = 0.3
+
+
+class ReplicaFiles:
+    """Основная БД и реплика в двух файлах SQLite."""
+
+    def __init__(self, directory: Path):
+        self.primary = directory / 'primary.db'
+        self.replica = directory / 'replica.db'
+
+    def replicate(self) -> None:
+        """Скопировать основную БД в реплику (backup учитывает WAL)."""
+        with sqlite3.connect(self.primary) as source, sqlite3.connect(self.replica) as target:
+            source.backup(target)
+
+    def config(self) -> dict:
+        return {
+            'connections': {
+                'default': {'engine': 'tortoise.backends.sqlite', 'credentials': {'file_path': str(self.primary)}},
+                REPLICA_CONNECTION: {
+                    'engine': 'tortoise.backends.sqlite',
+                    'credentials': {'file_path': str(self.replica)},
+                },
+            },
+            'apps': {
+                'models': {
+                    'models': ['src.models.user', 'src.models.notification', 'src.models.notification_counter'],
+                    'default_connection': 'default',
+                },
+            },
+            'routers': ['src.db.replica.ReplicaRouter'],
+        }
+
+
+@pytest.fixture
+def files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ReplicaFiles:
+    monkeypatch.setattr(replica_routing, 'enabled', True)
+    monkeypatch.setattr(replica_routing, 'store', MemoryPinStore(window=WINDOW))
+    monkeypatch.setattr(replica_routing, 'replica_reads', 0)
+    monkeypatch.setattr(replica_routing, 'primary_reads', 0)
+    return ReplicaFiles(tmp_path)
+
+
+@asynccontextmanager
+async def databases(files: ReplicaFiles) -> AsyncIterator[None]:
+    """Поднять Tortoise на двух файлах: схема создается в основной БД и копируется в реплику."""
+    await Tortoise.init(config=files.config())
+    try:
+        await Tortoise.generate_schemas()
+        files.replicate()
+        yield
+    finally:
+        await Tortoise.close_connections()
+
+
+async def create_user(username: str) -> int:
+    user = await User.create(username=username, password='hash')
+    return user.id
+
+
+async def list_ids(user_id: int) -> tuple[int, list[int]]:
+    pagination = Pagination(page=1, per_page=50)
+    page = await notification_repository.get_user_notifications(user_id=user_id, pagination=pagination)
+    return page.total, [item.id for item in page.items]
+
+
+async def replica_count() -> int:
+    return await Notification.all().using_db(connections.get(REPLICA_CONNECTION)).count()
+
+
+def notification(text: str) -> NotificationCreate:
+    return NotificationCreate(type=NotificationType.comment, text=text)
+
+
+def test_list_reads_go_to_replica(files: ReplicaFiles):
+    async def scenario():
+        async with databases(files):
+            user_id = await create_user('reader')
+            replicated = await notification_repository.create_notification_for_user(user_id, notification('a'))
+            files.replicate()
+            await asyncio.sleep(WINDOW)
+            # Запись в обход репозитория не отмечает пользователя: реплика о ней не знает.
+            await Notification.create(user_id=user_id, type=NotificationType.comment, text='lagging')
+            await NotificationCounter.filter(user_id=user_id).update(total=F('total') + 1, version=F('version') + 1)
+
+            assert await list_ids(user_id) == (1, [replicated.id])
+            # ETag строится по версии реплики, а не по более новой версии основной БД.
+            assert await notification_repository.get_list_version(user_id=user_id) == 0
+            assert replica_routing.replica_reads == 2
+
+    asyncio.run(scenario())
+
+
+def test_write_pins_user_to_primary_for_window(files: ReplicaFiles):
+    async def scenario():
+        async with databases(files):
+            writer_id = await create_user('writer')
+            other_id = await create_user('other')
+            files.replicate()
+
+            created = await notification_repository.create_notification_for_user(writer_id, notification('new'))
+            await notification_repository.create_notification_for_user(other_id, notification('other'))
+            await asyncio.sleep(WINDOW)
+            await notification_repository.create_notification_for_user(writer_id, notification('newer'))
+
+            # Писавший пользователь видит свои записи, хотя реплика их еще не получила.
+            total, ids = await list_ids(writer_id)
+            assert total == 2 and created.id in ids
+            assert replica_routing.primary_reads == 1
+            # Окно другого пользователя истекло: он читает отстающую реплику.
+            assert await list_ids(other_id) == (0, [])
+
+            await asyncio.sleep(WINDOW)
+            assert await list_ids(writer_id) == (0, [])
+            assert replica_routing.replica_reads == 2
+
+    asyncio.run(scenario())
+
+
+def test_writes_never_reach_replica(files: ReplicaFiles):
+    async def scenario():
+        async with databases(files):
+            user_id = await create_user('author')
+            files.replicate()
+
+            created = await notification_repository.create_notification_for_user(user_id, notification('one'))
+            await notification_repository.bulk_create_notifications(
+                items=[(user_id, notification('batch {index}'.format(index=index))) for index in range(3)],
+                chunk_size=2,
+            )
+            await notification_repository.mark_read(user_id=user_id)
+            await notification_repository.delete_user_notification(user_id=user_id, notification_id=created.id)
+
+            assert await Notification.filter(user_id=user_id).count() == 3
+            assert await replica_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_redis_pin_is_shared_between_workers(monkeypatch: pytest.MonkeyPatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    client = fakeredis.aioredis.FakeRedis()
+
+    async def get_client():
+        return client
+
+    monkeypatch.setattr('src.db.replica.get_redis_client', get_client)
+
+    async def scenario():
+        # Два воркера: у каждого свой ReplicaRouting, отметки - в общем Redis.
+        worker_a = ReplicaRouting(enabled=True, store=RedisPinStore(window=WINDOW, key_prefix='test'))
+        worker_b = ReplicaRouting(enabled=True, store=RedisPinStore(window=WINDOW, key_prefix='test'))
+
+        await worker_a.mark_write(7)
+        async with worker_b.reads(7):
+            pass
+        assert worker_b.primary_reads == 1
+
+        await asyncio.sleep(WINDOW + 0.1)
+        async with worker_b.reads(7):
+            pass
+        assert worker_b.replica_reads == 1
+
+    asyncio.run(scenario())